@@ -0,0 +1,75 @@
+"""Benchmark the nearest neighbor construction methods of greedy_algorithm.
+
+Run from the root of the repository with:
+
+    poetry run python -m benchmarks.bench_greedy
+
+The "loop" method is quadratic in Python and the "argmin" method needs a dense
+distance matrix, so they are skipped for the sizes where they are impractical.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from tspdashboard.candidate_graph import build_candidate_graph
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.utilities import generate_distance_matrix
+
+# The largest instances each method is run on
+MAX_CITIES_LOOP = 10_000
+MAX_CITIES_ARGMIN = 20_000
+
+
+def benchmark_greedy(no_cities: int, seed: int = 0) -> dict[str, float]:
+    """Times the greedy methods that are practical for an instance of the given size.
+
+    Returns:
+        dict[str, float]: The wall time in seconds for each method that was run.
+    """
+    cities_coordinates = np.random.default_rng(seed).random((no_cities, 2))
+    timings = {}
+
+    if no_cities <= MAX_CITIES_ARGMIN:
+        distance_matrix = generate_distance_matrix(cities_coordinates)
+
+        start = time.perf_counter()
+        argmin_tour, _ = greedy_algorithm(distance_matrix, method="argmin")
+        timings["argmin"] = time.perf_counter() - start
+
+        if no_cities <= MAX_CITIES_LOOP:
+            start = time.perf_counter()
+            loop_tour, _ = greedy_algorithm(distance_matrix, method="loop")
+            timings["loop"] = time.perf_counter() - start
+
+            if loop_tour != argmin_tour:
+                raise RuntimeError("The loop and argmin methods gave different tours.")
+
+    # The spatial method includes building the candidate graph
+    start = time.perf_counter()
+    greedy_algorithm(build_candidate_graph(cities_coordinates), method="spatial")
+    timings["spatial"] = time.perf_counter() - start
+
+    return timings
+
+
+def main() -> None:
+    """Run the benchmark and print a table of timings and speedups over "loop"."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'cities':>8} {'method':>8} {'seconds':>10} {'speedup':>9}")
+    for no_cities in args.sizes:
+        timings = benchmark_greedy(no_cities, seed=args.seed)
+        for method, seconds in timings.items():
+            speedup = f"{timings['loop'] / seconds:8.1f}x" if "loop" in timings else "-"
+            print(f"{no_cities:>8} {method:>8} {seconds:>10.3f} {speedup:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark the cold start of the dashboard.
+
+Run from the root of the repository with:
+
+    poetry run python -m benchmarks.bench_startup
+
+Every measurement runs in a fresh Python process, so no module is imported yet. The
+import time is the time to import tspdashboard.app. The time to first render is the
+time of the first run of the app script with Streamlit's AppTest, which draws the
+intro and the controls. It includes importing the app, but not Streamlit, which a
+server has imported before the first session starts. The modules the app imports
+are reported too, since importing OR-Tools or matplotlib at startup is the usual
+cause of a slow cold start.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+APP_PATH = Path(__file__).parents[1] / "tspdashboard" / "app.py"
+
+# The packages that are slow to import and should not be imported at startup
+SLOW_PACKAGES = ("ortools", "matplotlib")
+
+# Measures the import time in a fresh process
+_IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import tspdashboard.app
+seconds = time.perf_counter() - start
+packages = sorted({name.split(".")[0] for name in sys.modules})
+print(json.dumps({"seconds": seconds, "packages": packages}))
+"""
+
+# Measures the time to first render in a fresh process, after importing Streamlit
+_RENDER_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app_test = AppTest.from_file(sys.argv[1], default_timeout=60)
+start = time.perf_counter()
+app_test.run()
+seconds = time.perf_counter() - start
+assert not app_test.exception, app_test.exception
+print(json.dumps({"seconds": seconds}))
+"""
+
+
+def _run_fresh(script: str, *arguments: str) -> dict[str, Any]:
+    """Runs the script in a fresh Python process and returns the JSON it prints."""
+    completed = subprocess.run(
+        [sys.executable, "-c", script, *arguments],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=APP_PATH.parents[1],
+    )
+    result: dict[str, Any] = json.loads(completed.stdout.splitlines()[-1])
+    return result
+
+
+def _timing(seconds: list[float]) -> dict[str, Any]:
+    """The fastest and median times in the format of the benchmark suite."""
+    return {
+        "seconds": min(seconds),
+        "median_seconds": statistics.median(seconds),
+        "repeats": len(seconds),
+    }
+
+
+def startup_benchmarks(repeats: int) -> list[dict[str, Any]]:
+    """Times the import of the app and its first render, each in repeats fresh
+    processes.
+
+    Returns:
+        list[dict[str, Any]]: The results "startup/import_app", which also lists the
+        slow packages imported by the app, and "startup/first_render".
+    """
+    imports = [_run_fresh(_IMPORT_SCRIPT) for _ in range(repeats)]
+    slow_packages = [
+        package for package in SLOW_PACKAGES if package in imports[0]["packages"]
+    ]
+    renders = [_run_fresh(_RENDER_SCRIPT, str(APP_PATH)) for _ in range(repeats)]
+
+    results = [
+        {
+            "name": "startup/import_app",
+            **_timing([result["seconds"] for result in imports]),
+            "objective": None,
+            "slow_packages": slow_packages,
+        },
+        {
+            "name": "startup/first_render",
+            **_timing([result["seconds"] for result in renders]),
+            "objective": None,
+        },
+    ]
+    for result in results:
+        print(f"{result['name']:<40} {result['seconds']:>10.4f} s")
+    if slow_packages:
+        print(f"The app imports {', '.join(slow_packages)} at startup.")
+    return results
+
+
+def main() -> None:
+    """Run the benchmark and print the startup times."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    startup_benchmarks(args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare two benchmark result files and flag regressions.
+
+Run from the root of the repository with:
+
+    poetry run python -m benchmarks.compare baseline.json results.json
+
+A benchmark has regressed if it got slower by more than the time threshold, or if
+the gap of its tour to the known optimum grew by more than the gap threshold. The
+exit code is 1 if any benchmark regressed, so the comparison can fail a CI job.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any
+
+# The default relative slowdown and the absolute increase in the optimality gap that
+# count as regressions
+DEFAULT_TIME_THRESHOLD = 0.25
+DEFAULT_GAP_THRESHOLD = 0.001
+
+
+def load_results(path: str) -> dict[str, dict[str, Any]]:
+    """The results of a benchmark file by name."""
+    with open(path) as file:
+        return {result["name"]: result for result in json.load(file)["results"]}
+
+
+def find_regressions(
+    baseline: dict[str, dict[str, Any]],
+    results: dict[str, dict[str, Any]],
+    time_threshold: float = DEFAULT_TIME_THRESHOLD,
+    gap_threshold: float = DEFAULT_GAP_THRESHOLD,
+) -> list[str]:
+    """Compares the results with the baseline.
+
+    Returns:
+        list[str]: A description of every regression, empty if there are none.
+    """
+    regressions = []
+    for name in sorted(baseline.keys() & results.keys()):
+        old, new = baseline[name], results[name]
+
+        ratio = new["seconds"] / old["seconds"] if old["seconds"] > 0 else 1.0
+        if ratio > 1 + time_threshold:
+            regressions.append(
+                f"{name}: {old['seconds']:.4f} s -> {new['seconds']:.4f} s "
+                f"({(ratio - 1) * 100:+.0f} %)"
+            )
+
+        old_gap, new_gap = old.get("gap"), new.get("gap")
+        if old_gap is not None and new_gap is not None:
+            if new_gap > old_gap + gap_threshold:
+                regressions.append(
+                    f"{name}: gap {old_gap * 100:.2f} % -> {new_gap * 100:.2f} %"
+                )
+
+    return regressions
+
+
+def main() -> None:
+    """Print the change of every benchmark and exit with 1 on regressions."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("results")
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD)
+    parser.add_argument("--gap-threshold", type=float, default=DEFAULT_GAP_THRESHOLD)
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    results = load_results(args.results)
+
+    print(f"{'benchmark':<40} {'baseline':>10} {'results':>10} {'change':>8}")
+    for name in sorted(baseline.keys() & results.keys()):
+        old, new = baseline[name]["seconds"], results[name]["seconds"]
+        change = f"{(new / old - 1) * 100:+7.1f}%" if old > 0 else "-"
+        print(f"{name:<40} {old:>10.4f} {new:>10.4f} {change:>8}")
+
+    regressions = find_regressions(
+        baseline, results, args.time_threshold, args.gap_threshold
+    )
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
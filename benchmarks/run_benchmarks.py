@@ -0,0 +1,282 @@
+"""Benchmark the distance matrix, the heuristics and the exact algorithm.
+
+Run from the root of the repository with:
+
+    poetry run python -m benchmarks.run_benchmarks --output results.json
+
+The suite times the building blocks of the dashboard on seeded random instances of
+increasing size, records the tour quality on the bundled TSPLIB instances relative
+to their known optima, and times the cold start of the dashboard. The results are
+written as JSON, which can be compared between commits with benchmarks.compare to
+flag regressions.
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+import numpy as np
+
+from benchmarks.bench_startup import startup_benchmarks
+from benchmarks.tsplib import KNOWN_OPTIMA, bundled_instances, tour_length
+from tspdashboard.exact_mip_agorithm import exact_algorithm
+from tspdashboard.greedy_algorithm import (
+    greedy_algorithm,
+    multi_start_greedy_algorithm,
+)
+from tspdashboard.instance_io import Instance
+from tspdashboard.local_search import local_search
+from tspdashboard.utilities import generate_distance_matrix
+
+# The instance sizes of the full and the quick (e.g. for CI) suite
+SIZES = {
+    "distance_matrix": [100, 1_000, 5_000],
+    "greedy": [100, 1_000, 5_000],
+    "multi_start_greedy": [1_000, 2_000],
+    "local_search": [100, 1_000, 5_000],
+    "exact_gavish_graves": [8, 12, 16],
+    "exact_dfj": [20, 40, 60],
+}
+QUICK_SIZES = {
+    "distance_matrix": [100, 1_000],
+    "greedy": [100, 1_000],
+    "multi_start_greedy": [1_000],
+    "local_search": [100, 1_000],
+    "exact_gavish_graves": [8, 12],
+    "exact_dfj": [20, 40],
+}
+
+# The numbers of processes the multi-start greedy algorithm is timed on, limited to
+# the number of CPUs
+WORKER_COUNTS = [1, 2, 4, 8]
+
+# The largest TSPLIB instances solved with the exact algorithm
+MAX_CITIES_TSPLIB_EXACT = 100
+
+EXACT_TIME_LIMIT = timedelta(seconds=60)
+
+
+def time_call(function: Callable[[], Any], repeats: int) -> dict[str, Any]:
+    """Calls the function repeats times and returns the fastest and median wall
+    times in seconds, together with the result of the last call."""
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "seconds": min(times),
+        "median_seconds": statistics.median(times),
+        "repeats": repeats,
+        "result": result,
+    }
+
+
+def random_distance_matrix(no_cities: int, seed: int) -> np.ndarray:
+    """The distance matrix of a seeded random instance."""
+    cities_coordinates = np.random.default_rng(seed).random((no_cities, 2))
+    return generate_distance_matrix(cities_coordinates)
+
+
+def sweep_benchmarks(
+    sizes: dict[str, list[int]], seed: int, repeats: int
+) -> list[dict[str, Any]]:
+    """Times each part of the dashboard across its instance sizes."""
+    results = []
+
+    def record(name: str, timing: dict[str, Any], objective: float | None) -> None:
+        timing.pop("result")
+        results.append({"name": name, **timing, "objective": objective})
+        print(f"{name:<40} {timing['seconds']:>10.4f} s")
+
+    for no_cities in sizes["distance_matrix"]:
+        cities_coordinates = np.random.default_rng(seed).random((no_cities, 2))
+        timing = time_call(
+            functools.partial(generate_distance_matrix, cities_coordinates), repeats
+        )
+        record(f"distance_matrix/n={no_cities}", timing, None)
+
+    for no_cities in sizes["greedy"]:
+        distance_matrix = random_distance_matrix(no_cities, seed)
+        timing = time_call(
+            functools.partial(greedy_algorithm, distance_matrix), repeats
+        )
+        record(f"greedy/n={no_cities}", timing, timing["result"][1])
+
+    # Report how the multi-start greedy algorithm scales with the number of cores
+    cpu_count = os.cpu_count() or 1
+    for no_cities in sizes["multi_start_greedy"]:
+        distance_matrix = random_distance_matrix(no_cities, seed)
+        single_worker_seconds = None
+        for no_workers in [count for count in WORKER_COUNTS if count <= cpu_count]:
+            timing = time_call(
+                functools.partial(
+                    multi_start_greedy_algorithm,
+                    distance_matrix,
+                    no_workers=no_workers,
+                ),
+                repeats,
+            )
+            single_worker_seconds = single_worker_seconds or timing["seconds"]
+            timing["speedup"] = single_worker_seconds / timing["seconds"]
+            record(
+                f"multi_start_greedy/n={no_cities}/workers={no_workers}",
+                timing,
+                timing["result"][1],
+            )
+            print(f"{'':<40} {timing['speedup']:>10.2f} x speedup over 1 worker")
+
+    for no_cities in sizes["local_search"]:
+        distance_matrix = random_distance_matrix(no_cities, seed)
+        greedy_tour, _ = greedy_algorithm(distance_matrix)
+        timing = time_call(
+            functools.partial(local_search, greedy_tour, distance_matrix), repeats
+        )
+        record(f"local_search/n={no_cities}", timing, timing["result"][1])
+
+    # The exact solves are slow, so they are only run once
+    for formulation in ("gavish_graves", "dfj"):
+        for no_cities in sizes[f"exact_{formulation}"]:
+            distance_matrix = random_distance_matrix(no_cities, seed)
+            timing = time_call(
+                functools.partial(
+                    exact_algorithm,
+                    distance_matrix,
+                    solve_time_limit=EXACT_TIME_LIMIT,
+                    formulation=formulation,
+                ),
+                repeats=1,
+            )
+            record(f"exact_{formulation}/n={no_cities}", timing, timing["result"][1])
+
+    return results
+
+
+def tsplib_benchmarks(instances: list[Instance], repeats: int) -> list[dict[str, Any]]:
+    """Times the algorithms on the TSPLIB instances and records the gap of their
+    tours to the known optima."""
+    results = []
+
+    def record(
+        instance: Instance,
+        distance_matrix: np.ndarray,
+        algorithm: str,
+        timing: dict[str, Any],
+    ) -> None:
+        tour, _ = timing.pop("result")
+        length = tour_length(tour, distance_matrix)
+        optimum = KNOWN_OPTIMA.get(instance.name)
+        gap = None
+        if optimum is not None:
+            gap = (length - optimum) / optimum
+        results.append(
+            {
+                "name": f"tsplib/{instance.name}/{algorithm}",
+                **timing,
+                "objective": length,
+                "optimum": optimum,
+                "gap": gap,
+            }
+        )
+        gap_text = f"{gap * 100:6.2f} %" if gap is not None else "-"
+        print(f"{results[-1]['name']:<40} {timing['seconds']:>10.4f} s {gap_text:>9}")
+
+    for instance in instances:
+        distance_matrix = instance.distance_matrix()
+        greedy_timing = time_call(
+            functools.partial(greedy_algorithm, distance_matrix), repeats
+        )
+        greedy_tour = greedy_timing["result"][0]
+        record(instance, distance_matrix, "greedy", greedy_timing)
+
+        record(
+            instance,
+            distance_matrix,
+            "local_search",
+            time_call(
+                functools.partial(local_search, greedy_tour, distance_matrix), repeats
+            ),
+        )
+
+        if len(distance_matrix) <= MAX_CITIES_TSPLIB_EXACT:
+            record(
+                instance,
+                distance_matrix,
+                "exact_dfj",
+                time_call(
+                    functools.partial(
+                        exact_algorithm,
+                        distance_matrix,
+                        solve_time_limit=EXACT_TIME_LIMIT,
+                        formulation="dfj",
+                    ),
+                    repeats=1,
+                ),
+            )
+
+    return results
+
+
+def metadata() -> dict[str, Any]:
+    """Where and when the benchmarks were run, to tell result files apart."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def main() -> None:
+    """Run the benchmark suite and write the results to a JSON file."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--quick", action="store_true", help="Only run the smaller instance sizes."
+    )
+    parser.add_argument(
+        "--no-tsplib", action="store_true", help="Skip the TSPLIB instances."
+    )
+    parser.add_argument(
+        "--no-startup", action="store_true", help="Skip the startup benchmarks."
+    )
+    args = parser.parse_args()
+
+    results = sweep_benchmarks(
+        QUICK_SIZES if args.quick else SIZES, seed=args.seed, repeats=args.repeats
+    )
+    if not args.no_tsplib:
+        results += tsplib_benchmarks(bundled_instances(), repeats=args.repeats)
+    if not args.no_startup:
+        results += startup_benchmarks(repeats=args.repeats)
+
+    with open(args.output, "w") as file:
+        json.dump({"metadata": metadata(), "results": results}, file, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
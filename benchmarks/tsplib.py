@@ -0,0 +1,60 @@
+"""The TSPLIB instances bundled with the benchmarks and their known optima.
+
+The instances are read with tspdashboard.instance_io, whose distances follow the
+TSPLIB definitions, including their rounding, so tour lengths can be compared with
+the published optima.
+"""
+
+import math
+from pathlib import Path
+
+import numpy as np
+
+from tspdashboard.instance_io import Instance, read_tour, read_tsplib
+
+DATA_DIRECTORY = Path(__file__).parent / "data"
+
+# The optimal tour lengths published with TSPLIB. Instances are only benchmarked if
+# their file is in the data directory.
+KNOWN_OPTIMA = {
+    "att48": 10628,
+    "att532": 27686,
+    "berlin52": 7542,
+    "burma14": 3323,
+    "eil51": 426,
+    "gr17": 2085,
+    "gr666": 294358,
+    "pcb442": 50778,
+    "ulysses16": 6859,
+}
+
+
+def tour_length(tour: list[int], distance_matrix: np.ndarray) -> float:
+    """The length of a closed tour."""
+    return float(distance_matrix[tour[:-1], tour[1:]].sum())
+
+
+def bundled_instances() -> list[Instance]:
+    """The TSPLIB instances in the data directory, smallest first."""
+    instances = [read_tsplib(path) for path in DATA_DIRECTORY.glob("*.tsp")]
+    return sorted(instances, key=lambda instance: instance.no_cities)
+
+
+def _check_bundled_optima() -> None:
+    """Checks that the optimal tours in the data directory have the known optimal
+    length, i.e. that the distance functions are implemented correctly."""
+    for tour_path in DATA_DIRECTORY.glob("*.opt.tour"):
+        name = tour_path.name.removesuffix(".opt.tour")
+        instance = read_tsplib(DATA_DIRECTORY / f"{name}.tsp")
+        length = tour_length(read_tour(tour_path), instance.distance_matrix())
+        if not math.isclose(length, KNOWN_OPTIMA[name]):
+            raise RuntimeError(
+                f"The optimal tour of {name} has length {length}, "
+                f"not {KNOWN_OPTIMA[name]}."
+            )
+
+
+if __name__ == "__main__":
+    _check_bundled_optima()
+    for instance in bundled_instances():
+        print(instance.name, instance.edge_weight_type, instance.no_cities)
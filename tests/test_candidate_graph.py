@@ -0,0 +1,84 @@
+"""Test the k-nearest-neighbor candidate graph."""
+
+import numpy as np
+import pytest
+
+from tspdashboard.candidate_graph import build_candidate_graph, nearest_unvisited_city
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+
+def test_build_candidate_graph():
+    """Test that the neighbors match the ones found from the full distance matrix."""
+    instance = generate_instance(no_cities=300)
+
+    candidate_graph = build_candidate_graph(instance, no_neighbors=8)
+
+    # Check the shapes and the compact dtypes
+    assert candidate_graph.neighbors.shape == (300, 8)
+    assert candidate_graph.neighbors.dtype == np.int32
+    assert candidate_graph.neighbor_distances.dtype == np.float32
+
+    # Compare with the sorted rows of the distance matrix (excluding the diagonal)
+    distance_matrix = generate_distance_matrix(instance)
+    np.fill_diagonal(distance_matrix, np.inf)
+    expected_distances = np.sort(distance_matrix, axis=1)[:, :8]
+
+    assert np.allclose(candidate_graph.neighbor_distances, expected_distances)
+
+    # Check that the stored distances belong to the stored neighbors
+    assert np.allclose(
+        np.take_along_axis(distance_matrix, candidate_graph.neighbors, axis=1),
+        candidate_graph.neighbor_distances,
+    )
+
+
+def test_build_candidate_graph_clustered():
+    """Test that the neighbors are exact for a strongly clustered instance."""
+    gen = np.random.default_rng(42)
+    instance = np.vstack([gen.random((200, 2)) * 0.001, gen.random((10, 2)) + 5])
+
+    candidate_graph = build_candidate_graph(instance, no_neighbors=12)
+
+    distance_matrix = generate_distance_matrix(instance)
+    np.fill_diagonal(distance_matrix, np.inf)
+    expected_distances = np.sort(distance_matrix, axis=1)[:, :12]
+
+    assert np.allclose(candidate_graph.neighbor_distances, expected_distances)
+
+
+def test_build_candidate_graph_caps_neighbors():
+    """Test that the number of neighbors is capped for tiny instances."""
+    instance = np.array([[0, 0], [0.5, 0.5], [1, 1]])
+
+    candidate_graph = build_candidate_graph(instance, no_neighbors=10)
+
+    assert candidate_graph.neighbors.shape == (3, 2)
+    assert list(candidate_graph.neighbors[0]) == [1, 2]
+
+
+def test_build_candidate_graph_fails_with_wrong_input():
+    """Test the build_candidate_graph function with wrong input."""
+    with pytest.raises(ValueError):
+        build_candidate_graph(np.array([[0.0, 0.0]]))
+
+
+def test_nearest_unvisited_city():
+    """Test that the grid search finds the nearest unvisited city."""
+    instance = generate_instance(no_cities=500)
+    candidate_graph = build_candidate_graph(instance, no_neighbors=5)
+
+    # Mark a random half of the cities as visited
+    visited = np.random.default_rng(1).random(500) < 0.5
+    visited[0] = True
+    unvisited_per_cell = np.bincount(
+        candidate_graph.grid.city_cells[~visited],
+        minlength=candidate_graph.grid.cell_start.shape[0] - 1,
+    )
+
+    nearest_city = nearest_unvisited_city(
+        candidate_graph, 0, visited, unvisited_per_cell
+    )
+
+    distances = np.linalg.norm(instance - instance[0], axis=1)
+    distances[visited] = np.inf
+    assert nearest_city == int(np.argmin(distances))
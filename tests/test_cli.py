@@ -0,0 +1,166 @@
+"""Test the batch solver command line interface."""
+
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+
+from tspdashboard import cli
+from tspdashboard.cli import (
+    ResultWriter,
+    completed_instances,
+    instance_paths,
+    main,
+    run_batch,
+)
+from tspdashboard.instance_io import Instance
+from tspdashboard.jobs import SolverPool
+from tspdashboard.utilities import generate_instance
+
+GR17 = "benchmarks/data/gr17.tsp"
+
+
+def test_instance_paths(tmp_path):
+    """Test that directories and glob patterns are expanded to instance files."""
+    for name in ("a.tsp", "b.csv", "c.txt"):
+        (tmp_path / name).write_text("")
+
+    assert instance_paths([str(tmp_path)]) == [
+        str(tmp_path / "a.tsp"),
+        str(tmp_path / "b.csv"),
+    ]
+    assert instance_paths([str(tmp_path / "*.tsp"), str(tmp_path / "a.tsp")]) == [
+        str(tmp_path / "a.tsp")
+    ]
+    with pytest.raises(ValueError, match="No instance files"):
+        instance_paths([str(tmp_path / "*.atsp")])
+
+
+def test_main_writes_and_resumes(tmp_path, capsys):
+    """Test that the results are written as CSV and that a resumed run skips the
+    solved instances."""
+    output = tmp_path / "results.csv"
+    arguments = [
+        GR17,
+        "--random",
+        "20",
+        "--algorithm",
+        "local_search",
+        "--workers",
+        "2",
+        "--output",
+        str(output),
+    ]
+
+    assert main([*arguments, "--tour-directory", str(tmp_path / "tours")]) == 0
+    with open(output, newline="") as file:
+        rows = {row["instance"]: row for row in csv.DictReader(file)}
+
+    assert set(rows) == {GR17, "random-20-seed0"}
+    assert rows[GR17]["status"] == "done"
+    assert rows[GR17]["no_cities"] == "17"
+    assert float(rows[GR17]["objective"]) >= 2085
+    assert (tmp_path / "tours" / "gr17.local_search.tour").exists()
+    assert completed_instances(output, "local_search") == set(rows)
+    assert completed_instances(output, "routing") == set()
+
+    # Check that nothing is solved or written again
+    assert main([*arguments, "--resume"]) == 0
+    with open(output, newline="") as file:
+        assert len(list(csv.DictReader(file))) == 2
+    assert "Skipping 2 solved instances" in capsys.readouterr().err
+
+
+def test_main_time_limit_json_lines(tmp_path):
+    """Test that an instance exceeding its time limit is reported as timed out in
+    the JSON lines output."""
+    output = tmp_path / "results.jsonl"
+
+    exit_code = main(
+        [
+            "--random",
+            "60",
+            "--algorithm",
+            "exact",
+            "--time-limit",
+            "0.5",
+            "--grace-period",
+            "0",
+            "--output",
+            str(output),
+        ]
+    )
+
+    assert exit_code == 1
+    (row,) = [json.loads(line) for line in output.read_text().splitlines()]
+    assert row["instance"] == "random-60-seed0"
+    assert row["status"] == "timed_out"
+    assert completed_instances(output, "exact") == set()
+
+
+def test_main_decomposition(tmp_path):
+    """Test that random instances are solved with the decomposition, and that
+    TSPLIB instances with explicit distances are reported as failed."""
+    output = tmp_path / "results.jsonl"
+
+    exit_code = main(
+        [
+            GR17,
+            "--random",
+            "50",
+            "--algorithm",
+            "decomposition",
+            "--output",
+            str(output),
+        ]
+    )
+
+    assert exit_code == 1
+    rows = {
+        row["instance"]: row for row in map(json.loads, output.read_text().splitlines())
+    }
+    assert rows["random-50-seed0"]["status"] == "done"
+    assert rows[GR17]["status"] == "failed"
+    assert "Euclidean" in rows[GR17]["error"]
+
+
+def test_run_batch_submits_bounded_window(monkeypatch):
+    """Test that a batch keeps a bounded number of jobs in the pool, instead of
+    submitting every instance up front."""
+    sizes = []
+
+    class RecordingSolverPool(SolverPool):
+        def submit(self, *args, **kwargs):
+            sizes.append(len(self._handles) + 1)
+            return super().submit(*args, **kwargs)
+
+    monkeypatch.setattr(cli, "SolverPool", RecordingSolverPool)
+    jobs = [
+        (f"random-5-seed{seed}", {"no_cities": 5, "seed": seed}) for seed in range(6)
+    ]
+
+    results = run_batch(
+        jobs,
+        "greedy",
+        timedelta(seconds=10),
+        ResultWriter(io.StringIO(), json_lines=True),
+        no_workers=1,
+        grace_period=timedelta(seconds=30),
+    )
+
+    assert sorted(row["instance"] for row in results) == [name for name, _ in jobs]
+    assert all(row["status"] == "done" for row in results)
+    assert max(sizes) == cli.SUBMITTED_JOBS_PER_WORKER
+
+
+def test_solve_exact_without_dense_matrix():
+    """Test that the exact algorithm rejects instances solved on a candidate graph."""
+    instance = Instance(
+        name="large",
+        coordinates=generate_instance(no_cities=cli.MAX_DENSE_CITIES + 1, seed=1),
+    )
+
+    with pytest.raises(ValueError, match="dense distance matrix"):
+        cli._solve(instance, "exact", timedelta(seconds=1))
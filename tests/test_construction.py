@@ -0,0 +1,113 @@
+"""Test the construction heuristics and the choice between them."""
+
+import itertools
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from tspdashboard.candidate_graph import build_candidate_graph
+from tspdashboard.construction import choose_method, construct, hilbert_order
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+METHODS = ["nearest_neighbor", "hilbert", "greedy_edge", "savings"]
+
+
+def check_tour(tour, total_distance, distance_matrix):
+    """Check that the tour visits every city once, starting in city 0, and that the
+    total distance is its length."""
+    no_cities = len(distance_matrix)
+    assert tour[0] == tour[-1] == 0
+    assert sorted(tour[:-1]) == list(range(no_cities))
+    assert total_distance == pytest.approx(
+        sum(distance_matrix[a, b] for a, b in itertools.pairwise(tour))
+    )
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_construct(method):
+    """Test that every method builds a tour from a distance matrix and from a
+    candidate graph, which is not much longer than the nearest neighbor tour."""
+    cities_coordinates = generate_instance(no_cities=200, seed=1)
+    distance_matrix = generate_distance_matrix(cities_coordinates)
+
+    tour, total_distance = construct(
+        distance_matrix, method, cities_coordinates=cities_coordinates
+    )
+    check_tour(tour, total_distance, distance_matrix)
+
+    tour, total_distance = construct(
+        build_candidate_graph(cities_coordinates, no_neighbors=8), method
+    )
+    check_tour(tour, total_distance, distance_matrix)
+
+    _, greedy_distance = greedy_algorithm(distance_matrix)
+    assert total_distance <= 1.5 * greedy_distance
+
+
+def test_construct_edge_heuristics_beat_nearest_neighbor():
+    """Test that the edge heuristics build shorter tours than the nearest neighbor
+    heuristic on a larger instance."""
+    candidate_graph = build_candidate_graph(generate_instance(no_cities=2000, seed=1))
+
+    _, nearest_neighbor_distance = construct(candidate_graph, "nearest_neighbor")
+    for method in ("greedy_edge", "savings"):
+        _, total_distance = construct(candidate_graph, method)
+        assert total_distance < nearest_neighbor_distance
+
+
+def test_hilbert_order():
+    """Test that the Hilbert curve through a square grid only moves between
+    adjacent cells."""
+    cells = np.array(list(itertools.product(range(8), repeat=2)), dtype=np.float64)
+
+    order = hilbert_order(cells)
+
+    assert sorted(order) == list(range(64))
+    steps = np.abs(np.diff(cells[order], axis=0)).sum(axis=1)
+    assert (steps == 1).all()
+
+
+def test_construct_small_and_asymmetric_instances():
+    """Test the instances with fewer than three cities and asymmetric distances."""
+    tour, total_distance = construct(np.array([[0, 2], [2, 0]]), "greedy_edge")
+    assert tour == [0, 1, 0]
+    assert total_distance == 4
+
+    distance_matrix = np.array([[0, 1, 2], [5, 0, 1], [2, 1, 0]])
+    assert construct(distance_matrix) == greedy_algorithm(distance_matrix)
+    with pytest.raises(ValueError):
+        construct(distance_matrix, "savings")
+
+
+def test_construct_from_coordinates():
+    """Test that a tour can be built from the coordinates alone, and that the
+    Hilbert curve needs coordinates."""
+    cities_coordinates = generate_instance(no_cities=100, seed=2)
+    distance_matrix = generate_distance_matrix(cities_coordinates)
+
+    for method in METHODS:
+        tour, total_distance = construct(
+            method=method, cities_coordinates=cities_coordinates
+        )
+        check_tour(tour, total_distance, distance_matrix)
+
+    with pytest.raises(ValueError):
+        construct(distance_matrix, "hilbert")
+
+
+def test_choose_method():
+    """Test that the method is chosen by the size, the time limit and what is
+    known about the instance."""
+    assert choose_method(1_000) == "savings"
+    assert choose_method(150_000) == "greedy_edge"
+    assert choose_method(5_000_000) == "hilbert"
+    assert choose_method(50_000, time_limit=timedelta(seconds=0.5)) == "hilbert"
+    assert choose_method(5_000_000, has_coordinates=False) == "greedy_edge"
+    assert choose_method(1_000, symmetric=False) == "nearest_neighbor"
+    assert choose_method(150_000, has_distances=False) == "greedy_edge"
+    assert (
+        choose_method(100_000, time_limit=timedelta(seconds=3), has_distances=False)
+        == "hilbert"
+    )
@@ -0,0 +1,129 @@
+"""Test the decomposition of tours into windows that are solved exactly."""
+
+import itertools
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from tspdashboard.candidate_graph import build_candidate_graph
+from tspdashboard.decomposition import _solve_path, decomposition_algorithm
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.local_search import local_search
+from tspdashboard.utilities import generate_instance, tour_length, validate_tour
+
+TIME_LIMIT = timedelta(seconds=10)
+
+
+def _path_length(cities_coordinates, path):
+    """The length of the open path through the cities."""
+    return tour_length(path, cities_coordinates=cities_coordinates)
+
+
+def test_solve_path():
+    """Test that the path of the dynamic program runs from the first to the last
+    city and is optimal."""
+    cities_coordinates = generate_instance(no_cities=8, seed=1)
+
+    path = _solve_path(cities_coordinates, 20, TIME_LIMIT)
+
+    assert path[0] == 0
+    assert path[-1] == 7
+    optimum = min(
+        _path_length(cities_coordinates, [0, *cities, 7])
+        for cities in itertools.permutations(range(1, 7))
+    )
+    assert _path_length(cities_coordinates, path) == pytest.approx(optimum)
+
+
+def test_solve_path_mip():
+    """Test that the path of the MIP model is at most as long as the heuristic path
+    it starts from."""
+    cities_coordinates = generate_instance(no_cities=24, seed=1)
+
+    heuristic_path = _solve_path(cities_coordinates, 0, TIME_LIMIT)
+    path = _solve_path(cities_coordinates, 30, TIME_LIMIT)
+
+    for solved_path in (heuristic_path, path):
+        assert solved_path[0] == 0
+        assert solved_path[-1] == 23
+        assert sorted(solved_path) == list(range(24))
+    assert (
+        _path_length(cities_coordinates, path)
+        <= _path_length(cities_coordinates, heuristic_path) + 1e-9
+    )
+
+
+def test_decomposition_algorithm():
+    """Test that the tour is valid and shorter than the local search tour it starts
+    from."""
+    cities_coordinates = generate_instance(no_cities=300, seed=1)
+    candidate_graph = build_candidate_graph(cities_coordinates)
+    tour, _ = greedy_algorithm(candidate_graph)
+    _, local_search_length = local_search(tour, candidate_graph)
+
+    tour, total_distance = decomposition_algorithm(cities_coordinates)
+
+    validate_tour(tour, 300)
+    assert tour[0] == 0
+    assert total_distance == pytest.approx(
+        tour_length(tour, cities_coordinates=cities_coordinates)
+    )
+    assert total_distance < local_search_length
+
+
+def test_decomposition_algorithm_initial_tour():
+    """Test that an initial tour is improved and rotated to start in city 0."""
+    cities_coordinates = generate_instance(no_cities=100, seed=2)
+    initial_tour = [*range(50, 100), *range(50), 50]
+
+    tour, total_distance = decomposition_algorithm(
+        cities_coordinates, initial_tour=initial_tour, max_passes=2
+    )
+
+    validate_tour(tour, 100)
+    assert tour[0] == 0
+    assert total_distance < tour_length(
+        initial_tour, cities_coordinates=cities_coordinates
+    )
+
+    # Check that no passes leave the tour as it is
+    tour, _ = decomposition_algorithm(
+        cities_coordinates, initial_tour=initial_tour, max_passes=0
+    )
+    assert tour == [*range(50), *range(50, 100), 0]
+
+
+@pytest.mark.parametrize("no_cities", [2, 3, 5, 13])
+def test_decomposition_algorithm_small(no_cities):
+    """Test instances smaller than a window."""
+    cities_coordinates = generate_instance(no_cities=no_cities, seed=1)
+
+    tour, _ = decomposition_algorithm(cities_coordinates)
+
+    validate_tour(tour, no_cities)
+
+
+def test_decomposition_algorithm_workers():
+    """Test that solving the windows in worker processes gives the same tour."""
+    cities_coordinates = generate_instance(no_cities=200, seed=3)
+
+    assert decomposition_algorithm(
+        cities_coordinates, no_workers=2
+    ) == decomposition_algorithm(cities_coordinates)
+
+
+def test_decomposition_algorithm_invalid_arguments():
+    """Test that invalid arguments are rejected."""
+    cities_coordinates = generate_instance(no_cities=20, seed=1)
+
+    with pytest.raises(ValueError):
+        decomposition_algorithm(np.zeros((10, 3)))
+    with pytest.raises(ValueError):
+        decomposition_algorithm(cities_coordinates[:1])
+    with pytest.raises(ValueError):
+        decomposition_algorithm(cities_coordinates, window_size=3)
+    with pytest.raises(ValueError):
+        decomposition_algorithm(cities_coordinates, no_workers=0)
+    with pytest.raises(ValueError):
+        decomposition_algorithm(cities_coordinates, initial_tour=[0, 1, 0])
@@ -1,8 +1,14 @@
 """Test the exact algorithm for the TSP problem."""
 
+import itertools
+
 import numpy as np
+import pytest
 
-from tspdashboard.exact_mip_agorithm import exact_algorithm
+from tspdashboard.exact_mip_agorithm import build_model, exact_algorithm
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.instrumentation import record_performance
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
 
 
 def test_exact_algorithm():
@@ -25,3 +31,174 @@ def test_exact_algorithm():
 
     # Check that the total distance is correct
     assert int(total_distance) == 6
+
+
+def test_exact_algorithm_dfj():
+    """Test the exact_algorithm function with the DFJ formulation."""
+    # The same simple distance matrix as above
+    distance_matrix = np.array([[0, 1, 2], [1, 0, 3], [2, 3, 0]])
+
+    tour, total_distance = exact_algorithm(
+        distance_matrix=distance_matrix,
+        formulation="dfj",
+        dynamic_programming_max_cities=0,
+    )
+
+    # Check that the tour is [0, 1, 2, 0] with a total distance of 6
+    assert np.array_equal(tour, np.array([0, 1, 2, 0]))
+    assert int(total_distance) == 6
+
+
+def test_exact_algorithm_formulations_agree():
+    """Test that both formulations find a tour of the same (optimal) length."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=10))
+
+    _, gavish_graves_distance = exact_algorithm(
+        distance_matrix=distance_matrix,
+        formulation="gavish_graves",
+        dynamic_programming_max_cities=0,
+    )
+    dfj_tour, dfj_distance = exact_algorithm(
+        distance_matrix=distance_matrix,
+        formulation="dfj",
+        dynamic_programming_max_cities=0,
+    )
+
+    # Check that the DFJ tour visits all cities once and has the same length
+    assert sorted(dfj_tour[:-1]) == list(range(10))
+    assert dfj_tour[0] == dfj_tour[-1] == 0
+    assert dfj_distance == pytest.approx(gavish_graves_distance)
+
+
+def test_exact_algorithm_dfj_fails_with_asymmetric_input():
+    """Test that the DFJ formulation rejects an asymmetric distance matrix."""
+    distance_matrix = np.array([[0, 1, 2], [5, 0, 3], [2, 3, 0]])
+
+    with pytest.raises(ValueError):
+        exact_algorithm(distance_matrix=distance_matrix, formulation="dfj")
+
+
+def test_build_model():
+    """Test that the model has no variables on the diagonal and optional names."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=5))
+
+    model, x = build_model(distance_matrix)
+
+    # Check that there is an arc variable for every pair of different cities
+    assert len(x) == 5 * 4
+    assert (2, 2) not in x
+
+    # Check that the x and f variables are unnamed by default
+    assert all(variable.name == "" for variable in model.variables())
+
+    model, x = build_model(distance_matrix, variable_names=True)
+    assert x[1, 3].name == "x[1,3]"
+
+
+def test_exact_algorithm_reuses_model():
+    """Test that solving two instances of the same size gives the right objectives
+    although the model of the first solve is reused for the second."""
+    first_distance_matrix = np.array([[0, 1, 2], [1, 0, 3], [2, 3, 0]])
+    second_distance_matrix = first_distance_matrix * 10
+
+    _, first_total_distance = exact_algorithm(
+        distance_matrix=first_distance_matrix, dynamic_programming_max_cities=0
+    )
+    _, second_total_distance = exact_algorithm(
+        distance_matrix=second_distance_matrix, dynamic_programming_max_cities=0
+    )
+
+    assert int(first_total_distance) == 6
+    assert int(second_total_distance) == 60
+
+
+@pytest.mark.parametrize("formulation", ["gavish_graves", "dfj"])
+def test_exact_algorithm_warm_start(formulation):
+    """Test that warm starting from the greedy tour gives the optimal objective, which
+    is the length of the returned tour."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=12))
+    greedy_tour, greedy_distance = greedy_algorithm(distance_matrix, start_city=3)
+
+    _, cold_distance = exact_algorithm(
+        distance_matrix, formulation=formulation, dynamic_programming_max_cities=0
+    )
+    tour, warm_distance = exact_algorithm(
+        distance_matrix,
+        formulation=formulation,
+        initial_tour=greedy_tour,
+        dynamic_programming_max_cities=0,
+    )
+
+    # Check that the objective is the length of the tour, not a bound
+    tour_distance = sum(distance_matrix[a, b] for a, b in itertools.pairwise(tour))
+    assert warm_distance == pytest.approx(tour_distance)
+    assert warm_distance == pytest.approx(cold_distance)
+    assert warm_distance <= greedy_distance + 1e-9
+
+
+def test_exact_algorithm_rejects_invalid_initial_tour():
+    """Test that an initial tour that is not a permutation of the cities fails."""
+    distance_matrix = np.array([[0, 1, 2], [1, 0, 3], [2, 3, 0]])
+
+    with pytest.raises(ValueError):
+        exact_algorithm(distance_matrix, initial_tour=[0, 1, 1, 0])
+
+
+@pytest.mark.parametrize("formulation", ["gavish_graves", "dfj"])
+def test_exact_algorithm_reports_progress(formulation):
+    """Test that the progress callback ends with the optimal objective and no gap."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=10))
+    reports = []
+
+    _, total_distance = exact_algorithm(
+        distance_matrix,
+        formulation=formulation,
+        progress_callback=reports.append,
+        dynamic_programming_max_cities=0,
+    )
+
+    assert reports
+    assert reports[-1].incumbent_objective == pytest.approx(total_distance)
+    assert reports[-1].gap == pytest.approx(0, abs=1e-4)
+
+
+def test_exact_algorithm_asymmetric():
+    """Test that the Gavish-Graves formulation finds the optimal tour of an
+    asymmetric instance, where the direction of travel matters."""
+    distance_matrix = np.random.default_rng(1).integers(1, 100, size=(7, 7))
+    np.fill_diagonal(distance_matrix, 0)
+
+    tour, total_distance = exact_algorithm(
+        distance_matrix, dynamic_programming_max_cities=0
+    )
+
+    # Check against all tours starting in city 0, in both directions
+    optimum = min(
+        sum(distance_matrix[a, b] for a, b in itertools.pairwise([0, *cities, 0]))
+        for cities in itertools.permutations(range(1, 7))
+    )
+    assert total_distance == pytest.approx(optimum)
+    assert sum(
+        distance_matrix[a, b] for a, b in itertools.pairwise(tour)
+    ) == pytest.approx(optimum)
+
+
+def test_exact_algorithm_dynamic_programming():
+    """Test that small instances are solved with the dynamic program, which finds
+    the same optimal objective as the model and reports it without a gap."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=10))
+    reports = []
+
+    with record_performance("exact") as record:
+        tour, total_distance = exact_algorithm(
+            distance_matrix, progress_callback=reports.append
+        )
+    _, model_distance = exact_algorithm(
+        distance_matrix, formulation="dfj", dynamic_programming_max_cities=0
+    )
+
+    assert [phase.name for phase in record.phases] == ["held_karp_algorithm"]
+    assert sorted(tour[:-1]) == list(range(10))
+    assert total_distance == pytest.approx(model_distance)
+    assert len(reports) == 1
+    assert reports[0].gap == 0
@@ -1,8 +1,20 @@
 """Test the greedy algorithm for the TSP problem."""
 
+from pathlib import Path
+
 import numpy as np
+import pytest
+
+from tspdashboard.candidate_graph import build_candidate_graph
+from tspdashboard.greedy_algorithm import greedy_algorithm, multi_start_greedy_algorithm
+from tspdashboard.instance_io import read_instance
+from tspdashboard.utilities import (
+    generate_distance_matrix,
+    generate_instance,
+    tour_length,
+)
 
-from tspdashboard.greedy_algorithm import greedy_algorithm
+DATA_DIRECTORY = Path(__file__).parents[1] / "benchmarks" / "data"
 
 
 def test_greedy_algorithm():
@@ -49,3 +61,126 @@ def test_greedy_starting_city():
 
     # Check that the total distance is correct
     assert total_distance == 6
+
+
+def test_greedy_candidate_graph():
+    """Test that the greedy algorithm on a candidate graph gives the same tour as on
+    the distance matrix."""
+    instance = generate_instance(no_cities=200)
+
+    tour, total_distance = greedy_algorithm(generate_distance_matrix(instance))
+    candidate_tour, candidate_total_distance = greedy_algorithm(
+        build_candidate_graph(instance, no_neighbors=5)
+    )
+
+    # Check that the tours are identical and the distances are the same
+    assert candidate_tour == tour
+    assert candidate_total_distance == pytest.approx(total_distance)
+
+
+def test_greedy_methods_give_identical_tours():
+    """Test that the loop and argmin methods give the same tour and distance, also
+    when there are ties."""
+    # All distances are equal, so every step is a tie
+    tied_distance_matrix = np.ones((6, 6)) - np.eye(6)
+
+    for distance_matrix in (
+        generate_distance_matrix(generate_instance(no_cities=100)),
+        tied_distance_matrix,
+    ):
+        loop_tour, loop_total_distance = greedy_algorithm(
+            distance_matrix, start_city=3, method="loop"
+        )
+        argmin_tour, argmin_total_distance = greedy_algorithm(
+            distance_matrix, start_city=3, method="argmin"
+        )
+
+        assert argmin_tour == loop_tour
+        assert argmin_total_distance == loop_total_distance
+
+
+def test_greedy_method_fails_with_wrong_input():
+    """Test that methods which do not match the input raise an error."""
+    instance = generate_instance(no_cities=10)
+
+    with pytest.raises(ValueError):
+        greedy_algorithm(generate_distance_matrix(instance), method="spatial")
+
+    with pytest.raises(ValueError):
+        greedy_algorithm(build_candidate_graph(instance), method="argmin")
+
+
+def test_multi_start_greedy_algorithm():
+    """Test that the multi-start greedy algorithm finds the best tour over all start
+    cities, rotated to start in city 0."""
+    # Rounded coordinates on a small grid give many ties between distances
+    rng = np.random.default_rng(3)
+    cities_coordinates = rng.integers(0, 6, size=(40, 2)).astype(np.float64)
+    distance_matrix = generate_distance_matrix(cities_coordinates + rng.random((40, 2)))
+
+    tour, total_distance = multi_start_greedy_algorithm(distance_matrix)
+
+    best_tour, best_distance = min(
+        (greedy_algorithm(distance_matrix, start_city=city) for city in range(40)),
+        key=lambda result: result[1],
+    )
+    start = best_tour.index(0)
+    assert tour == best_tour[start:-1] + best_tour[:start] + [0]
+    assert total_distance == pytest.approx(best_distance)
+
+
+def test_multi_start_greedy_algorithm_in_processes():
+    """Test that spreading sampled start cities over processes gives the same tour as
+    running them in the calling process."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=30))
+
+    tour, total_distance = multi_start_greedy_algorithm(
+        distance_matrix, start_cities=10, seed=0
+    )
+    parallel_tour, parallel_total_distance = multi_start_greedy_algorithm(
+        distance_matrix, start_cities=10, seed=0, no_workers=2
+    )
+
+    assert parallel_tour == tour
+    assert parallel_total_distance == total_distance
+    assert tour[0] == tour[-1] == 0
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_multi_start_greedy_algorithm_objective(seed):
+    """Test that the objective is exactly the length of the rotated tour, which
+    local search and the other solvers compare it with."""
+    distance_matrix = generate_distance_matrix(
+        generate_instance(no_cities=10, seed=seed)
+    )
+
+    tour, total_distance = multi_start_greedy_algorithm(distance_matrix)
+
+    assert total_distance == tour_length(tour, distance_matrix)
+
+
+def test_multi_start_greedy_algorithm_integer_distances():
+    """Test that integer distance matrices, like the rounded distances of TSPLIB
+    files, give the same tours as the same distances as floats."""
+    distance_matrix = read_instance(DATA_DIRECTORY / "pcb442.tsp").distance_matrix()
+    assert np.issubdtype(distance_matrix.dtype, np.integer)
+
+    tour, total_distance = multi_start_greedy_algorithm(distance_matrix)
+
+    assert (tour, total_distance) == multi_start_greedy_algorithm(
+        distance_matrix.astype(np.float64)
+    )
+    assert total_distance == tour_length(tour, distance_matrix)
+
+
+def test_greedy_asymmetric():
+    """Test that the greedy algorithms follow the distances from the current city
+    when the distance matrix is asymmetric."""
+    distance_matrix = np.array(
+        [[0, 1, 9, 9], [9, 0, 1, 9], [9, 9, 0, 1], [1, 9, 9, 0]], dtype=np.float64
+    )
+
+    # Going 0 -> 1 -> 2 -> 3 -> 0 costs 4, the other direction costs 36
+    assert greedy_algorithm(distance_matrix, method="loop") == ([0, 1, 2, 3, 0], 4)
+    assert greedy_algorithm(distance_matrix) == ([0, 1, 2, 3, 0], 4)
+    assert multi_start_greedy_algorithm(distance_matrix) == ([0, 1, 2, 3, 0], 4)
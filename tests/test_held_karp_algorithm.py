@@ -0,0 +1,55 @@
+"""Test the dynamic programming algorithm of Held and Karp."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from tspdashboard.held_karp_algorithm import MAX_CITIES, held_karp_algorithm
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+
+def test_held_karp_algorithm():
+    """Test that the tour of a simple instance starts with the first city."""
+    distance_matrix = np.array([[0, 1, 2], [1, 0, 3], [2, 3, 0]])
+
+    tour, total_distance = held_karp_algorithm(distance_matrix)
+
+    assert tour == [0, 1, 2, 0]
+    assert total_distance == 6
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_held_karp_algorithm_asymmetric(seed):
+    """Test that the tour of an asymmetric instance is the shortest of all tours in
+    both directions."""
+    distance_matrix = np.random.default_rng(seed).integers(1, 100, size=(7, 7))
+    np.fill_diagonal(distance_matrix, 0)
+
+    tour, total_distance = held_karp_algorithm(distance_matrix)
+
+    optimum = min(
+        sum(distance_matrix[a, b] for a, b in itertools.pairwise([0, *cities, 0]))
+        for cities in itertools.permutations(range(1, 7))
+    )
+    assert total_distance == pytest.approx(optimum)
+    assert sum(
+        distance_matrix[a, b] for a, b in itertools.pairwise(tour)
+    ) == pytest.approx(optimum)
+
+
+def test_held_karp_algorithm_workers():
+    """Test that splitting the layers over threads gives the same tour."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=12))
+
+    assert held_karp_algorithm(distance_matrix, no_workers=3) == held_karp_algorithm(
+        distance_matrix
+    )
+
+
+def test_held_karp_algorithm_size_limits():
+    """Test the smallest and the too large instances."""
+    assert held_karp_algorithm(np.array([[0, 2], [3, 0]])) == ([0, 1, 0], 5.0)
+
+    with pytest.raises(ValueError):
+        held_karp_algorithm(np.zeros((MAX_CITIES + 1, MAX_CITIES + 1)))
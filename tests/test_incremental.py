@@ -0,0 +1,117 @@
+"""Test re-optimizing a tour after cities are added, removed or moved."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.incremental import (
+    add_cities,
+    cheapest_insertion,
+    incremental_solution,
+    move_cities,
+    remove_cities,
+)
+from tspdashboard.local_search import local_search, nearest_neighbors
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+
+def solved_instance(no_cities, metric="euclidean"):
+    """An instance solved with the greedy algorithm and the local search."""
+    cities_coordinates = generate_instance(no_cities=no_cities, seed=1)
+    distance_matrix = generate_distance_matrix(cities_coordinates, metric=metric)
+    tour, _ = local_search(greedy_algorithm(distance_matrix)[0], distance_matrix)
+    return incremental_solution(
+        cities_coordinates, distance_matrix, tour, metric=metric
+    )
+
+
+def check_solution(solution):
+    """Check that the solution matches a solution computed from scratch."""
+    no_cities = solution.cities_coordinates.shape[0]
+    distance_matrix = generate_distance_matrix(
+        solution.cities_coordinates, metric=solution.metric
+    )
+    np.testing.assert_allclose(solution.distance_matrix, distance_matrix)
+
+    # Check that the neighbor lists have the distances of the nearest neighbors
+    rows = np.arange(no_cities)[:, np.newaxis]
+    neighbors = nearest_neighbors(distance_matrix, solution.neighbors.shape[1])
+    np.testing.assert_allclose(
+        distance_matrix[rows, solution.neighbors], distance_matrix[rows, neighbors]
+    )
+
+    # Check that the tour visits every city once, starting in city 0
+    assert solution.tour[0] == solution.tour[-1] == 0
+    assert sorted(solution.tour[:-1]) == list(range(no_cities))
+    assert solution.objective == pytest.approx(
+        sum(distance_matrix[a, b] for a, b in itertools.pairwise(solution.tour))
+    )
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "manhattan"])
+def test_edit_cities(metric):
+    """Test that adding, removing and moving cities gives the same distances and
+    neighbors as computing them from scratch, and a tour close to a new solve."""
+    rng = np.random.default_rng(0)
+    solution = solved_instance(300, metric=metric)
+
+    solution = add_cities(solution, rng.random((5, 2)))
+    assert solution.cities_coordinates.shape[0] == 305
+    check_solution(solution)
+
+    solution = remove_cities(solution, [0, 17, 304])
+    assert solution.cities_coordinates.shape[0] == 302
+    check_solution(solution)
+
+    solution = move_cities(solution, [3, 10], rng.random((2, 2)))
+    check_solution(solution)
+
+    # Check that the repaired tour is close to solving the edited instance again
+    _, objective = local_search(
+        greedy_algorithm(solution.distance_matrix)[0], solution.distance_matrix
+    )
+    assert solution.objective <= 1.05 * objective
+
+
+def test_move_cities_copies_distance_matrix():
+    """Test that moving cities leaves the distance matrix of the old solution, which
+    may be shared with other solutions, unchanged."""
+    solution = solved_instance(20)
+    distance_matrix = solution.distance_matrix.copy()
+
+    moved = move_cities(solution, [3], [[0.5, 0.5]])
+
+    np.testing.assert_array_equal(solution.distance_matrix, distance_matrix)
+    check_solution(moved)
+
+
+def test_edit_small_instances():
+    """Test editing instances with fewer cities than neighbors."""
+    solution = solved_instance(3)
+
+    solution = add_cities(solution, [[0.5, 0.5]])
+    check_solution(solution)
+
+    solution = remove_cities(solution, [1, 2])
+    check_solution(solution)
+    assert solution.tour == [0, 1, 0]
+
+    with pytest.raises(ValueError, match="at least 2 cities"):
+        remove_cities(solution, [0])
+
+
+def test_cheapest_insertion():
+    """Test that a city is inserted where it lengthens the tour the least."""
+    cities_coordinates = np.array([[0, 0], [1, 0], [1, 1], [0, 1], [1, 0.5]])
+    distance_matrix = generate_distance_matrix(cities_coordinates)
+
+    assert cheapest_insertion([0, 1, 2, 3, 0], distance_matrix, [4]) == [
+        0,
+        1,
+        4,
+        2,
+        3,
+        0,
+    ]
@@ -0,0 +1,176 @@
+"""Test reading instances from files and writing tours."""
+
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tspdashboard import instance_io
+from tspdashboard.exact_mip_agorithm import exact_algorithm
+from tspdashboard.instance_io import (
+    read_csv,
+    read_instance,
+    read_tour,
+    read_tsplib,
+    write_tour,
+)
+
+DATA_DIRECTORY = Path(__file__).parents[1] / "benchmarks" / "data"
+
+EUC_2D_INSTANCE = """NAME : square
+TYPE : TSP
+DIMENSION : 4
+EDGE_WEIGHT_TYPE : EUC_2D
+NODE_COORD_SECTION
+1 0 0
+2 0 10.4
+3 10.6 10.4
+4 10.6 0
+EOF
+"""
+
+EXPLICIT_INSTANCE = """NAME: rectangle
+TYPE: TSP
+DIMENSION: 4
+EDGE_WEIGHT_TYPE: EXPLICIT
+EDGE_WEIGHT_FORMAT: UPPER_ROW
+EDGE_WEIGHT_SECTION
+ 3 4 5
+ 5 4
+ 3
+EOF
+"""
+
+ATSP_INSTANCE = """NAME: one_way
+TYPE: ATSP
+DIMENSION: 3
+EDGE_WEIGHT_TYPE: EXPLICIT
+EDGE_WEIGHT_FORMAT: FULL_MATRIX
+EDGE_WEIGHT_SECTION
+ 0 1 5
+ 5 0 1
+ 1 5 0
+EOF
+"""
+
+
+def test_read_tsplib_node_coordinates():
+    """Test that the coordinates are read and the distances rounded as in TSPLIB."""
+    instance = read_tsplib(io.StringIO(EUC_2D_INSTANCE))
+
+    assert instance.name == "square"
+    assert instance.no_cities == 4
+    assert np.array_equal(instance.coordinates[2], [10.6, 10.4])
+
+    # Check that 10.4 is rounded down and 10.6 up
+    distance_matrix = instance.distance_matrix()
+    assert distance_matrix[0, 1] == 10
+    assert distance_matrix[0, 3] == 11
+
+
+def test_read_tsplib_explicit():
+    """Test that explicit edge weights are read and the cities get a layout."""
+    instance = read_tsplib(io.BytesIO(EXPLICIT_INSTANCE.encode()))
+
+    distance_matrix = instance.distance_matrix()
+    assert np.array_equal(
+        distance_matrix, [[0, 3, 4, 5], [3, 0, 5, 4], [4, 5, 0, 3], [5, 4, 3, 0]]
+    )
+    assert instance.coordinates.shape == (4, 2)
+
+    _, total_distance = exact_algorithm(distance_matrix)
+    assert int(total_distance) == 14
+
+
+@pytest.mark.parametrize(("name", "optimum"), [("pcb442", 50778), ("gr666", 294358)])
+def test_read_tsplib_matches_known_optimum(name, optimum):
+    """Test that the optimal tours of the bundled instances have the published
+    length, i.e. that the TSPLIB distances are implemented correctly."""
+    instance = read_instance(DATA_DIRECTORY / f"{name}.tsp")
+    tour = read_tour(DATA_DIRECTORY / f"{name}.opt.tour")
+
+    distance_matrix = instance.distance_matrix()
+    assert distance_matrix[tour[:-1], tour[1:]].sum() == optimum
+
+
+def test_read_tsplib_asymmetric():
+    """Test that an ATSP file keeps the direction of its edge weights."""
+    instance = read_instance(io.StringIO(ATSP_INSTANCE), filename="one_way.atsp")
+
+    distance_matrix = instance.distance_matrix()
+    assert distance_matrix[0, 1] == 1
+    assert distance_matrix[1, 0] == 5
+    assert instance.coordinates.shape == (3, 2)
+
+    # Check that a TSP file with asymmetric edge weights fails
+    with pytest.raises(ValueError):
+        read_tsplib(io.StringIO(ATSP_INSTANCE.replace("ATSP", "TSP")))
+
+
+def test_read_tsplib_unsupported():
+    """Test that an unsupported EDGE_WEIGHT_TYPE fails."""
+    with pytest.raises(ValueError):
+        read_tsplib(io.StringIO(EUC_2D_INSTANCE.replace("EUC_2D", "EUC_3D")))
+
+
+def test_read_instance_max_cities():
+    """Test that instances with more cities than the limit are rejected, and
+    instances at the limit are read."""
+    for source, filename in (
+        (EUC_2D_INSTANCE, "euc_2d.tsp"),
+        (EXPLICIT_INSTANCE, "explicit.tsp"),
+        ("x,y\n0,0\n1,0\n0,1\n1,1\n", "cities.csv"),
+    ):
+        instance = read_instance(io.StringIO(source), filename, max_cities=4)
+        assert instance.no_cities == 4
+
+        with pytest.raises(ValueError, match="more than the limit"):
+            read_instance(io.StringIO(source), filename, max_cities=3)
+
+
+def test_read_csv():
+    """Test reading a CSV file with and without a header."""
+    with_header = read_csv(io.BytesIO(b"id,y,x\n1,0.5,0.25\n2,1,2\n"))
+    assert np.array_equal(with_header.coordinates, [[0.25, 0.5], [2, 1]])
+
+    without_header = read_csv(io.StringIO("0.5,0.25\n1,2"))
+    assert np.array_equal(without_header.coordinates, [[0.5, 0.25], [1, 2]])
+    assert without_header.edge_weight_type is None
+    assert without_header.metric == "euclidean"
+
+    # Check that latitudes and longitudes are read as (longitude, latitude) with
+    # great-circle distances
+    geographic = read_csv(
+        io.StringIO("name,lat,lon\nParis,48.86,2.35\nLondon,51.51,-0.13")
+    )
+    assert np.array_equal(geographic.coordinates, [[2.35, 48.86], [-0.13, 51.51]])
+    assert geographic.metric == "haversine"
+    assert geographic.distance_matrix()[0, 1] == pytest.approx(343, rel=0.01)
+
+
+def test_read_memory_mapped(tmp_path, monkeypatch):
+    """Test that large files are read in chunks into a memory-mapped array."""
+    monkeypatch.setattr(instance_io, "MEMMAP_THRESHOLD_ROWS", 2)
+    monkeypatch.setattr(instance_io, "CHUNK_ROWS", 3)
+
+    coordinates = np.random.default_rng(0).random((10, 2))
+    path = tmp_path / "cities.csv"
+    np.savetxt(path, coordinates, delimiter=",", header="x,y", comments="")
+
+    instance = read_instance(path)
+    assert isinstance(instance.coordinates, np.memmap)
+    assert np.allclose(instance.coordinates, coordinates)
+
+    # Check that the coordinates can be kept in a .npy file
+    read_csv(path, memmap_path=tmp_path / "cities.npy")
+    assert np.allclose(np.load(tmp_path / "cities.npy"), coordinates)
+
+
+def test_write_tour():
+    """Test that a written tour is read back as the same tour."""
+    tour_file = io.StringIO()
+    write_tour(tour_file, [0, 2, 1, 3, 0], name="square")
+
+    assert "DIMENSION : 4" in tour_file.getvalue()
+    assert read_tour(io.StringIO(tour_file.getvalue())) == [0, 2, 1, 3, 0]
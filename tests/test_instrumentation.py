@@ -0,0 +1,128 @@
+"""Test the timing and memory measurements of the solvers."""
+
+import json
+import threading
+import tracemalloc
+
+import numpy as np
+
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.instrumentation import (
+    PERFORMANCE_LOG_ENVIRONMENT_VARIABLE,
+    PROFILE_DIRECTORY_ENVIRONMENT_VARIABLE,
+    add_attributes,
+    record_performance,
+    record_rows,
+    recording,
+    timed,
+)
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+
+def test_record_performance_nested_phases():
+    """Test that nested phases are recorded with their depth and peak memory."""
+    with record_performance("test") as record:
+        assert recording()
+        with timed("outer"):
+            add_attributes(no_cities=10)
+            with timed("inner"):
+                array = np.ones(1_000_000)
+                del array
+            array = np.ones(100_000)
+            del array
+
+    assert not recording()
+    assert [(phase.name, phase.depth) for phase in record.phases] == [
+        ("outer", 0),
+        ("inner", 1),
+    ]
+    outer, inner = record.phases
+    assert outer.attributes == {"no_cities": 10}
+
+    # Check that the peak of the inner phase is included in the outer phase and
+    # the request
+    assert inner.peak_memory_bytes >= 8_000_000
+    assert outer.peak_memory_bytes >= inner.peak_memory_bytes
+    assert record.peak_memory_bytes >= outer.peak_memory_bytes
+    assert record.seconds >= outer.seconds >= inner.seconds
+
+    rows = record_rows(record)
+    assert [row["phase"] for row in rows] == ["test", "  outer", "    inner"]
+
+
+def test_record_performance_overlapping_threads():
+    """Test that requests overlapping in different threads report no memory, since
+    tracemalloc is shared by the threads, and that memory is traced again after
+    them."""
+    started = threading.Event()
+    finished = threading.Event()
+    records = {}
+
+    def other_request():
+        with record_performance("other") as record:
+            started.set()
+            array = np.ones(5_000_000)
+            del array
+            finished.wait(timeout=10)
+        records["other"] = record
+
+    thread = threading.Thread(target=other_request)
+    thread.start()
+    started.wait(timeout=10)
+    with record_performance("test") as record, timed("phase"):
+        array = np.ones(1_000)
+        del array
+    finished.set()
+    thread.join()
+
+    for overlapped in (record, records["other"]):
+        assert overlapped.peak_memory_bytes is None
+        assert overlapped.memory_skipped_reason is not None
+    assert record.phases[0].peak_memory_bytes is None
+    assert "memory not traced" in record_rows(record)[0]["details"]
+    assert not tracemalloc.is_tracing()
+
+    with record_performance("test") as record:
+        array = np.ones(1_000_000)
+        del array
+    assert record.peak_memory_bytes >= 8_000_000
+    assert record.memory_skipped_reason is None
+
+
+def test_timed_solvers():
+    """Test that the solvers record their phases, and do nothing outside of a
+    request."""
+    instance = generate_instance(no_cities=10)
+    tour, _ = greedy_algorithm(generate_distance_matrix(instance))
+
+    with record_performance("greedy", trace_memory=False) as record:
+        distance_matrix = generate_distance_matrix(instance)
+        assert greedy_algorithm(distance_matrix)[0] == tour
+
+    assert [phase.name for phase in record.phases] == [
+        "generate_distance_matrix",
+        "greedy_algorithm",
+    ]
+    assert record.phases[0].attributes == {"no_cities": 10, "no_blocks": 1}
+    assert record.peak_memory_bytes is None
+
+
+def test_record_performance_log_and_profile(tmp_path, monkeypatch):
+    """Test that records are appended to the performance log and that the request
+    is profiled."""
+    log_path = tmp_path / "performance.jsonl"
+    monkeypatch.setenv(PERFORMANCE_LOG_ENVIRONMENT_VARIABLE, str(log_path))
+    monkeypatch.setenv(PROFILE_DIRECTORY_ENVIRONMENT_VARIABLE, str(tmp_path / "prof"))
+
+    for _ in range(2):
+        with record_performance("greedy") as record, timed("greedy_algorithm"):
+            greedy_algorithm(np.array([[0, 1, 2], [1, 0, 3], [2, 3, 0]]))
+
+    lines = log_path.read_text().splitlines()
+    assert len(lines) == 2
+    logged = json.loads(lines[-1])
+    assert logged["request"] == "greedy"
+    assert logged["phases"][0]["name"] == "greedy_algorithm"
+
+    assert record.profile_path is not None
+    assert len(list((tmp_path / "prof").glob("greedy-*.prof"))) == 2
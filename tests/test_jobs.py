@@ -0,0 +1,126 @@
+"""Test running the solvers in background processes."""
+
+import time
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from tspdashboard.exact_mip_agorithm import exact_algorithm
+from tspdashboard.jobs import Job, SolverPool
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+
+def wait_for(solver_pool: SolverPool, job_id: int, timeout: float = 60) -> Job:
+    """Poll a job until it has finished."""
+    deadline = time.monotonic() + timeout
+    job = solver_pool.poll(job_id)
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = solver_pool.poll(job_id)
+    return job
+
+
+def test_solver_pool_runs_job():
+    """Test that a job returns the result of the solver and reports progress."""
+    solver_pool = SolverPool(max_workers=1)
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=8))
+
+    job_id = solver_pool.submit(
+        exact_algorithm,
+        distance_matrix=distance_matrix,
+        dynamic_programming_max_cities=0,
+    )
+    job = wait_for(solver_pool, job_id)
+
+    assert job.status == "done"
+    tour, total_distance = job.result
+    assert sorted(tour[:-1]) == list(range(8))
+    assert job.progress.incumbent_objective == pytest.approx(total_distance)
+
+    # Check that the timings of the solve are sent back with the result
+    assert job.performance.request == "exact_algorithm"
+    assert [phase.name for phase in job.performance.phases] == [
+        "build_model",
+        "solve",
+        "extract_tour",
+    ]
+
+
+def test_solver_pool_queues_and_cancels_jobs():
+    """Test that jobs wait for a free worker and that cancelling a running job lets
+    the next job start."""
+    solver_pool = SolverPool(max_workers=1)
+    slow_distance_matrix = generate_distance_matrix(generate_instance(no_cities=30))
+    fast_distance_matrix = np.array([[0, 1, 2], [1, 0, 3], [2, 3, 0]])
+
+    slow_job_id = solver_pool.submit(
+        exact_algorithm, distance_matrix=slow_distance_matrix
+    )
+    fast_job_id = solver_pool.submit(
+        exact_algorithm, distance_matrix=fast_distance_matrix
+    )
+
+    # Check that the second job waits for the first one
+    assert solver_pool.poll(slow_job_id).status == "running"
+    assert solver_pool.poll(fast_job_id).status == "queued"
+
+    solver_pool.cancel(slow_job_id)
+    assert solver_pool.poll(slow_job_id).status == "cancelled"
+
+    job = wait_for(solver_pool, fast_job_id)
+    assert job.status == "done"
+    assert int(job.result[1]) == 6
+
+
+def test_solver_pool_reports_errors():
+    """Test that an exception in the solver process marks the job as failed."""
+    solver_pool = SolverPool(max_workers=1)
+    distance_matrix = np.array([[0, 1, 2], [5, 0, 3], [2, 3, 0]])
+
+    job_id = solver_pool.submit(
+        exact_algorithm, distance_matrix=distance_matrix, formulation="dfj"
+    )
+    job = wait_for(solver_pool, job_id)
+
+    assert job.status == "failed"
+    assert "ValueError" in job.error
+
+
+def test_solver_pool_time_limit():
+    """Test that a job running past its wall time limit is terminated."""
+    solver_pool = SolverPool(max_workers=1)
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=30))
+
+    job_id = solver_pool.submit(
+        exact_algorithm,
+        wall_time_limit=timedelta(seconds=1),
+        distance_matrix=distance_matrix,
+    )
+    job = wait_for(solver_pool, job_id)
+
+    assert job.status == "timed_out"
+    assert job.finished
+    assert "time limit" in job.error
+
+
+def test_solver_pool_queues_many_jobs():
+    """Test that queued jobs hold no file descriptors, so more jobs can be queued
+    than the process may open files."""
+    resource = pytest.importorskip("resource")
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=30))
+
+    solver_pool = SolverPool(max_workers=1)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (256, hard_limit))
+    try:
+        job_ids = [
+            solver_pool.submit(exact_algorithm, distance_matrix=distance_matrix)
+            for _ in range(300)
+        ]
+        assert solver_pool.poll(job_ids[-1]).status == "queued"
+    finally:
+        solver_pool.shutdown()
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft_limit, hard_limit))
+
+    assert all(solver_pool.poll(job_id).status == "cancelled" for job_id in job_ids)
@@ -0,0 +1,87 @@
+"""Test the 2-opt and Or-opt local search for the TSP problem."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from tspdashboard.candidate_graph import build_candidate_graph
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.local_search import local_search, nearest_neighbors
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+
+def test_local_search_improves_greedy_tour():
+    """Test that the local search returns a valid tour which is no longer than the
+    greedy tour and whose distance is correct."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=200))
+    greedy_tour, greedy_total_distance = greedy_algorithm(distance_matrix)
+
+    tour, total_distance = local_search(greedy_tour, distance_matrix)
+
+    # Check that the tour starts and ends in the same city as the greedy tour
+    assert tour[0] == tour[-1] == greedy_tour[0]
+
+    # Check that every city is visited exactly once
+    assert sorted(tour[:-1]) == list(range(200))
+
+    # Check that the tour is not longer and that the total distance is correct
+    assert total_distance <= greedy_total_distance
+    assert total_distance == pytest.approx(
+        sum(distance_matrix[a, b] for a, b in itertools.pairwise(tour))
+    )
+
+
+def test_local_search_removes_crossing():
+    """Test that a tour crossing itself on the corners of a square is uncrossed."""
+    instance = np.array([[0, 0], [1, 0], [0, 1], [1, 1], [0.5, -0.1]])
+    distance_matrix = generate_distance_matrix(instance)
+
+    # The tour 0 -> 4 -> 1 -> 2 -> 3 -> 0 crosses itself
+    tour, total_distance = local_search([0, 4, 1, 2, 3, 0], distance_matrix)
+
+    assert tour in ([0, 4, 1, 3, 2, 0], [0, 2, 3, 1, 4, 0])
+    assert total_distance == pytest.approx(3 + 2 * np.hypot(0.5, 0.1))
+
+
+def test_local_search_candidate_graph():
+    """Test that the local search works on a candidate graph without a distance
+    matrix."""
+    instance = generate_instance(no_cities=500)
+    candidate_graph = build_candidate_graph(instance)
+    greedy_tour, greedy_total_distance = greedy_algorithm(candidate_graph)
+
+    tour, total_distance = local_search(greedy_tour, candidate_graph)
+
+    assert sorted(tour[:-1]) == list(range(500))
+    assert total_distance < greedy_total_distance
+
+
+def test_local_search_fails_with_wrong_input():
+    """Test that a tour which does not visit all cities raises an error."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=10))
+
+    with pytest.raises(ValueError):
+        local_search([0, 1, 2, 0], distance_matrix)
+
+    # Check that an asymmetric distance matrix fails, since 2-opt reverses paths
+    distance_matrix = distance_matrix + np.triu(distance_matrix)
+    with pytest.raises(ValueError):
+        local_search([*range(10), 0], distance_matrix)
+
+
+def test_local_search_active_cities():
+    """Test that the local search only starts from the active cities, and that
+    precomputed neighbor lists give the same tour."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=100))
+    greedy_tour, greedy_total_distance = greedy_algorithm(distance_matrix)
+
+    # Check that no move is made without active cities
+    tour, total_distance = local_search(greedy_tour, distance_matrix, active_cities=[])
+    assert tour == greedy_tour
+    assert total_distance == pytest.approx(greedy_total_distance)
+
+    neighbors = nearest_neighbors(distance_matrix, 10)
+    assert local_search(
+        greedy_tour, distance_matrix, neighbors=neighbors
+    ) == local_search(greedy_tour, distance_matrix)
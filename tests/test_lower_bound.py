@@ -0,0 +1,85 @@
+"""Test the Held-Karp lower bound and the alpha-nearness of edges."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tspdashboard.candidate_graph import build_candidate_graph
+from tspdashboard.exact_mip_agorithm import exact_algorithm
+from tspdashboard.instance_io import read_instance
+from tspdashboard.local_search import nearest_neighbors
+from tspdashboard.lower_bound import alpha_candidates, alpha_nearness, held_karp_bound
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+DATA_DIRECTORY = Path(__file__).parents[1] / "benchmarks" / "data"
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_held_karp_bound_below_optimum(seed):
+    """Test that the bound is at most the length of the optimal tour, and close to
+    it."""
+    cities_coordinates = generate_instance(no_cities=10, seed=seed)
+    distance_matrix = generate_distance_matrix(cities_coordinates)
+    _, optimum = exact_algorithm(distance_matrix, formulation="dfj")
+
+    bound = held_karp_bound(distance_matrix)
+    assert bound.value <= optimum + 1e-6
+    assert bound.value >= 0.9 * optimum
+    assert bound.gap(optimum) == pytest.approx((optimum - bound.value) / bound.value)
+
+
+def test_held_karp_bound_tsplib():
+    """Test that the bound of gr17 is its optimal tour length, and that the bound of
+    pcb442 is within 2 % of its optimal tour length."""
+    gr17 = read_instance(DATA_DIRECTORY / "gr17.tsp").distance_matrix()
+    assert held_karp_bound(gr17).value == pytest.approx(2085)
+
+    pcb442 = read_instance(DATA_DIRECTORY / "pcb442.tsp").distance_matrix()
+    bound = held_karp_bound(pcb442, upper_bound=1.05 * 50778)
+    assert 0.98 * 50778 <= bound.value <= 50778
+
+
+def test_held_karp_bound_candidate_graph():
+    """Test that the bound of a candidate graph is the bound of the distance
+    matrix."""
+    cities_coordinates = generate_instance(no_cities=200, seed=1)
+    distance_matrix = generate_distance_matrix(cities_coordinates)
+    candidate_graph = build_candidate_graph(cities_coordinates)
+
+    assert held_karp_bound(candidate_graph).value == pytest.approx(
+        held_karp_bound(distance_matrix).value
+    )
+
+
+def test_held_karp_bound_asymmetric():
+    """Test that asymmetric distance matrices are rejected."""
+    distance_matrix = np.array([[0, 1, 2], [5, 0, 1], [2, 1, 0]])
+    with pytest.raises(ValueError):
+        held_karp_bound(distance_matrix)
+
+
+def test_alpha_nearness():
+    """Test that the edges of the 1-tree have alpha-nearness 0, and that pruning the
+    neighbor lists keeps the edges of the 1-tree."""
+    cities_coordinates = generate_instance(no_cities=50, seed=1)
+    distance_matrix = generate_distance_matrix(cities_coordinates)
+    bound = held_karp_bound(distance_matrix)
+    neighbors = nearest_neighbors(distance_matrix, 10)
+
+    alpha = alpha_nearness(distance_matrix, bound, neighbors)
+    assert alpha.shape == neighbors.shape
+    assert (alpha >= 0).all()
+
+    # Check that the tree edges among the neighbors have alpha-nearness 0
+    parents = bound.tree_parents
+    for city, neighbor_list in enumerate(neighbors):
+        for index, neighbor in enumerate(neighbor_list):
+            if parents[city] == neighbor or parents[neighbor] == city:
+                assert alpha[city, index] == 0
+
+    # Check that the candidates are neighbors sorted by alpha-nearness
+    candidates = alpha_candidates(distance_matrix, bound, neighbors, no_candidates=5)
+    assert candidates.shape == (50, 5)
+    for city in range(50):
+        assert set(candidates[city]) <= set(neighbors[city])
@@ -1,13 +1,23 @@
 """This tests that the main app runs and can generate instances and solve them."""
 
+import subprocess
+import sys
+import time
+
+import numpy as np
 from streamlit.testing.v1 import AppTest
 
+from tspdashboard import app
+from tspdashboard.incremental import incremental_solution
+from tspdashboard.utilities import generate_instance
+
 
 def test_app_workflow() -> None:
     """Main test that the app can run and 'correct' usage works."""
 
     # Load the app from the main module
-    at = AppTest.from_file("../tspdashboard/app.py")
+    # The first map imports the drawing modules, unless they are warmed up already
+    at = AppTest.from_file("../tspdashboard/app.py", default_timeout=30)
 
     # Run the app and assert that it runs without errors
     at.run()
@@ -36,6 +46,20 @@ def test_app_workflow() -> None:
     assert at.session_state["greedy_toggle"] is True
     assert at.session_state["greedy_solution"] is not None
 
+    # Now toggle the local search and assert that the improved solution is generated
+
+    assert at.session_state["local_search_toggle"] is False
+    assert "local_search_solution" not in at.session_state
+
+    at.toggle(key="local_search_toggle").set_value(True).run()
+
+    assert at.session_state["local_search_toggle"] is True
+    assert at.session_state["local_search_solution"] is not None
+    assert (
+        at.session_state["local_search_objective"]
+        <= at.session_state["greedy_objective"]
+    )
+
     # Now toggle the exact algorithm and assert that the exact solution is generated
 
     assert at.session_state["exact_toggle"] is False
@@ -43,8 +67,100 @@ def test_app_workflow() -> None:
 
     at.toggle(key="exact_toggle").set_value(True).run()
 
+    # The exact algorithm runs in the background, so rerun until the solution arrives
+    deadline = time.monotonic() + 60
+    while "exact_solution" not in at.session_state and time.monotonic() < deadline:
+        at.run()
+
+    assert not at.exception
     assert at.session_state["exact_toggle"] is True
     assert at.session_state["exact_solution"] is not None
 
     # Now we should have metrics in the session state
     assert len(at.metric) > 0
+
+
+def test_app_two_cities() -> None:
+    """Test that an instance of two cities, which has no lower bound, can be
+    solved."""
+    at = AppTest.from_file("../tspdashboard/app.py", default_timeout=30)
+    at.run()
+
+    at.number_input[0].set_value(2)
+    at.button(key="generate").click().run()
+    at.toggle(key="greedy_toggle").set_value(True).run()
+    at.toggle(key="local_search_toggle").set_value(True).run()
+
+    assert not at.exception
+    assert len(at.session_state["instance"]) == 2
+    assert at.session_state["greedy_solution"] == [0, 1, 0]
+    assert "lower_bound" not in at.session_state
+
+
+def test_app_imports_slow_modules_lazily() -> None:
+    """Test that importing the app does not import OR-Tools or matplotlib, so the
+    first page is drawn without waiting for them."""
+    script = (
+        "import sys, tspdashboard.app; "
+        "print(sorted({name.split('.')[0] for name in sys.modules}))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert "ortools" not in completed.stdout
+    assert "matplotlib" not in completed.stdout
+
+
+def test_instance_solution_key_explicit(monkeypatch) -> None:
+    """Test that an explicit distance matrix and its transpose, which have the same
+    layout, do not share cached solutions."""
+    coordinates = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+    distance_matrix = np.array([[0.0, 1.0, 2.0], [3.0, 0.0, 4.0], [5.0, 6.0, 0.0]])
+
+    keys = []
+    for matrix in (distance_matrix, distance_matrix.T):
+        monkeypatch.setattr(
+            app.st,
+            "session_state",
+            {
+                "instance": coordinates,
+                "instance_edge_weight_type": "EXPLICIT",
+                "instance_distance_matrix": matrix,
+                "metric": "euclidean",
+            },
+        )
+        keys.append(app.instance_solution_key("greedy"))
+
+    assert keys[0] != keys[1]
+
+
+def test_edits_reuse_incremental_solution(monkeypatch) -> None:
+    """Test that consecutive edits of the instance reuse the neighbor lists instead
+    of preparing the instance for edits again."""
+    calls = []
+
+    def counted_incremental_solution(*args, **kwargs):
+        calls.append(args)
+        return incremental_solution(*args, **kwargs)
+
+    monkeypatch.setattr(app, "incremental_solution", counted_incremental_solution)
+    monkeypatch.setattr(
+        app.st,
+        "session_state",
+        {"instance": generate_instance(no_cities=20, seed=1), "metric": "euclidean"},
+    )
+
+    app.add_random_city()
+    app.add_random_city()
+    app.remove_last_city()
+
+    assert len(calls) == 1
+    assert len(app.st.session_state["instance"]) == 21
+    assert (
+        app.st.session_state["incremental_solution"].tour
+        == app.st.session_state["local_search_solution"]
+    )
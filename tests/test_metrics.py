@@ -0,0 +1,77 @@
+"""Test the metrics defining the distances between cities."""
+
+import numpy as np
+import pytest
+
+from tspdashboard.metrics import (
+    is_symmetric,
+    pair_distances,
+    precomputed_distance_matrix,
+)
+from tspdashboard.utilities import generate_distance_matrix
+
+
+def test_haversine_distance_matrix():
+    """Test the great-circle distances between cities given by longitude and
+    latitude."""
+    # Paris, London and New York as (longitude, latitude)
+    cities_coordinates = np.array(
+        [[2.3522, 48.8566], [-0.1276, 51.5072], [-74.006, 40.7128]]
+    )
+
+    distance_matrix = generate_distance_matrix(cities_coordinates, metric="haversine")
+
+    # Check the distances in kilometers against published great-circle distances
+    assert distance_matrix[0, 1] == pytest.approx(343.5, rel=0.01)
+    assert distance_matrix[1, 2] == pytest.approx(5570, rel=0.01)
+    assert np.all(distance_matrix.diagonal() == 0)
+    assert is_symmetric(distance_matrix)
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "haversine", "manhattan"])
+def test_metric_in_blocks(metric):
+    """Test that computing the distances in blocks of rows gives the same matrix."""
+    cities_coordinates = np.random.default_rng(0).random((50, 2)) * 10
+
+    distance_matrix = generate_distance_matrix(cities_coordinates, metric=metric)
+    blocked_distance_matrix = generate_distance_matrix(
+        cities_coordinates, metric=metric, memory_budget_bytes=4096
+    )
+
+    assert np.allclose(blocked_distance_matrix, distance_matrix)
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "haversine", "manhattan"])
+def test_pair_distances(metric):
+    """Test that the distances between pairs of cities are the entries of the
+    distance matrix."""
+    cities_coordinates = np.random.default_rng(0).random((20, 2)) * 10
+    distance_matrix = generate_distance_matrix(cities_coordinates, metric=metric)
+    cities_a, cities_b = np.triu_indices(20)
+
+    distances = pair_distances(cities_coordinates, cities_a, cities_b, metric)
+
+    assert np.allclose(distances, distance_matrix[cities_a, cities_b])
+
+
+def test_manhattan_distance_matrix():
+    """Test that the Manhattan distance is the sum of the distances along the axes."""
+    distance_matrix = generate_distance_matrix(
+        np.array([[0, 0], [3, 4]]), metric="manhattan"
+    )
+    assert distance_matrix[0, 1] == 7
+
+    with pytest.raises(ValueError):
+        generate_distance_matrix(np.array([[0, 0], [3, 4]]), metric="chebyshev")
+
+
+def test_precomputed_distance_matrix():
+    """Test that asymmetric distance matrices are accepted and invalid ones are
+    not."""
+    asymmetric = precomputed_distance_matrix(np.array([[0, 1], [2, 0]]))
+    assert not is_symmetric(asymmetric)
+
+    with pytest.raises(ValueError):
+        precomputed_distance_matrix(np.array([[0, 1, 2], [1, 0, 2]]))
+    with pytest.raises(ValueError):
+        precomputed_distance_matrix(np.array([[0, -1], [1, 0]]))
@@ -0,0 +1,49 @@
+"""Test drawing instances and tours."""
+
+import numpy as np
+
+from tspdashboard.rendering import base_layer, decimate, tour_figure, vega_lite_spec
+from tspdashboard.utilities import generate_instance
+
+
+def test_decimate():
+    """Test that only large instances are decimated, to cities of the instance."""
+    cities_coordinates = generate_instance(no_cities=1_000)
+    assert decimate(cities_coordinates, max_cities=1_000) is cities_coordinates
+
+    decimated = decimate(cities_coordinates, max_cities=100)
+    assert 1 < decimated.shape[0] <= 100
+    assert np.isin(decimated, cities_coordinates).all()
+
+
+def test_tour_figure():
+    """Test that the cities are only rendered once and the tours are drawn as one
+    collection, which is cleared after drawing."""
+    cities_coordinates = generate_instance(no_cities=10)
+    tour = [*range(10), 0]
+
+    layer = base_layer(cities_coordinates)
+    assert base_layer(cities_coordinates.copy()) is layer
+    assert layer.image.ndim == 3
+
+    with tour_figure(cities_coordinates, [(tour, "red"), (tour[::-1], "green")]) as fig:
+        (ax,) = fig.axes
+        (collection,) = ax.collections
+        assert len(collection.get_paths()) == 2
+        assert np.allclose(collection.get_paths()[0].vertices, cities_coordinates[tour])
+
+    assert not fig.axes
+
+
+def test_vega_lite_spec():
+    """Test that the chart has a layer of cities and a line per tour through its
+    cities in order."""
+    cities_coordinates = generate_instance(no_cities=5)
+
+    spec = vega_lite_spec(cities_coordinates, [([0, 2, 1, 4, 3, 0], "Greedy", "red")])
+
+    cities_layer, tour_layer = spec["layer"]
+    assert len(cities_layer["data"]["values"]) == 5
+    stops = tour_layer["data"]["values"]
+    assert [stop["order"] for stop in stops] == list(range(6))
+    assert stops[1]["x"] == cities_coordinates[2, 0]
@@ -0,0 +1,88 @@
+"""Test the OR-Tools routing solver for the TSP problem."""
+
+import itertools
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from tspdashboard.exact_mip_agorithm import exact_algorithm
+from tspdashboard.routing_algorithm import routing_algorithm
+from tspdashboard.utilities import generate_distance_matrix, generate_instance
+
+
+def test_routing_algorithm():
+    """Test that guided local search finds the optimal tour of a small instance."""
+    distance_matrix = generate_distance_matrix(generate_instance(no_cities=10))
+    reports = []
+
+    tour, total_distance = routing_algorithm(
+        distance_matrix,
+        solve_time_limit=timedelta(seconds=1),
+        progress_callback=reports.append,
+    )
+
+    # Check that the tour visits every city once, starting and ending in city 0
+    assert tour[0] == tour[-1] == 0
+    assert sorted(tour[:-1]) == list(range(10))
+
+    # Check that the objective is the unscaled length of the tour
+    tour_distance = sum(distance_matrix[a, b] for a, b in itertools.pairwise(tour))
+    assert total_distance == pytest.approx(tour_distance)
+
+    _, exact_total_distance = exact_algorithm(distance_matrix)
+    assert total_distance == pytest.approx(exact_total_distance, rel=1e-5)
+
+    # Check that only improved tours are reported
+    objectives = [report.incumbent_objective for report in reports]
+    assert objectives == sorted(objectives, reverse=True)
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "haversine", "manhattan"])
+def test_routing_algorithm_from_coordinates(metric):
+    """Test that computing the distances on demand from the coordinates gives a tour
+    whose length is measured in the metric."""
+    cities_coordinates = generate_instance(no_cities=30)
+    distance_matrix = generate_distance_matrix(cities_coordinates, metric=metric)
+
+    tour, total_distance = routing_algorithm(
+        cities_coordinates=cities_coordinates,
+        metric=metric,
+        first_solution_strategy="christofides",
+        metaheuristic="greedy_descent",
+    )
+
+    assert sorted(tour[:-1]) == list(range(30))
+    tour_distance = sum(distance_matrix[a, b] for a, b in itertools.pairwise(tour))
+    assert total_distance == pytest.approx(tour_distance)
+
+
+def test_routing_algorithm_asymmetric():
+    """Test that the direction of travel is respected for an integer, asymmetric
+    distance matrix."""
+    distance_matrix = np.array([[0, 1, 9, 9], [9, 0, 1, 9], [9, 9, 0, 1], [1, 9, 9, 0]])
+
+    tour, total_distance = routing_algorithm(
+        distance_matrix, solve_time_limit=timedelta(seconds=1)
+    )
+
+    assert tour == [0, 1, 2, 3, 0]
+    assert total_distance == 4
+
+
+def test_routing_algorithm_fails_with_wrong_input():
+    """Test that the distances should be given exactly once and the heuristics
+    should exist."""
+    cities_coordinates = generate_instance(no_cities=5)
+
+    with pytest.raises(ValueError):
+        routing_algorithm()
+    with pytest.raises(ValueError):
+        routing_algorithm(
+            generate_distance_matrix(cities_coordinates),
+            cities_coordinates=cities_coordinates,
+        )
+    with pytest.raises(ValueError):
+        routing_algorithm(
+            cities_coordinates=cities_coordinates, first_solution_strategy="random"
+        )
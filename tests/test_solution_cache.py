@@ -0,0 +1,59 @@
+"""Test the cache of solutions shared by the sessions of the dashboard."""
+
+import numpy as np
+
+from tspdashboard.solution_cache import SolutionCache, solution_key
+from tspdashboard.utilities import generate_instance
+
+
+def test_solution_key():
+    """Test that the key depends on the coordinates, algorithm and parameters."""
+    instance = generate_instance(no_cities=5)
+    key = solution_key(instance, "greedy", start_city=0)
+
+    assert key == solution_key(instance.copy(), "greedy", start_city=0)
+    assert key != solution_key(instance, "exact", start_city=0)
+    assert key != solution_key(instance, "greedy", start_city=1)
+
+    moved_instance = instance.copy()
+    moved_instance[2, 1] += 1e-12
+    assert key != solution_key(moved_instance, "greedy", start_city=0)
+
+
+def test_solution_cache_memory_tier():
+    """Test hits, misses and the eviction of the least recently used solution."""
+    solution_cache = SolutionCache(max_memory_entries=2)
+
+    assert solution_cache.get("a") is None
+    solution_cache.put("a", [0, 1, 0], 2.0)
+    solution_cache.put("b", [0, 1, 2, 0], 3.0)
+
+    # Use "a" so that "b" is the least recently used solution when "c" is added
+    assert solution_cache.get("a") == ([0, 1, 0], 2.0)
+    solution_cache.put("c", np.array([0, 2, 1, 0]), 4.0)
+
+    assert solution_cache.get("b") is None
+    assert solution_cache.get("c") == ([0, 2, 1, 0], 4.0)
+    assert (solution_cache.hits, solution_cache.misses) == (2, 2)
+
+
+def test_solution_cache_disk_tier(tmp_path):
+    """Test that solutions survive a new cache and that the disk tier is evicted down
+    to its size limit."""
+    path = tmp_path / "solutions.sqlite"
+    solution_cache = SolutionCache(path=path)
+    solution_cache.put("a", [0, 1, 2, 0], 3.0)
+    solution_cache.close()
+
+    solution_cache = SolutionCache(path=path, max_disk_bytes=300)
+    assert solution_cache.get("a") == ([0, 1, 2, 0], 3.0)
+
+    # Each solution takes a bit more than 128 bytes, so only two of them fit
+    solution_cache.put("b", [0, 1, 0], 2.0)
+    solution_cache.put("c", [0, 2, 0], 2.0)
+    solution_cache.close()
+
+    solution_cache = SolutionCache(path=path)
+    assert solution_cache.get("a") is None
+    assert solution_cache.get("b") == ([0, 1, 0], 2.0)
+    assert solution_cache.get("c") == ([0, 2, 0], 2.0)
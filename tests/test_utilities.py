@@ -1,4 +1,15 @@
-from tspdashboard.utilities import generate_instance, generate_distance_matrix
+from tspdashboard.utilities import (
+    condensed_index,
+    condensed_to_square,
+    generate_distance_matrix,
+    generate_instance,
+    swap_deltas,
+    tour_length,
+    tour_lengths,
+    two_opt_deltas,
+    validate_tour,
+)
+from tspdashboard.candidate_graph import build_candidate_graph
 import numpy as np
 import pytest
 
@@ -52,3 +63,142 @@ def test_generate_distance_matrix():
 
     # Check the distance from the first city (0, 0) to (1, 1) which is approx 1.414
     assert 1.41421356 == pytest.approx(distance_matrix[0][2])
+
+
+def test_generate_distance_matrix_float32():
+    """Test that the distance matrix can be generated with float32 values."""
+    instance = generate_instance(no_cities=20)
+
+    # Generate the distance matrix in both precisions
+    distance_matrix = generate_distance_matrix(cities_coordinates=instance)
+    distance_matrix_32 = generate_distance_matrix(
+        cities_coordinates=instance, dtype=np.float32
+    )
+
+    # Check that the values are float32 and close to the float64 values
+    assert distance_matrix_32.dtype == np.float32
+    assert np.allclose(distance_matrix_32, distance_matrix, atol=1e-6)
+
+
+def test_generate_distance_matrix_condensed():
+    """Test that the condensed distance matrix holds the upper triangle."""
+    instance = generate_instance(no_cities=15)
+
+    distance_matrix = generate_distance_matrix(cities_coordinates=instance)
+    condensed_distance_matrix = generate_distance_matrix(
+        cities_coordinates=instance, condensed=True
+    )
+
+    # Check that the condensed matrix has the expected length
+    assert condensed_distance_matrix.shape == (15 * 14 // 2,)
+
+    # Check that looking up entries gives the same values as the full matrix
+    assert condensed_distance_matrix[condensed_index(3, 7, 15)] == pytest.approx(
+        distance_matrix[3, 7]
+    )
+    assert condensed_distance_matrix[condensed_index(7, 3, 15)] == pytest.approx(
+        distance_matrix[7, 3]
+    )
+
+    # Check that expanding the condensed matrix gives back the full matrix
+    assert np.array_equal(
+        condensed_to_square(condensed_distance_matrix), distance_matrix
+    )
+
+
+def test_generate_distance_matrix_tiled():
+    """Test that a memory budget too small for the full matrix gives the same result
+    when the matrix is computed in blocks of rows."""
+    instance = generate_instance(no_cities=50)
+
+    distance_matrix = generate_distance_matrix(cities_coordinates=instance)
+
+    # A budget which only allows a few rows at a time
+    tiled_distance_matrix = generate_distance_matrix(
+        cities_coordinates=instance, memory_budget_bytes=3 * 50 * 8 * 4
+    )
+    tiled_condensed_distance_matrix = generate_distance_matrix(
+        cities_coordinates=instance, condensed=True, memory_budget_bytes=1
+    )
+
+    assert np.array_equal(tiled_distance_matrix, distance_matrix)
+    assert np.array_equal(
+        condensed_to_square(tiled_condensed_distance_matrix), distance_matrix
+    )
+
+
+def test_tour_length():
+    """Test the length of a tour from the distance matrix, the coordinates and a
+    candidate graph."""
+    instance = generate_instance(no_cities=20, seed=1)
+    distance_matrix = generate_distance_matrix(instance)
+    tour = [*range(20), 0]
+
+    # Check the length against the sum of the distances along the tour
+    expected = sum(distance_matrix[tour[i], tour[i + 1]] for i in range(20))
+    assert tour_length(tour, distance_matrix) == pytest.approx(expected)
+    assert tour_length(tour, cities_coordinates=instance) == pytest.approx(expected)
+    assert tour_length(tour, build_candidate_graph(instance)) == pytest.approx(expected)
+
+    # Check that the direction of a tour counts with asymmetric distances
+    asymmetric_distance_matrix = np.array([[0, 1, 2], [5, 0, 1], [2, 9, 0]])
+    assert tour_length([0, 1, 2, 0], asymmetric_distance_matrix) == 4
+    assert tour_length([0, 2, 1, 0], asymmetric_distance_matrix) == 16
+
+    with pytest.raises(ValueError):
+        tour_length(tour)
+
+
+def test_tour_lengths():
+    """Test that evaluating many tours at once gives the length of every tour."""
+    instance = generate_instance(no_cities=30, seed=2)
+    distance_matrix = generate_distance_matrix(instance)
+    rng = np.random.default_rng(0)
+    tours = np.array([[0, *(rng.permutation(29) + 1), 0] for _ in range(10)])
+
+    lengths = tour_lengths(tours, distance_matrix)
+
+    assert lengths.shape == (10,)
+    for tour, length in zip(tours, lengths, strict=True):
+        assert length == pytest.approx(tour_length(tour, distance_matrix))
+    assert np.allclose(tour_lengths(tours, cities_coordinates=instance), lengths)
+
+
+def test_validate_tour():
+    """Test that only closed tours visiting every city once are valid."""
+    validate_tour([0, 2, 1, 0], 3)
+    validate_tour(np.array([1, 0, 2, 1]), 3)
+
+    for tour in ([0, 2, 1], [0, 2, 1, 2], [0, 1, 1, 0], [0, 3, 1, 0], [0.0, 1, 2, 0]):
+        with pytest.raises(ValueError):
+            validate_tour(tour, 3)
+
+
+def test_move_deltas():
+    """Test that the deltas of the 2-opt moves and swaps are the changes in the
+    length of the tour when the moves are made."""
+    instance = generate_instance(no_cities=12, seed=3)
+    distance_matrix = generate_distance_matrix(instance)
+    tour = [0, *(np.random.default_rng(1).permutation(11) + 1).tolist(), 0]
+    length = tour_length(tour, distance_matrix)
+    first, second = np.triu_indices(12, k=1)
+
+    # A 2-opt move reverses the path between the two edges
+    deltas = two_opt_deltas(tour, first, second, distance_matrix)
+    for i, j, delta in zip(first, second, deltas, strict=True):
+        new_tour = tour[: i + 1] + tour[i + 1 : j + 1][::-1] + tour[j + 1 :]
+        assert tour_length(new_tour, distance_matrix) - length == pytest.approx(delta)
+
+    # Check the swaps of adjacent and other cities, with asymmetric distances
+    distance_matrix[0, 1:] += 1.0
+    length = tour_length(tour, distance_matrix)
+    first, second = first[first > 0], second[first > 0]
+    deltas = swap_deltas(tour, first, second, distance_matrix)
+    for i, j, delta in zip(first, second, deltas, strict=True):
+        new_tour = list(tour)
+        new_tour[i], new_tour[j] = new_tour[j], new_tour[i]
+        assert tour_length(new_tour, distance_matrix) - length == pytest.approx(delta)
+
+    # Check that the city at the start of the tour cannot be swapped
+    with pytest.raises(ValueError):
+        swap_deltas(tour, [0], [3], distance_matrix)
@@ -1,19 +1,306 @@
-"""This file contains the streamlit app for the TSP Dashboard."""
+"""This file contains the streamlit app for the TSP Dashboard.
+
+Streamlit runs this script on every interaction, but it imports its modules only
+once per server process. The solvers that use OR-Tools and the drawing of the map
+with matplotlib are slow to import, so they are imported in the functions that use
+them. A cold start then draws the intro and the controls without waiting for them.
+After the first page is drawn, warm_up_slow_modules imports them in a background
+thread, so they are usually ready by the time they are first used. Run
+benchmarks/bench_startup.py to measure the import time and the time to first
+render.
+"""
+
+import hashlib
+import importlib
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from typing import Any, Callable
 
 import streamlit as st
-
-from tspdashboard.exact_mip_agorithm import exact_algorithm
+from streamlit.runtime.uploaded_file_manager import UploadedFile
+
+from tspdashboard.incremental import (
+    IncrementalSolution,
+    add_cities,
+    incremental_solution,
+    remove_cities,
+)
+from tspdashboard.instance_io import read_instance, write_tour
+from tspdashboard.instrumentation import (
+    PerformanceRecord,
+    record_performance,
+    record_rows,
+)
+from tspdashboard.jobs import Job, SolverPool
+from tspdashboard.lower_bound import LowerBound, held_karp_bound
+from tspdashboard.metrics import METRICS, is_symmetric
+from tspdashboard.solution_cache import SolutionCache, solution_key
 from tspdashboard.utilities import generate_instance, generate_distance_matrix
-from tspdashboard.greedy_algorithm import greedy_algorithm
-import matplotlib.pyplot as plt
+from tspdashboard.greedy_algorithm import multi_start_greedy_algorithm
+from tspdashboard.local_search import local_search
 import logging
 
+# How often the page is refreshed while an exact solve is running in the background
+POLL_INTERVAL_SECONDS = 0.5
+
+# The time limit of the exact algorithm
+EXACT_SOLVE_TIME_LIMIT = timedelta(seconds=120)
+
+# The time limit of the routing solver, which improves its tour until the limit
+ROUTING_SOLVE_TIME_LIMIT = timedelta(seconds=10)
+
+# The algorithms that run in background solver processes
+BACKGROUND_ALGORITHMS = ("routing", "exact")
+
+# The names and colors of the tours of the algorithms, in the order they are drawn
+TOUR_STYLES = {
+    "greedy": ("Greedy", "red"),
+    "local_search": ("Improved greedy", "blue"),
+    "routing": ("Guided local search", "orange"),
+    "exact": ("Exact", "green"),
+}
+
+# The modules that are slow to import, which are imported on first use or by
+# warm_up_slow_modules
+SLOW_MODULES = (
+    "tspdashboard.rendering",
+    "tspdashboard.exact_mip_agorithm",
+    "tspdashboard.routing_algorithm",
+)
+
+# The largest number of cities of an uploaded instance. The app keeps dense
+# distance matrices, which take (no_cities ** 2) * 8 bytes each, so larger files
+# are rejected before they are read. Solve them with the tspdashboard command.
+MAX_UPLOADED_CITIES = 2_000
+
+# The number of performance records shown in the performance panel
+MAX_PERFORMANCE_RECORDS = 20
+
+# The names of the metrics in the metric selector
+METRIC_LABELS = {
+    "euclidean": "Euclidean",
+    "haversine": "Great circle (longitude, latitude)",
+    "manhattan": "Manhattan",
+}
+
+
+@st.cache_resource
+def get_solver_pool() -> SolverPool:
+    """The pool of solver processes, shared by all sessions on the server. Its size is
+    set by the TSPDASHBOARD_SOLVER_WORKERS environment variable."""
+    return SolverPool()
+
+
+@st.cache_resource
+def get_solution_cache() -> SolutionCache:
+    """The cache of solutions, shared by all sessions on the server. It is kept on
+    disk if the TSPDASHBOARD_CACHE_PATH environment variable is set."""
+    return SolutionCache.from_environment()
+
+
+def import_modules(module_names: tuple[str, ...]) -> None:
+    """Import the modules, which only takes time the first time."""
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up_slow_modules() -> threading.Thread:
+    """Import the slow modules in a background thread, once per server process. A
+    script run that needs one of them while it is imported waits for the import to
+    finish, as with any concurrent import."""
+    thread = threading.Thread(
+        target=import_modules,
+        args=(SLOW_MODULES,),
+        name="tspdashboard-warm-up",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def cached_solution(key: str, algorithm: str) -> tuple[list[int], float] | None:
+    """Look up a solution in the solution cache and log the hit or miss."""
+    solution_cache = get_solution_cache()
+    solution = solution_cache.get(key)
+    logging.info(
+        "Solution cache %s for the %s algorithm (%s hits, %s misses).",
+        "hit" if solution is not None else "miss",
+        algorithm,
+        solution_cache.hits,
+        solution_cache.misses,
+    )
+    return solution
+
+
+def instance_solution_key(algorithm: str, **parameters: Any) -> str:
+    """The key of a solution of the instance in the solution cache. Besides the
+    coordinates, it depends on how the distances of the instance are defined. The
+    coordinates of an explicit distance matrix are only a layout of it, so the
+    matrix itself is hashed too."""
+    edge_weight_type = st.session_state.get("instance_edge_weight_type")
+    if edge_weight_type == "EXPLICIT":
+        if "instance_distance_matrix_hash" not in st.session_state:
+            st.session_state["instance_distance_matrix_hash"] = hashlib.sha256(
+                instance_distance_matrix().tobytes()
+            ).hexdigest()
+        parameters["distance_matrix_hash"] = st.session_state[
+            "instance_distance_matrix_hash"
+        ]
+    return solution_key(
+        st.session_state["instance"],
+        algorithm,
+        edge_weight_type=edge_weight_type,
+        metric=st.session_state["metric"] if edge_weight_type is None else None,
+        **parameters,
+    )
+
+
+def instance_distance_matrix() -> Any:
+    """The distance matrix of the instance with the selected metric, which is
+    calculated once and kept in the session state together with the instance."""
+    if "instance_distance_matrix" not in st.session_state:
+        logging.info("Calculating the %s distance matrix.", st.session_state["metric"])
+        st.session_state["instance_distance_matrix"] = generate_distance_matrix(
+            st.session_state["instance"], metric=st.session_state["metric"]
+        )
+    return st.session_state["instance_distance_matrix"]
+
+
+def distance_unit() -> str:
+    """The unit of the distances of the instance."""
+    if st.session_state.get("instance_edge_weight_type") == "GEO" or (
+        st.session_state.get("instance_edge_weight_type") is None
+        and st.session_state["metric"] == "haversine"
+    ):
+        return "kilometers"
+    return "units"
+
+
+def exact_solution_key() -> str:
+    """The key of the exact solution of the instance in the solution cache. The
+    initial tour is not part of it, since it does not change the optimal objective."""
+    return instance_solution_key(
+        "exact", solve_time_limit=EXACT_SOLVE_TIME_LIMIT.total_seconds()
+    )
+
+
+def routing_solution_key() -> str:
+    """The key of the routing solution of the instance in the solution cache."""
+    return instance_solution_key(
+        "routing",
+        solve_time_limit=ROUTING_SOLVE_TIME_LIMIT.total_seconds(),
+        first_solution_strategy="path_cheapest_arc",
+        metaheuristic="guided_local_search",
+    )
+
+
+def background_solution_key(algorithm: str) -> str:
+    """The key of the solution of a background algorithm in the solution cache."""
+    if algorithm == "exact":
+        return exact_solution_key()
+    return routing_solution_key()
+
 
 def clear_session_state() -> None:
     """Clear the session state."""
+    # Stop the background solves of the old instance
+    for algorithm in BACKGROUND_ALGORITHMS:
+        if f"{algorithm}_job_id" in st.session_state:
+            get_solver_pool().forget(st.session_state[f"{algorithm}_job_id"])
+
+    # Remember which file was uploaded last, so it is not loaded again, which
+    # metric is selected, where the map is drawn and the performance of the past
+    # requests
+    uploaded_file_id = st.session_state.get("uploaded_file_id")
+    metric = st.session_state.get("metric", "euclidean")
+    client_side_rendering = st.session_state.get("client_side_rendering", False)
+    performance_records = st.session_state.get("performance_records", [])
+
     st.session_state.clear()
+    st.session_state["uploaded_file_id"] = uploaded_file_id
+    st.session_state["metric"] = metric
+    st.session_state["client_side_rendering"] = client_side_rendering
+    st.session_state["performance_records"] = performance_records
     st.session_state["exact_toggle"] = False
     st.session_state["greedy_toggle"] = False
+    st.session_state["local_search_toggle"] = False
+    st.session_state["routing_toggle"] = False
+
+
+def add_performance_record(record: PerformanceRecord | None) -> None:
+    """Add the performance record of a request to the performance panel, which
+    shows the most recent records."""
+    if record is None:
+        return
+    records = [record, *st.session_state.get("performance_records", [])]
+    st.session_state["performance_records"] = records[:MAX_PERFORMANCE_RECORDS]
+
+
+def load_uploaded_instance(uploaded_file: UploadedFile) -> None:
+    """Read an uploaded TSPLIB or CSV file into the session state, in place of a
+    generated instance."""
+    logging.info("Reading the uploaded file %s.", uploaded_file.name)
+
+    try:
+        instance = read_instance(
+            uploaded_file, filename=uploaded_file.name, max_cities=MAX_UPLOADED_CITIES
+        )
+    except (ValueError, KeyError) as error:
+        st.error(f"Could not read {uploaded_file.name}: {error}")
+        return
+
+    clear_session_state()
+    st.session_state["uploaded_file_id"] = uploaded_file.file_id
+    st.session_state["instance"] = instance.coordinates
+    st.session_state["instance_name"] = instance.name
+
+    # TSPLIB files define their own (rounded or explicit) distances, which replace
+    # the metric, and CSV files with latitudes and longitudes select the great
+    # circle distance
+    st.session_state["instance_edge_weight_type"] = instance.edge_weight_type
+    if instance.edge_weight_type is not None:
+        distance_matrix = instance.distance_matrix()
+        st.session_state["instance_distance_matrix"] = distance_matrix
+        st.session_state["instance_symmetric"] = is_symmetric(distance_matrix)
+    else:
+        st.session_state["metric"] = instance.metric
+
+
+def change_metric() -> None:
+    """Recalculate the distances of the instance with the selected metric, which
+    invalidates the solutions of the old distances."""
+    logging.info("Changing the metric to %s.", st.session_state["metric"])
+
+    instance = st.session_state.get("instance")
+    instance_name = st.session_state.get("instance_name")
+    clear_session_state()
+    st.session_state["instance"] = instance
+    st.session_state["instance_name"] = instance_name
+
+
+def best_tour_file() -> str | None:
+    """The shortest tour found so far as the contents of a TSPLIB .tour file, or None
+    if there is no tour yet."""
+    algorithms = [
+        algorithm
+        for algorithm in ("exact", "routing", "local_search", "greedy")
+        if st.session_state.get(f"{algorithm}_solution") is not None
+    ]
+    if not algorithms:
+        return None
+
+    algorithm = min(algorithms, key=lambda name: st.session_state[f"{name}_objective"])
+    tour_file = StringIO()
+    write_tour(
+        tour_file,
+        st.session_state[f"{algorithm}_solution"],
+        name=st.session_state.get("instance_name") or "tspdashboard",
+        comment=f"{algorithm.replace('_', ' ')} solution",
+    )
+    return tour_file.getvalue()
 
 
 def greedy_optimize_if_not_in_session_state() -> None:
@@ -24,18 +311,21 @@ def greedy_optimize_if_not_in_session_state() -> None:
 
 
 def greedy_optimize() -> None:
-    """Run the greedy optimization algorithm."""
+    """Run the greedy optimization algorithm from every start city and keep the best
+    tour, rotated to start in city 0."""
     logging.info("Optimizing the instance using the greedy algorithm.")
 
-    # If the distance matrix is not yet calculated, calculate it
-    if "instance_distance_matrix" not in st.session_state:
-        logging.info("Calculating the distance matrix.")
-        distance_matrix = generate_distance_matrix(st.session_state["instance"])
-        st.session_state["instance_distance_matrix"] = distance_matrix
+    # Use the solution of the same instance from another session if there is one
+    key = instance_solution_key("greedy", start_cities="all")
+    solution = cached_solution(key, "greedy")
 
-    greedy_solution, greedy_objective = greedy_algorithm(
-        st.session_state["instance_distance_matrix"], start_city=0
-    )
+    if solution is None:
+        with record_performance("greedy") as record:
+            solution = multi_start_greedy_algorithm(instance_distance_matrix())
+        add_performance_record(record)
+        get_solution_cache().put(key, *solution)
+
+    greedy_solution, greedy_objective = solution
 
     logging.info("Greedy solution: %s", greedy_solution)
     logging.info("Greedy objective: %s", greedy_objective)
@@ -45,33 +335,281 @@ def greedy_optimize() -> None:
     st.session_state["greedy_objective"] = greedy_objective
 
 
-def exact_optimize_if_not_in_session_state() -> None:
-    """Run the exact optimization algorithm if the solution is not in the session
+def local_search_optimize_if_not_in_session_state() -> None:
+    """Run the local search improvement if the solution is not in the session
     state."""
-    if "exact_solution" not in st.session_state:
+    if "local_search_solution" not in st.session_state:
+        local_search_optimize()
+
+
+def local_search_optimize() -> None:
+    """Improve the greedy solution using 2-opt and Or-opt local search."""
+    logging.info("Improving the greedy solution using local search.")
+
+    # The local search starts from the greedy solution, so make sure it exists
+    greedy_optimize_if_not_in_session_state()
+
+    with record_performance("local_search") as record:
+        local_search_solution, local_search_objective = local_search(
+            st.session_state["greedy_solution"], instance_distance_matrix()
+        )
+    add_performance_record(record)
+
+    logging.info("Local search solution: %s", local_search_solution)
+    logging.info("Local search objective: %s", local_search_objective)
+
+    # Write the info to the session state
+    st.session_state["local_search_solution"] = local_search_solution
+    st.session_state["local_search_objective"] = local_search_objective
+
+
+def lower_bound() -> LowerBound | None:
+    """The Held-Karp lower bound of the instance, which is calculated once and kept
+    in the session state. The shortest heuristic tour so far sets the step sizes.
+    None for asymmetric instances, which have no 1-trees, and for instances of
+    fewer than 3 cities, whose only tour is optimal anyway."""
+    if not st.session_state.get("instance_symmetric", True):
+        return None
+    if len(st.session_state["instance"]) < 3:
+        return None
+
+    if "lower_bound" not in st.session_state:
+        objectives = [
+            st.session_state[f"{algorithm}_objective"]
+            for algorithm in ("greedy", "local_search", "routing")
+            if st.session_state.get(f"{algorithm}_objective") is not None
+        ]
+        with record_performance("lower_bound") as record:
+            st.session_state["lower_bound"] = held_karp_bound(
+                instance_distance_matrix(),
+                upper_bound=min(objectives) if objectives else None,
+            )
+        add_performance_record(record)
+        logging.info("Lower bound: %s", st.session_state["lower_bound"].value)
+
+    bound: LowerBound = st.session_state["lower_bound"]
+    return bound
+
+
+def instance_incremental_solution() -> IncrementalSolution:
+    """The instance and its improved greedy tour prepared for edits. It is kept in
+    the session state and replaced by the edited solution, so the neighbor lists are
+    computed once per instance rather than on every edit."""
+    local_search_optimize_if_not_in_session_state()
+
+    solution = st.session_state.get("incremental_solution")
+    if solution is None or solution.tour != st.session_state["local_search_solution"]:
+        logging.info("Computing the neighbor lists of the instance.")
+        solution = incremental_solution(
+            st.session_state["instance"],
+            instance_distance_matrix(),
+            st.session_state["local_search_solution"],
+            metric=st.session_state["metric"],
+        )
+        st.session_state["incremental_solution"] = solution
+    return solution
+
+
+def edit_instance(edit: Callable[[IncrementalSolution], IncrementalSolution]) -> None:
+    """Edit the cities of the instance, updating the distance matrix and repairing
+    the improved greedy tour instead of solving the edited instance from scratch.
+    The other solutions belong to the old instance and are discarded."""
+    solution = instance_incremental_solution()
+
+    with record_performance("edit_instance") as record:
+        solution = edit(solution)
+    add_performance_record(record)
+
+    instance_name = st.session_state.get("instance_name")
+    local_search_toggle = st.session_state.get("local_search_toggle", False)
+    clear_session_state()
+    st.session_state["instance"] = solution.cities_coordinates
+    st.session_state["instance_name"] = instance_name
+    st.session_state["instance_distance_matrix"] = solution.distance_matrix
+    st.session_state["local_search_solution"] = solution.tour
+    st.session_state["local_search_objective"] = solution.objective
+    st.session_state["local_search_toggle"] = local_search_toggle
+    st.session_state["incremental_solution"] = solution
+
+
+def add_random_city() -> None:
+    """Add a city at a random location to the instance."""
+    edit_instance(lambda solution: add_cities(solution, generate_instance(1)))
+
+
+def remove_last_city() -> None:
+    """Remove the last city of the instance."""
+    edit_instance(
+        lambda solution: remove_cities(
+            solution, [len(solution.cities_coordinates) - 1]
+        )
+    )
+
+
+def exact_optimize_if_not_in_session_state() -> None:
+    """Start the exact optimization algorithm if the solution is not in the session
+    state and it is not already running."""
+    if (
+        "exact_solution" not in st.session_state
+        and "exact_job_id" not in st.session_state
+    ):
         exact_optimize()
 
 
 def exact_optimize() -> None:
-    """Run the exact optimization algorithm."""
+    """Start the exact optimization algorithm in a background process, unless the
+    solution is in the solution cache. The solution of a background solve is written
+    to the session state by poll_background_solve once it is done."""
     logging.info("Optimizing the instance using the exact algorithm.")
 
-    # If the distance matrix is not yet calculated, calculate it
-    if "instance_distance_matrix" not in st.session_state:
-        logging.info("Calculating the distance matrix.")
-        distance_matrix = generate_distance_matrix(st.session_state["instance"])
-        st.session_state["instance_distance_matrix"] = distance_matrix
+    # Use the solution of the same instance from another session if there is one
+    solution = cached_solution(exact_solution_key(), "exact")
+    if solution is not None:
+        st.session_state["exact_solution"], st.session_state["exact_objective"] = (
+            solution
+        )
+        return
+
+    from tspdashboard.exact_mip_agorithm import exact_algorithm  # noqa: PLC0415
 
-    exact_solution, exact_objective = exact_algorithm(
-        st.session_state["instance_distance_matrix"]
+    # Warm start the solver from the best heuristic tour that is already known
+    initial_tour = st.session_state.get("local_search_solution") or (
+        st.session_state.get("greedy_solution")
     )
 
-    logging.info("Exact solution: %s", exact_solution)
-    logging.info("Greedy objective: %s", exact_objective)
+    st.session_state["exact_job_id"] = get_solver_pool().submit(
+        exact_algorithm,
+        distance_matrix=instance_distance_matrix(),
+        solve_time_limit=EXACT_SOLVE_TIME_LIMIT,
+        initial_tour=initial_tour,
+    )
 
-    # Write the info to the session state
-    st.session_state["exact_solution"] = exact_solution
-    st.session_state["exact_objective"] = exact_objective
+
+def routing_optimize_if_not_in_session_state() -> None:
+    """Start the routing solver if the solution is not in the session state and it
+    is not already running."""
+    if (
+        "routing_solution" not in st.session_state
+        and "routing_job_id" not in st.session_state
+    ):
+        routing_optimize()
+
+
+def routing_optimize() -> None:
+    """Start the OR-Tools routing solver with guided local search in a background
+    process, unless the solution is in the solution cache."""
+    logging.info("Optimizing the instance using the routing solver.")
+
+    # Use the solution of the same instance from another session if there is one
+    solution = cached_solution(routing_solution_key(), "routing")
+    if solution is not None:
+        st.session_state["routing_solution"], st.session_state["routing_objective"] = (
+            solution
+        )
+        return
+
+    from tspdashboard.routing_algorithm import routing_algorithm  # noqa: PLC0415
+
+    st.session_state["routing_job_id"] = get_solver_pool().submit(
+        routing_algorithm,
+        distance_matrix=instance_distance_matrix(),
+        solve_time_limit=ROUTING_SOLVE_TIME_LIMIT,
+    )
+
+
+def poll_background_solve(algorithm: str) -> Job | None:
+    """Poll the background solve of the algorithm and write the solution to the
+    session state once it is done.
+
+    Args:
+        algorithm (str): "exact" or "routing".
+
+    Returns:
+        Job | None: The state of the solve, or None if no solve has been started.
+    """
+    if f"{algorithm}_job_id" not in st.session_state:
+        return None
+
+    solver_pool = get_solver_pool()
+    job = solver_pool.poll(st.session_state[f"{algorithm}_job_id"])
+    if not job.finished:
+        return job
+
+    solver_pool.forget(job.job_id)
+    del st.session_state[f"{algorithm}_job_id"]
+    add_performance_record(job.performance)
+
+    if job.status == "done":
+        solution, objective = job.result
+        get_solution_cache().put(
+            background_solution_key(algorithm), solution, objective
+        )
+
+        logging.info("%s solution: %s", algorithm.capitalize(), solution)
+        logging.info("%s objective: %s", algorithm.capitalize(), objective)
+
+        # Write the info to the session state
+        st.session_state[f"{algorithm}_solution"] = solution
+        st.session_state[f"{algorithm}_objective"] = objective
+    else:
+        logging.error("The %s algorithm failed: %s", algorithm, job.error)
+        st.session_state[f"{algorithm}_toggle"] = False
+
+    return job
+
+
+def cancel_background_solve(algorithm: str) -> None:
+    """Cancel the background solve of the algorithm, terminating the solver
+    process."""
+    if f"{algorithm}_job_id" in st.session_state:
+        get_solver_pool().forget(st.session_state.pop(f"{algorithm}_job_id"))
+    st.session_state[f"{algorithm}_toggle"] = False
+
+
+def solve_progress_text(job: Job) -> str:
+    """A short description of the progress of a background solve."""
+    if job.status == "queued":
+        return "Waiting for a free solver..."
+
+    progress = job.progress
+    if progress is None or progress.incumbent_objective is None:
+        return "Solving..."
+
+    text = f"Solving... best tour {progress.incumbent_objective:.2f} {distance_unit()}"
+    if progress.gap is not None:
+        text += f", at most {progress.gap * 100:.1f} % from optimal"
+    return text
+
+
+def lower_bound_metrics() -> None:
+    """Show the lower bound and how far the heuristic tours are from the optimal
+    tour at most, if there is a greedy solution but no exact solution."""
+    if (
+        st.session_state.get("greedy_objective") is None
+        or st.session_state.get("exact_objective") is not None
+    ):
+        return
+
+    bound = lower_bound()
+    if bound is None:
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    col1.metric("Lower bound (Held-Karp)", f"{bound.value:.2f} {distance_unit()}")
+    for column, algorithm, label in (
+        (col2, "greedy", "greedy solution"),
+        (col3, "local_search", "improved greedy solution"),
+        (col4, "routing", "guided local search solution"),
+    ):
+        objective = st.session_state.get(f"{algorithm}_objective")
+        if objective is not None:
+            column.metric(
+                f"Distance ({label})",
+                f"{objective:.2f} {distance_unit()}",
+                delta=f"at most {100 * bound.gap(objective):.2f} % above optimal",
+                delta_color="off",
+            )
 
 
 @st.experimental_fragment
@@ -79,52 +617,70 @@ def map_and_solution_plot() -> None:
     """This is inside a fragment to re-draw the plot without re-running the whole
     script.
     """
+    from tspdashboard.rendering import tour_figure, vega_lite_spec  # noqa: PLC0415
+
     instance = st.session_state["instance"]
 
+    # Collect the progress of the background solves before the toggles are drawn,
+    # since a failed solve switches its toggle off
+    jobs = {
+        algorithm: poll_background_solve(algorithm)
+        for algorithm in BACKGROUND_ALGORITHMS
+    }
+
     # Make the map column wider than the button column
     col1, col2 = st.columns([3, 1])
 
-    # Plot the instance as coordinates
-    fig, ax = plt.subplots()
-    ax.plot(instance[:, 0], instance[:, 1], "o")
-
-    # Drop the axis
-    ax.axis("off")
-
-    # If there is a greedy solution, plot it in red
-    if (
-        "greedy_solution" in st.session_state
-        and st.session_state["greedy_solution"] is not None
-    ) and st.session_state["greedy_toggle"]:
-        ax.plot(
-            instance[st.session_state["greedy_solution"], 0],
-            instance[st.session_state["greedy_solution"], 1],
-            "r-",
-        )
-
-    # If there is an exact solution, plot it in green
-    if (
-        "exact_solution" in st.session_state
-        and st.session_state["exact_solution"] is not None
-        and st.session_state["exact_toggle"]
-    ):
-        ax.plot(
-            instance[st.session_state["exact_solution"], 0],
-            instance[st.session_state["exact_solution"], 1],
-            "g-",
-        )
+    # Collect the tours that are toggled on
+    tours = [
+        (st.session_state[f"{algorithm}_solution"], name, color)
+        for algorithm, (name, color) in TOUR_STYLES.items()
+        if st.session_state.get(f"{algorithm}_solution") is not None
+        and st.session_state.get(f"{algorithm}_toggle")
+    ]
 
     with col1:
-        st.pyplot(fig)
+        # Draw the map in the browser, or as an image of the cached cities with the
+        # tours on top
+        if st.session_state.get("client_side_rendering"):
+            st.vega_lite_chart(
+                vega_lite_spec(instance, tours), use_container_width=True
+            )
+        else:
+            with tour_figure(
+                instance, [(tour, color) for tour, _, color in tours]
+            ) as fig:
+                st.pyplot(fig)
 
     with col2:
         # Add a button for optimizing the instance using the greedy algorithm
         st.toggle(
-            "Greedy solution (nearest neighbor)",
+            "Greedy solution (nearest neighbor, best start city)",
             on_change=greedy_optimize_if_not_in_session_state,
             key="greedy_toggle",
         )
 
+        # Add a button for improving the greedy solution using local search, whose
+        # moves reverse parts of the tour and so need symmetric distances
+        st.toggle(
+            "Improved greedy solution (2-opt and Or-opt)",
+            on_change=local_search_optimize_if_not_in_session_state,
+            key="local_search_toggle",
+            disabled=not st.session_state.get("instance_symmetric", True),
+            help=(
+                None
+                if st.session_state.get("instance_symmetric", True)
+                else "The local search needs symmetric distances."
+            ),
+        )
+
+        # Add a button for optimizing the instance using the OR-Tools routing solver
+        st.toggle(
+            "Guided local search solution (OR-Tools routing)",
+            on_change=routing_optimize_if_not_in_session_state,
+            key="routing_toggle",
+        )
+
         # Add a button for optimizing the instance using the exact algorithm
         st.toggle(
             "Exact solution",
@@ -132,6 +688,40 @@ def map_and_solution_plot() -> None:
             key="exact_toggle",
         )
 
+        # Show the progress of the running background solves and allow cancelling
+        # them
+        for algorithm, job in jobs.items():
+            if job is not None and not job.finished:
+                st.caption(f"{algorithm.capitalize()}: {solve_progress_text(job)}")
+                st.button(
+                    "Cancel",
+                    on_click=cancel_background_solve,
+                    args=(algorithm,),
+                    key=f"cancel_{algorithm}",
+                )
+            elif job is not None and job.status == "failed":
+                st.error(f"The {algorithm} algorithm failed: {job.error}")
+
+        # Download the best tour found so far
+        tour_file = best_tour_file()
+        if tour_file is not None:
+            st.download_button(
+                "Download tour",
+                data=tour_file,
+                file_name=f"{st.session_state.get('instance_name') or 'tour'}.tour",
+                mime="text/plain",
+                key="download_tour",
+            )
+
+        # Draw the map in the browser instead of on the server
+        st.toggle("Draw the map in the browser", key="client_side_rendering")
+
+        solution_cache = get_solution_cache()
+        st.caption(
+            f"Solution cache: {solution_cache.hits} hits, "
+            f"{solution_cache.misses} misses"
+        )
+
     # Preferably the below would be separated into a different function, but the
     # current st.experimental_fragment does not seem to allow for this.
     if (
@@ -140,7 +730,7 @@ def map_and_solution_plot() -> None:
         and "exact_objective" in st.session_state
         and st.session_state["exact_objective"] is not None
     ):
-        col1, col2 = st.columns(2)
+        col1, col2, col3, col4 = st.columns(4)
 
         # Calculate the difference between the greedy and exact solutions
         difference = (
@@ -152,15 +742,79 @@ def map_and_solution_plot() -> None:
 
         col1.metric(
             "Distance (exact solution)",
-            f'{st.session_state["exact_objective"]:.2f} ' f'kilometers',
+            f'{st.session_state["exact_objective"]:.2f} {distance_unit()}',
         )
         col2.metric(
             "Distance (greedy solution)",
-            f'{st.session_state["greedy_objective"]:.2f} kilometers',
+            f'{st.session_state["greedy_objective"]:.2f} {distance_unit()}',
             delta=f"{percentage_difference:.2f} %",
             delta_color="inverse",
         )
 
+        # The local search solution is an improvement of the greedy solution, so it
+        # can only exist when there is a greedy solution
+        if (
+            "local_search_objective" in st.session_state
+            and st.session_state["local_search_objective"] is not None
+        ):
+            # Calculate the percentage difference to the exact solution
+            percentage_difference = (
+                (
+                    st.session_state["local_search_objective"]
+                    - st.session_state["exact_objective"]
+                )
+                / st.session_state["exact_objective"]
+            ) * 100
+
+            col3.metric(
+                "Distance (improved greedy solution)",
+                f'{st.session_state["local_search_objective"]:.2f} {distance_unit()}',
+                delta=f"{percentage_difference:.2f} %",
+                delta_color="inverse",
+            )
+
+        if (
+            "routing_objective" in st.session_state
+            and st.session_state["routing_objective"] is not None
+        ):
+            # Calculate the percentage difference to the exact solution
+            percentage_difference = (
+                (
+                    st.session_state["routing_objective"]
+                    - st.session_state["exact_objective"]
+                )
+                / st.session_state["exact_objective"]
+            ) * 100
+
+            col4.metric(
+                "Distance (guided local search solution)",
+                f'{st.session_state["routing_objective"]:.2f} {distance_unit()}',
+                delta=f"{percentage_difference:.2f} %",
+                delta_color="inverse",
+            )
+
+    # Without the exact solution, the heuristic tours are compared to the lower
+    # bound instead
+    lower_bound_metrics()
+
+    # Show the timings and peak memory of the latest requests, newest first
+    with st.expander("Performance"):
+        records = st.session_state.get("performance_records", [])
+        if records:
+            st.dataframe(
+                [row for record in records for row in record_rows(record)],
+                hide_index=True,
+                use_container_width=True,
+            )
+        else:
+            st.caption("No solver has run yet.")
+
+    # Refresh the page until the background solves are done, which is when the
+    # solutions and metrics can be shown
+    if any(job is not None and not job.finished for job in jobs.values()):
+        time.sleep(POLL_INTERVAL_SECONDS)
+        st.rerun()
+
 
 def main() -> None:
     """Main function for the streamlit app."""
@@ -174,17 +828,24 @@ def main() -> None:
         This **app** allows users to generate a small instance of the TSP, displayed on
         a **2D map**:globe_with_meridians: Users can solve the problem using either a
         simple **greedy algorithm**, which selects the nearest unvisited city at each
-        step, or an **exact solution method**, which is practical only for smaller
-        instances due to **time constraints**:fire:
+        step and is run from every start city, improve the greedy route with **local
+        search** (2-opt and Or-opt moves), run the **OR-Tools routing solver** with
+        guided local search for near-optimal routes on larger instances, or use an
+        **exact solution method**, which is practical only for smaller instances due
+        to **time constraints**:fire:
 
         Technically, the city locations are generated randomly with coordinates
-        between 0 and 1. The exact algorithm uses a **Mixed Integer Programming (
-        MIP)** formulation of the problem and has a time limit which means it may not
-        provide the optimal solution for larger instances.""")
+        between 0 and 1, or read from an uploaded **TSPLIB** or **CSV** file. The
+        best tour can be downloaded as a TSPLIB tour file. The exact algorithm uses a
+        **Mixed Integer Programming (MIP)** formulation of the problem and has a time
+        limit which means it may not provide the optimal solution for larger
+        instances.""")
 
     if "instance" not in st.session_state:
         # Initialize the session state
         st.session_state["instance"] = None
+    if "metric" not in st.session_state:
+        st.session_state["metric"] = "euclidean"
 
     # Add buttons to generate an instance
 
@@ -214,12 +875,52 @@ def main() -> None:
         logging.debug("Generated instance.")
         logging.debug(instance)
 
+    # Or read the instance from an uploaded file
+    uploaded_file = st.file_uploader(
+        "Or upload a TSPLIB (.tsp, .atsp) or CSV file with the coordinates of the "
+        "cities",
+        type=["tsp", "atsp", "csv"],
+    )
+    if (
+        uploaded_file is not None
+        and uploaded_file.file_id != st.session_state.get("uploaded_file_id")
+    ):
+        load_uploaded_instance(uploaded_file)
+
+    # Select how the distances are computed from the coordinates. TSPLIB files
+    # define their own distances.
+    st.selectbox(
+        "Distance metric",
+        options=METRICS,
+        format_func=METRIC_LABELS.__getitem__,
+        key="metric",
+        on_change=change_metric,
+        disabled=st.session_state.get("instance_edge_weight_type") is not None,
+    )
+
+    # Edit instances with coordinate distances without solving them from scratch
+    if (
+        st.session_state["instance"] is not None
+        and st.session_state.get("instance_edge_weight_type") is None
+    ):
+        col1, col2, _ = st.columns([1, 1, 1])
+        col1.button("Add a city", key="add_city", on_click=add_random_city)
+        col2.button(
+            "Remove the last city",
+            key="remove_city",
+            on_click=remove_last_city,
+            disabled=len(st.session_state["instance"]) <= 2,
+        )
+
     if st.session_state["instance"] is not None:
         st.session_state["toggle_greedy"] = False
         st.session_state["toggle_exact"] = False
 
         map_and_solution_plot()
 
+    # The page is drawn, so import the slow modules before they are needed
+    warm_up_slow_modules()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,310 @@
+"""A matrix-free k-nearest-neighbor candidate graph for large TSP instances.
+
+Instead of a dense distance matrix, the candidate graph stores for every city the
+indices of and distances to its k nearest neighbors. The neighbors are found with a
+uniform grid of buckets over the coordinates, which is also kept around so solvers
+can search for the nearest city among an arbitrary subset (e.g. the unvisited
+cities) without ever computing all pairwise distances.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# The default number of nearest neighbors stored for every city.
+DEFAULT_NO_NEIGHBORS = 10
+
+# The maximum number of distances computed at once when searching for neighbors.
+_MAX_BLOCK_ENTRIES = 2**20
+
+
+@dataclass(frozen=True)
+class SpatialGrid:
+    """A uniform grid of square buckets over the cities of an instance.
+
+    The cities are sorted by the bucket (cell) they fall into such that the cities in
+    cell c are cell_cities[cell_start[c]:cell_start[c + 1]]. Cells are numbered row by
+    row, i.e. the cell in column x and row y has the number y * no_cells_x + x.
+    """
+
+    origin: np.ndarray
+    cell_size: float
+    no_cells_x: int
+    no_cells_y: int
+    cell_start: np.ndarray
+    cell_cities: np.ndarray
+    city_cells: np.ndarray
+
+
+@dataclass(frozen=True)
+class CandidateGraph:
+    """The k nearest neighbors of every city of an instance.
+
+    Row i of neighbors holds the indices of the k cities closest to city i sorted by
+    increasing distance, and the same row of neighbor_distances holds the distances.
+    """
+
+    coordinates: np.ndarray
+    neighbors: np.ndarray
+    neighbor_distances: np.ndarray
+    grid: SpatialGrid
+
+    @property
+    def no_cities(self) -> int:
+        """The number of cities in the instance."""
+        return int(self.coordinates.shape[0])
+
+    def distance(self, city_a: int, city_b: int) -> float:
+        """The Euclidean distance between two cities computed from the coordinates."""
+        delta = self.coordinates[city_a] - self.coordinates[city_b]
+        return float(np.hypot(delta[0], delta[1]))
+
+
+def build_spatial_grid(
+    cities_coordinates: np.ndarray, cities_per_cell: float = 2.0
+) -> SpatialGrid:
+    """Builds a grid of buckets with on average cities_per_cell cities per cell.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        cities_per_cell (float, optional): The targeted average number of cities per
+            cell. Defaults to 2.0.
+
+    Returns:
+        SpatialGrid: The grid with the cities sorted into cells.
+    """
+    no_cities = cities_coordinates.shape[0]
+    origin = cities_coordinates.min(axis=0)
+    extent = cities_coordinates.max(axis=0) - origin
+
+    # Use square cells sized such that the bounding box holds the requested density
+    no_cells_wanted = max(1.0, no_cities / cities_per_cell)
+    area = float(extent[0] * extent[1])
+    if area > 0:
+        cell_size = float(np.sqrt(area / no_cells_wanted))
+    else:
+        # All cities lie on a line (or a point), so use the longest side only
+        cell_size = float(max(extent.max(), 1.0) / no_cells_wanted)
+
+    no_cells_x = max(1, int(np.ceil(extent[0] / cell_size)))
+    no_cells_y = max(1, int(np.ceil(extent[1] / cell_size)))
+
+    cell_xy = np.floor((cities_coordinates - origin) / cell_size).astype(np.int64)
+    cell_x = np.clip(cell_xy[:, 0], 0, no_cells_x - 1)
+    cell_y = np.clip(cell_xy[:, 1], 0, no_cells_y - 1)
+    city_cells = cell_y * no_cells_x + cell_x
+
+    cell_cities = np.argsort(city_cells, kind="stable").astype(np.int32)
+    cell_start = np.zeros(no_cells_x * no_cells_y + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount(city_cells, minlength=no_cells_x * no_cells_y),
+        out=cell_start[1:],
+    )
+
+    return SpatialGrid(
+        origin=origin,
+        cell_size=cell_size,
+        no_cells_x=no_cells_x,
+        no_cells_y=no_cells_y,
+        cell_start=cell_start,
+        cell_cities=cell_cities,
+        city_cells=city_cells,
+    )
+
+
+def _cells_within(grid: SpatialGrid, cell: int, radius: int) -> np.ndarray:
+    """Returns the cells at a Chebyshev (ring) distance of at most radius from the
+    given cell, clipped to the grid."""
+    cell_x, cell_y = cell % grid.no_cells_x, cell // grid.no_cells_x
+    xs = np.arange(max(0, cell_x - radius), min(grid.no_cells_x, cell_x + radius + 1))
+    ys = np.arange(max(0, cell_y - radius), min(grid.no_cells_y, cell_y + radius + 1))
+    return (ys[:, np.newaxis] * grid.no_cells_x + xs[np.newaxis, :]).ravel()
+
+
+def cells_in_ring(grid: SpatialGrid, cell: int, radius: int) -> np.ndarray:
+    """Returns the cells at a Chebyshev (ring) distance of exactly radius from the
+    given cell, clipped to the grid."""
+    cell_x, cell_y = cell % grid.no_cells_x, cell // grid.no_cells_x
+    cells = _cells_within(grid, cell, radius)
+    ring_distance = np.maximum(
+        np.abs(cells % grid.no_cells_x - cell_x),
+        np.abs(cells // grid.no_cells_x - cell_y),
+    )
+    ring: np.ndarray = cells[ring_distance == radius]
+    return ring
+
+
+def cities_in_cells(grid: SpatialGrid, cells: np.ndarray) -> np.ndarray:
+    """Returns the cities located in the given cells as one array."""
+    starts = grid.cell_start[cells]
+    counts = grid.cell_start[cells + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=grid.cell_cities.dtype)
+
+    # Build the concatenation of the ranges starts[c]..starts[c] + counts[c] - 1
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return grid.cell_cities[offsets + np.arange(total)]
+
+
+def grid_covers_everything(grid: SpatialGrid, radius: int) -> bool:
+    """Whether a search radius (in cells) around any cell covers the whole grid."""
+    return radius >= max(grid.no_cells_x, grid.no_cells_y)
+
+
+def _nearest_in_block(
+    cities_coordinates: np.ndarray,
+    queries: np.ndarray,
+    candidates: np.ndarray,
+    no_neighbors: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Finds the no_neighbors nearest candidates (excluding the query itself) for
+    every query city, sorted by distance."""
+    delta = (
+        cities_coordinates[queries][:, np.newaxis, :]
+        - cities_coordinates[candidates][np.newaxis, :, :]
+    )
+    distances = np.hypot(delta[..., 0], delta[..., 1])
+    distances[queries[:, np.newaxis] == candidates[np.newaxis, :]] = np.inf
+
+    nearest = np.argpartition(distances, no_neighbors - 1, axis=1)[:, :no_neighbors]
+    nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+    order = np.argsort(nearest_distances, axis=1, kind="stable")
+
+    return (
+        candidates[np.take_along_axis(nearest, order, axis=1)],
+        np.take_along_axis(nearest_distances, order, axis=1),
+    )
+
+
+def build_candidate_graph(
+    cities_coordinates: np.ndarray,
+    no_neighbors: int = DEFAULT_NO_NEIGHBORS,
+    cities_per_cell: float | None = None,
+) -> CandidateGraph:
+    """Builds the k-nearest-neighbor candidate graph of an instance without computing
+    a dense distance matrix.
+
+    For every cell of the grid, the neighbors of the cities in the cell are searched
+    among the cities in the surrounding block of cells. The block is grown for the
+    cities whose k-th neighbor could lie outside of it, so the result is exact.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates as
+            returned by generate_instance.
+        no_neighbors (int, optional): The number of neighbors k to store for every
+            city. It is capped at no_cities - 1. Defaults to DEFAULT_NO_NEIGHBORS.
+        cities_per_cell (float | None, optional): The average number of cities per
+            grid cell. Defaults to None, which uses a density suited to no_neighbors.
+
+    Returns:
+        CandidateGraph: The neighbors (int32) and their distances (float32).
+    """
+    # Test that there are cities
+    if cities_coordinates.shape[0] <= 1:
+        raise ValueError("The cities_coordinates should have at least 2 cities.")
+
+    # Test that the size of the input is correct
+    if cities_coordinates.ndim != 2 or cities_coordinates.shape[1] != 2:
+        raise ValueError("The cities_coordinates should have shape (no_cities, 2).")
+
+    if no_neighbors < 1:
+        raise ValueError("The no_neighbors should be at least 1.")
+
+    cities_coordinates = np.asarray(cities_coordinates, dtype=np.float64)
+    no_cities = cities_coordinates.shape[0]
+    no_neighbors = min(no_neighbors, no_cities - 1)
+
+    if cities_per_cell is None:
+        cities_per_cell = max(4.0, 1.5 * no_neighbors)
+    grid = build_spatial_grid(cities_coordinates, cities_per_cell=cities_per_cell)
+
+    neighbors = np.empty((no_cities, no_neighbors), dtype=np.int32)
+    neighbor_distances = np.empty((no_cities, no_neighbors), dtype=np.float32)
+
+    non_empty_cells = np.flatnonzero(np.diff(grid.cell_start))
+    for cell in non_empty_cells.tolist():
+        pending = cities_in_cells(grid, np.array([cell]))
+        radius = 1
+
+        while pending.shape[0] > 0:
+            candidates = cities_in_cells(grid, _cells_within(grid, cell, radius))
+            exhaustive = grid_covers_everything(grid, radius)
+
+            # Not enough candidates around the cell, so look further out
+            if candidates.shape[0] <= no_neighbors and not exhaustive:
+                radius += 1
+                continue
+
+            # Any city outside of the block is at least this far away from the cell
+            guaranteed_distance = radius * grid.cell_size
+            rows_per_block = max(1, _MAX_BLOCK_ENTRIES // candidates.shape[0])
+            still_pending = []
+
+            for start in range(0, pending.shape[0], rows_per_block):
+                queries = pending[start : start + rows_per_block]
+                block_neighbors, block_distances = _nearest_in_block(
+                    cities_coordinates, queries, candidates, no_neighbors
+                )
+
+                done = exhaustive | (block_distances[:, -1] <= guaranteed_distance)
+                neighbors[queries[done]] = block_neighbors[done]
+                neighbor_distances[queries[done]] = block_distances[done]
+                still_pending.append(queries[~done])
+
+            pending = np.concatenate(still_pending)
+            radius += 1
+
+    return CandidateGraph(
+        coordinates=cities_coordinates,
+        neighbors=neighbors,
+        neighbor_distances=neighbor_distances,
+        grid=grid,
+    )
+
+
+def nearest_unvisited_city(
+    candidate_graph: CandidateGraph,
+    city: int,
+    visited: np.ndarray,
+    unvisited_per_cell: np.ndarray,
+) -> int:
+    """Finds the nearest unvisited city to a city by searching the grid in rings of
+    cells around it.
+
+    Args:
+        candidate_graph (CandidateGraph): The candidate graph of the instance.
+        city (int): The city to search from.
+        visited (np.ndarray): Boolean array marking the visited cities.
+        unvisited_per_cell (np.ndarray): The number of unvisited cities in every cell
+            of the grid, used to skip cells that are empty.
+
+    Returns:
+        int: The nearest unvisited city, or -1 if all cities are visited.
+    """
+    grid = candidate_graph.grid
+    cell = int(grid.city_cells[city])
+    best_city, best_distance = -1, np.inf
+    radius = 0
+
+    while True:
+        ring = cells_in_ring(grid, cell, radius)
+        ring = ring[unvisited_per_cell[ring] > 0]
+        if ring.shape[0] > 0:
+            candidates = cities_in_cells(grid, ring)
+            candidates = candidates[~visited[candidates]]
+            coordinates = candidate_graph.coordinates
+            delta = coordinates[candidates] - coordinates[city]
+            distances = np.hypot(delta[:, 0], delta[:, 1])
+            nearest = int(np.argmin(distances))
+            if distances[nearest] < best_distance:
+                best_city = int(candidates[nearest])
+                best_distance = float(distances[nearest])
+
+        # Everything not yet searched is at least radius cells away
+        if best_distance <= radius * grid.cell_size or grid_covers_everything(
+            grid, radius
+        ):
+            return best_city
+
+        radius += 1
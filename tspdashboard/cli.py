@@ -0,0 +1,507 @@
+"""Solve batches of TSP instances from the command line, without the dashboard.
+
+The instances are TSPLIB (.tsp, .atsp) or CSV files, given as paths, directories or
+glob patterns, or random instances of given sizes generated from a seed:
+
+    tspdashboard data/*.tsp --algorithm routing --time-limit 30 --output runs.csv
+    tspdashboard --random 100 1000 10000 --seed 7 --output runs.jsonl --resume
+
+Every instance is solved in its own process of a SolverPool, so the instances are
+solved in parallel and a solver that exceeds its time limit is terminated. The time
+limit is passed on to the solvers that search until a time limit, and a job that
+runs longer than the time limit plus a grace period, e.g. to read its instance, is
+stopped. Results are appended to the output (CSV or JSON lines, by the suffix) as
+soon as each instance is solved, so an interrupted run can be resumed with --resume,
+which skips the instances already solved in the output.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Literal, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from tspdashboard.candidate_graph import CandidateGraph, build_candidate_graph
+from tspdashboard.decomposition import decomposition_algorithm
+from tspdashboard.exact_mip_agorithm import exact_algorithm
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.instance_io import Instance, read_instance, write_tour
+from tspdashboard.jobs import Job, SolverPool, default_pool_size
+from tspdashboard.local_search import local_search
+from tspdashboard.metrics import is_symmetric
+from tspdashboard.routing_algorithm import routing_algorithm
+from tspdashboard.utilities import generate_instance, validate_tour
+
+Algorithm = Literal["greedy", "local_search", "routing", "exact", "decomposition"]
+
+ALGORITHMS: tuple[Algorithm, ...] = (
+    "greedy",
+    "local_search",
+    "routing",
+    "exact",
+    "decomposition",
+)
+
+# The file types read from directories
+INSTANCE_SUFFIXES = (".tsp", ".atsp", ".csv")
+
+# The columns of the output, in order
+RESULT_FIELDS = (
+    "instance",
+    "algorithm",
+    "status",
+    "no_cities",
+    "objective",
+    "seconds",
+    "tour_file",
+    "error",
+)
+
+# The instances above this size with unrounded coordinate distances are solved
+# without a dense distance matrix
+MAX_DENSE_CITIES = 5_000
+
+# How often the pool is polled for finished jobs
+POLL_INTERVAL_SECONDS = 0.1
+
+# The number of jobs per worker that are submitted to the pool at a time, so the
+# next job is always queued, without a queued job for every instance of a batch
+SUBMITTED_JOBS_PER_WORKER = 2
+
+
+def instance_paths(patterns: Sequence[str]) -> List[str]:
+    """The instance files given by paths, directories and glob patterns, without
+    duplicates and in the order they are given.
+
+    Args:
+        patterns (Sequence[str]): Paths of files, directories, whose .tsp, .atsp and
+            .csv files are taken, or glob patterns, e.g. "data/**/*.tsp".
+
+    Returns:
+        List[str]: The paths of the instance files.
+    """
+    paths: List[str] = []
+    for pattern in patterns:
+        if Path(pattern).is_dir():
+            matches = sorted(
+                str(path)
+                for path in Path(pattern).iterdir()
+                if path.suffix.lower() in INSTANCE_SUFFIXES
+            )
+        elif Path(pattern).exists():
+            matches = [pattern]
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                raise ValueError(f"No instance files match {pattern!r}.")
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def random_instance_name(no_cities: int, seed: int) -> str:
+    """The name of a random instance, which identifies it when resuming a run."""
+    return f"random-{no_cities}-seed{seed}"
+
+
+def _load_instance(
+    path: str | None, no_cities: int | None, seed: int | None
+) -> Instance:
+    """Reads the instance file, or generates the random instance."""
+    if path is not None:
+        return read_instance(path)
+    assert no_cities is not None
+    return Instance(
+        name=random_instance_name(no_cities, seed or 0),
+        coordinates=generate_instance(no_cities, seed=seed),
+    )
+
+
+def _without_dense_matrix(instance: Instance) -> bool:
+    """Whether the instance is too large for a dense distance matrix and its
+    distances can be computed on demand from the coordinates."""
+    return instance.edge_weight_type is None and instance.no_cities > MAX_DENSE_CITIES
+
+
+def _solve(
+    instance: Instance, algorithm: Algorithm, time_limit: timedelta
+) -> Tuple[List[int], float]:
+    """Solves an instance with the algorithm."""
+    if algorithm == "routing":
+        if _without_dense_matrix(instance):
+            return routing_algorithm(
+                cities_coordinates=instance.coordinates,
+                metric=instance.metric,
+                solve_time_limit=time_limit,
+            )
+        return routing_algorithm(
+            instance.distance_matrix(), solve_time_limit=time_limit
+        )
+
+    if algorithm == "decomposition":
+        # The windows are solved on the unrounded Euclidean distances of the
+        # coordinates
+        if instance.edge_weight_type is not None or instance.metric != "euclidean":
+            raise ValueError(
+                "The decomposition algorithm needs unrounded Euclidean distances."
+            )
+        return decomposition_algorithm(instance.coordinates, time_limit=time_limit)
+
+    # The greedy algorithm and the local search use the neighbor lists of the
+    # candidate graph for large instances with Euclidean distances
+    distances: np.ndarray | CandidateGraph
+    if _without_dense_matrix(instance) and instance.metric == "euclidean":
+        distances = build_candidate_graph(instance.coordinates)
+    else:
+        distances = instance.distance_matrix()
+
+    tour, objective = greedy_algorithm(distances)
+    if algorithm == "greedy":
+        return tour, objective
+    if algorithm == "local_search":
+        return local_search(tour, distances, time_limit=time_limit)
+
+    if not isinstance(distances, np.ndarray):
+        raise ValueError(
+            "The exact algorithm needs a dense distance matrix, i.e. at most "
+            f"{MAX_DENSE_CITIES} cities with Euclidean distances."
+        )
+    return exact_algorithm(
+        distances,
+        solve_time_limit=time_limit,
+        formulation="dfj" if is_symmetric(distances) else "gavish_graves",
+        initial_tour=tour,
+    )
+
+
+def solve_instance(  # noqa: PLR0913
+    *,
+    algorithm: Algorithm,
+    time_limit: timedelta,
+    path: str | None = None,
+    no_cities: int | None = None,
+    seed: int | None = None,
+    tour_directory: str | None = None,
+    progress_callback: Any = None,
+) -> Dict[str, Any]:
+    """Reads or generates an instance and solves it, in a worker process of the
+    pool.
+
+    Args:
+        algorithm (Algorithm): The algorithm to solve the instance with.
+        time_limit (timedelta): The time limit of the search of the algorithm.
+        path (str | None, optional): The instance file. Defaults to None, in which
+            case a random instance of no_cities cities is generated from the seed.
+        no_cities (int | None, optional): The size of the random instance. Defaults
+            to None.
+        seed (int | None, optional): The seed of the random instance. Defaults to
+            None.
+        tour_directory (str | None, optional): The directory to write the tour to,
+            as a TSPLIB .tour file. Defaults to None, i.e. the tour is not written.
+        progress_callback (Any, optional): Passed by the pool and ignored.
+            Defaults to None.
+
+    Returns:
+        Dict[str, Any]: The size of the instance, the objective and the tour file.
+    """
+    instance = _load_instance(path, no_cities, seed)
+    tour, objective = _solve(instance, algorithm, time_limit)
+    validate_tour(tour, instance.no_cities)
+
+    tour_file = None
+    if tour_directory is not None:
+        tour_file = str(Path(tour_directory) / f"{instance.name}.{algorithm}.tour")
+        write_tour(
+            tour_file,
+            tour,
+            name=f"{instance.name}.{algorithm}.tour",
+            comment=f"Length {objective}",
+        )
+
+    return {
+        "no_cities": instance.no_cities,
+        "objective": objective,
+        "tour_file": tour_file,
+    }
+
+
+def completed_instances(output: str | Path, algorithm: str) -> set[str]:
+    """The instances that are already solved with the algorithm in an output file.
+
+    Args:
+        output (str | Path): The CSV or JSON lines file of a previous run.
+        algorithm (str): The algorithm of the run.
+
+    Returns:
+        set[str]: The instances with status "done".
+    """
+    path = Path(output)
+    if not path.exists():
+        return set()
+
+    with open(path, newline="") as file:
+        if path.suffix.lower() == ".csv":
+            rows: Iterator[Dict[str, Any]] = csv.DictReader(file)
+        else:
+            # A run interrupted while writing can leave a partial last line
+            rows = (
+                json.loads(line)
+                for line in file
+                if line.strip() and line.rstrip().endswith("}")
+            )
+        return {
+            row["instance"]
+            for row in rows
+            if row.get("algorithm") == algorithm and row.get("status") == "done"
+        }
+
+
+class ResultWriter:
+    """Appends results to a CSV or JSON lines file, or writes CSV to a stream, and
+    flushes after every result so finished results survive an interrupted run.
+
+    Args:
+        output (TextIO): The open file or stream.
+        json_lines (bool): Whether to write JSON lines instead of CSV.
+    """
+
+    def __init__(self, output: TextIO, json_lines: bool) -> None:
+        self.output = output
+        self.json_lines = json_lines
+        self._csv_writer: csv.DictWriter | None = None
+        if not json_lines:
+            self._csv_writer = csv.DictWriter(output, fieldnames=RESULT_FIELDS)
+            # Only write the header to a new file
+            if not output.seekable() or output.tell() == 0:
+                self._csv_writer.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """Writes a result."""
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(row)
+        else:
+            self.output.write(json.dumps(row) + "\n")
+        self.output.flush()
+
+
+def _result_row(
+    instance: str, algorithm: str, job: Job, seconds: float
+) -> Dict[str, Any]:
+    """The output row of a finished job."""
+    result = job.result or {}
+    return {
+        "instance": instance,
+        "algorithm": algorithm,
+        "status": job.status,
+        "no_cities": result.get("no_cities"),
+        "objective": result.get("objective"),
+        "seconds": round(
+            job.performance.seconds if job.performance is not None else seconds, 3
+        ),
+        "tour_file": result.get("tour_file"),
+        "error": job.error,
+    }
+
+
+def run_batch(  # noqa: PLR0913
+    jobs: Sequence[Tuple[str, Dict[str, Any]]],
+    algorithm: Algorithm,
+    time_limit: timedelta,
+    writer: ResultWriter,
+    *,
+    no_workers: int,
+    grace_period: timedelta,
+    tour_directory: str | None = None,
+) -> List[Dict[str, Any]]:
+    """Solves the instances in a pool of processes and writes each result as soon
+    as it is available. At most SUBMITTED_JOBS_PER_WORKER jobs per worker are in the
+    pool at a time, and the next instances are submitted as jobs finish.
+
+    Args:
+        jobs (Sequence[Tuple[str, Dict[str, Any]]]): The names of the instances and
+            the arguments of solve_instance locating them, i.e. path or no_cities and
+            seed.
+        algorithm (Algorithm): The algorithm to solve the instances with.
+        time_limit (timedelta): The time limit of the algorithm per instance.
+        writer (ResultWriter): Where the results are written.
+        no_workers (int): The number of instances solved at the same time.
+        grace_period (timedelta): How much longer than the time limit a job may run
+            before it is terminated.
+        tour_directory (str | None, optional): The directory to write the tours to.
+            Defaults to None.
+
+    Returns:
+        List[Dict[str, Any]]: The results in the order they finished.
+    """
+    solver_pool = SolverPool(max_workers=no_workers, trace_memory=False)
+    pending = iter(jobs)
+    submitted: Dict[int, Tuple[str, float]] = {}
+
+    results: List[Dict[str, Any]] = []
+    try:
+        while True:
+            # Refill the pool as jobs finish
+            while len(submitted) < SUBMITTED_JOBS_PER_WORKER * no_workers:
+                next_job = next(pending, None)
+                if next_job is None:
+                    break
+                name, kwargs = next_job
+                job_id = solver_pool.submit(
+                    solve_instance,
+                    wall_time_limit=time_limit + grace_period,
+                    algorithm=algorithm,
+                    time_limit=time_limit,
+                    tour_directory=tour_directory,
+                    **kwargs,
+                )
+                submitted[job_id] = (name, time.perf_counter())
+            if not submitted:
+                break
+
+            for job_id in list(submitted):
+                job = solver_pool.poll(job_id)
+                if not job.finished:
+                    continue
+
+                name, submitted_at = submitted.pop(job_id)
+                row = _result_row(
+                    name, algorithm, job, time.perf_counter() - submitted_at
+                )
+                solver_pool.forget(job_id)
+                writer.write(row)
+                results.append(row)
+                print(
+                    f"[{len(results)}/{len(jobs)}] {name}: "
+                    f"{row['status']} {row['objective'] or ''}",
+                    file=sys.stderr,
+                )
+            time.sleep(POLL_INTERVAL_SECONDS)
+    finally:
+        solver_pool.shutdown()
+
+    return results
+
+
+def _parser() -> argparse.ArgumentParser:
+    """The parser of the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="tspdashboard",
+        description=__doc__.splitlines()[0],
+    )
+    parser.add_argument(
+        "instances",
+        nargs="*",
+        help="Instance files, directories or glob patterns, e.g. 'data/*.tsp'.",
+    )
+    parser.add_argument(
+        "--random",
+        type=int,
+        nargs="+",
+        default=[],
+        metavar="NO_CITIES",
+        help="Also solve random instances of these sizes.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="The seed of the first random instance, incremented for the next ones.",
+    )
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="routing")
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=10.0,
+        help="The time limit of the algorithm per instance in seconds.",
+    )
+    parser.add_argument(
+        "--grace-period",
+        type=float,
+        default=60.0,
+        help="How many seconds past the time limit a job is terminated.",
+    )
+    parser.add_argument("--workers", type=int, default=default_pool_size())
+    parser.add_argument(
+        "--output",
+        help="The .csv or .jsonl file the results are appended to. Defaults to CSV "
+        "on the standard output.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip the instances that are already solved in the output.",
+    )
+    parser.add_argument(
+        "--tour-directory", help="Write the tours as .tour files to this directory."
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the batch solver.
+
+    Args:
+        argv (Sequence[str] | None, optional): The command line arguments. Defaults
+            to None, which means sys.argv.
+
+    Returns:
+        int: The exit code, 1 if any instance was not solved.
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+
+    if not args.instances and not args.random:
+        parser.error("Give instance files or --random sizes.")
+    if args.resume and args.output is None:
+        parser.error("--resume needs an --output file.")
+
+    try:
+        paths = instance_paths(args.instances)
+    except ValueError as error:
+        parser.error(str(error))
+
+    jobs: List[Tuple[str, Dict[str, Any]]] = [(path, {"path": path}) for path in paths]
+    jobs += [
+        (
+            random_instance_name(no_cities, args.seed + index),
+            {"no_cities": no_cities, "seed": args.seed + index},
+        )
+        for index, no_cities in enumerate(args.random)
+    ]
+
+    if args.resume:
+        completed = completed_instances(args.output, args.algorithm)
+        jobs = [(name, kwargs) for name, kwargs in jobs if name not in completed]
+        print(f"Skipping {len(completed)} solved instances.", file=sys.stderr)
+
+    if args.tour_directory is not None:
+        Path(args.tour_directory).mkdir(parents=True, exist_ok=True)
+
+    run_arguments: Dict[str, Any] = {
+        "algorithm": args.algorithm,
+        "time_limit": timedelta(seconds=args.time_limit),
+        "no_workers": args.workers,
+        "grace_period": timedelta(seconds=args.grace_period),
+        "tour_directory": args.tour_directory,
+    }
+    if args.output is None:
+        results = run_batch(
+            jobs, writer=ResultWriter(sys.stdout, False), **run_arguments
+        )
+    else:
+        json_lines = Path(args.output).suffix.lower() in (".jsonl", ".json")
+        with open(args.output, "a", newline="") as output:
+            results = run_batch(
+                jobs, writer=ResultWriter(output, json_lines), **run_arguments
+            )
+
+    return 0 if all(row["status"] == "done" for row in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,466 @@
+"""Construction heuristics building a first tour of an instance.
+
+Besides the nearest neighbor tours of greedy_algorithm, there are three
+construction heuristics, which are chosen by construct:
+
+- "hilbert" visits the cities in the order of the Hilbert curve through the
+  bounding box of the cities, i.e. in the order a curve that fills the plane
+  passes them (Platzman and Bartholdi, 1989). It only sorts the cities by their
+  position on the curve, which takes O(n log n) time, so it builds tours of
+  millions of cities in seconds, but the tours are about 40 % longer than optimal.
+- "greedy_edge" adds the edges from the shortest to the longest, skipping the edges
+  that would give a city a third edge or close a cycle (checked with union-find),
+  until the edges form a tour. Its tours are about 15-25 % longer than optimal,
+  and it is a better start for the local search than nearest neighbor tours.
+- "savings" is the savings heuristic of Clarke and Wright (1964): every city is
+  first visited from a hub city on a separate round trip, and the trips are merged
+  by the pairs of cities that save the most distance. It is the greedy edge
+  heuristic with the savings as edge weights, and its tours are about 12-17 %
+  longer than optimal.
+
+Both edge heuristics only consider the edges to the nearest neighbors of every city,
+which are taken from a candidate graph or the distance matrix. The paths left when
+the candidate edges are used up are joined by repeating the heuristic on the
+edges between their end cities.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Callable, List, Literal, Tuple
+
+import numpy as np
+
+from tspdashboard.candidate_graph import CandidateGraph, build_candidate_graph
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.instrumentation import add_attributes, timed
+from tspdashboard.local_search import nearest_neighbors
+from tspdashboard.metrics import is_symmetric, pair_distances
+from tspdashboard.utilities import tour_length
+
+log = logging.getLogger(__name__)
+
+ConstructionMethod = Literal[
+    "auto", "nearest_neighbor", "hilbert", "greedy_edge", "savings"
+]
+
+# The methods chosen by "auto" from the best to the worst tours, with the largest
+# instance each is chosen for and the approximate time it takes per city
+_AUTO_METHODS: Tuple[Tuple[ConstructionMethod, int, float], ...] = (
+    ("savings", 100_000, 2e-5),
+    ("greedy_edge", 200_000, 2e-5),
+    ("hilbert", 2**63, 2e-6),
+)
+
+# The approximate time it takes per city to build a candidate graph
+_CANDIDATE_GRAPH_SECONDS_PER_CITY = 2e-5
+
+# The number of nearest neighbors whose edges are considered by the edge heuristics
+_NO_CANDIDATES = 8
+
+# The end cities of paths are joined on all edges between them when there are at
+# most this many, and on the edges to their nearest end cities otherwise
+_MAX_DENSE_END_CITIES = 1_000
+
+# The number of bits of the grid the Hilbert curve passes through, per axis
+_HILBERT_ORDER = 16
+
+PairDistances = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def _no_cities(distance_matrix: np.ndarray | CandidateGraph) -> int:
+    """The number of cities of the instance."""
+    if isinstance(distance_matrix, CandidateGraph):
+        return distance_matrix.no_cities
+    return len(distance_matrix)
+
+
+def _edge_lengths(distance_matrix: np.ndarray | CandidateGraph) -> PairDistances:
+    """A function computing the distances of pairs of cities, from the distance
+    matrix or from the coordinates of a candidate graph."""
+    if isinstance(distance_matrix, CandidateGraph):
+        coordinates = distance_matrix.coordinates
+
+        def coordinate_distances(city_a: np.ndarray, city_b: np.ndarray) -> np.ndarray:
+            return pair_distances(coordinates, city_a, city_b)
+
+        return coordinate_distances
+
+    def matrix_distances(city_a: np.ndarray, city_b: np.ndarray) -> np.ndarray:
+        distances: np.ndarray = np.asarray(
+            distance_matrix[city_a, city_b], dtype=np.float64
+        )
+        return distances
+
+    return matrix_distances
+
+
+def _closed_tour(
+    order: np.ndarray,
+    distance_matrix: np.ndarray | CandidateGraph | None,
+    cities_coordinates: np.ndarray | None = None,
+) -> Tuple[List[int], float]:
+    """The tour visiting the cities in the order, rotated to start and end in city 0,
+    and its length."""
+    start = int(np.flatnonzero(order == 0)[0])
+    tour = np.concatenate((order[start:], order[:start], order[start : start + 1]))
+    return tour.tolist(), tour_length(
+        tour, distance_matrix, cities_coordinates=cities_coordinates
+    )
+
+
+def hilbert_order(cities_coordinates: np.ndarray) -> np.ndarray:
+    """The cities sorted by their position on the Hilbert curve through the bounding
+    box of the cities.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+
+    Returns:
+        np.ndarray: The indices of the cities in the order the curve passes them.
+    """
+    # The cells of a 2^order x 2^order grid over the bounding box
+    minimum = cities_coordinates.min(axis=0)
+    extent = float(np.ptp(cities_coordinates, axis=0).max())
+    side = (1 << _HILBERT_ORDER) - 1
+    cells = np.floor(
+        (cities_coordinates - minimum) / (extent if extent > 0 else 1.0) * side
+    ).astype(np.int64)
+    x, y = cells[:, 0], cells[:, 1]
+
+    # The distance along the curve, from the largest quadrants to the smallest,
+    # rotating and flipping the coordinates into the orientation of the quadrant
+    distance = np.zeros(len(cities_coordinates), dtype=np.int64)
+    size = 1 << (_HILBERT_ORDER - 1)
+    while size > 0:
+        right = (x & size) > 0
+        top = (y & size) > 0
+        distance += size * size * ((3 * right) ^ top)
+
+        flip = ~top & right
+        x = np.where(flip, side - x, x)
+        y = np.where(flip, side - y, y)
+        x, y = np.where(top, x, y), np.where(top, y, x)
+        size >>= 1
+
+    order: np.ndarray = np.argsort(distance, kind="stable")
+    return order
+
+
+def _find(parents: List[int], city: int) -> int:
+    """The root of the path containing the city, halving the paths to the root."""
+    while parents[city] != city:
+        parents[city] = parents[parents[city]]
+        city = parents[city]
+    return city
+
+
+def _add_edges(
+    first: np.ndarray,
+    second: np.ndarray,
+    weights: np.ndarray,
+    adjacent: List[List[int]],
+    parents: List[int],
+) -> None:
+    """Adds the edges from the lightest to the heaviest, unless they would give a
+    city a third edge or close a cycle, to the lists of adjacent cities and the
+    union-find forest of the paths. The loop runs on Python lists, which are much
+    faster than NumPy arrays for single elements."""
+    order = np.argsort(weights, kind="stable")
+    for city_a, city_b in zip(
+        first[order].tolist(), second[order].tolist(), strict=True
+    ):
+        adjacent_a, adjacent_b = adjacent[city_a], adjacent[city_b]
+        if len(adjacent_a) == 2 or len(adjacent_b) == 2:
+            continue
+        root_a, root_b = _find(parents, city_a), _find(parents, city_b)
+        if root_a == root_b:
+            continue
+        parents[root_a] = root_b
+        adjacent_a.append(city_b)
+        adjacent_b.append(city_a)
+
+
+def _end_city_edges(
+    end_cities: np.ndarray,
+    distance_matrix: np.ndarray | CandidateGraph,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """The edges between the end cities of paths, all of them if there are few end
+    cities and the edges to their nearest end cities otherwise."""
+    no_end_cities = len(end_cities)
+    if no_end_cities <= _MAX_DENSE_END_CITIES:
+        first, second = np.triu_indices(no_end_cities, k=1)
+    elif isinstance(distance_matrix, CandidateGraph):
+        graph = build_candidate_graph(
+            distance_matrix.coordinates[end_cities], no_neighbors=_NO_CANDIDATES
+        )
+        first = np.repeat(np.arange(no_end_cities), _NO_CANDIDATES)
+        second = graph.neighbors.ravel()
+    else:
+        neighbors = nearest_neighbors(
+            distance_matrix[np.ix_(end_cities, end_cities)], _NO_CANDIDATES
+        )
+        first = np.repeat(np.arange(no_end_cities), _NO_CANDIDATES)
+        second = neighbors.ravel()
+    return end_cities[first], end_cities[second]
+
+
+def _greedy_path(
+    distance_matrix: np.ndarray | CandidateGraph,
+    edge_weights: PairDistances,
+    hub: int | None = None,
+) -> np.ndarray:
+    """A path through all cities other than the hub built by adding the edges from
+    the lightest to the heaviest, first among the candidate edges and then between
+    the end cities of the paths until a single path is left."""
+    if isinstance(distance_matrix, CandidateGraph):
+        neighbors = distance_matrix.neighbors
+    else:
+        neighbors = nearest_neighbors(
+            distance_matrix, min(_NO_CANDIDATES, len(distance_matrix) - 1)
+        )
+    no_cities = len(neighbors)
+    cities = np.arange(no_cities)
+
+    # Every edge once, also if only one of its cities is a neighbor of the other
+    first = np.repeat(cities, neighbors.shape[1])
+    second = neighbors.ravel()
+    edges = np.unique(np.minimum(first, second) * no_cities + np.maximum(first, second))
+    first, second = np.divmod(edges, no_cities)
+    if hub is not None:
+        keep = (first != hub) & (second != hub)
+        first, second = first[keep], second[keep]
+
+    adjacent: List[List[int]] = [[] for _ in range(no_cities)]
+    parents = list(range(no_cities))
+    _add_edges(first, second, edge_weights(first, second), adjacent, parents)
+
+    # Join the paths by their end cities, i.e. the cities with less than two edges
+    no_rounds = 1
+    while True:
+        degrees = np.fromiter(map(len, adjacent), dtype=np.int64, count=no_cities)
+        end_cities = cities[degrees < 2]
+        if hub is not None:
+            end_cities = end_cities[end_cities != hub]
+        no_paths = len(end_cities) - np.count_nonzero(degrees[end_cities]) // 2
+        if no_paths <= 1:
+            break
+        first, second = _end_city_edges(end_cities, distance_matrix)
+        _add_edges(first, second, edge_weights(first, second), adjacent, parents)
+        no_rounds += 1
+    add_attributes(no_rounds=no_rounds)
+
+    # Follow the path from one of its end cities
+    if len(end_cities) == 0:
+        return np.empty(0, dtype=np.int64)
+    path = [int(end_cities[0])]
+    previous = -1
+    while True:
+        following = [city for city in adjacent[path[-1]] if city != previous]
+        if not following:
+            break
+        previous = path[-1]
+        path.append(following[0])
+    return np.asarray(path, dtype=np.int64)
+
+
+@timed("greedy_edge")
+def greedy_edge_algorithm(
+    distance_matrix: np.ndarray | CandidateGraph,
+) -> Tuple[List[int], float]:
+    """The greedy edge heuristic, which adds the shortest edges that keep the edges
+    a set of paths until they form a tour.
+
+    Args:
+        distance_matrix (np.ndarray | CandidateGraph): The symmetric distance matrix
+            of the TSP problem, or a candidate graph for large instances.
+
+    Returns:
+        Tuple[List[int], float]: A tuple containing the tour, starting and ending in
+        city 0, and its total distance.
+    """
+    path = _greedy_path(distance_matrix, _edge_lengths(distance_matrix))
+    return _closed_tour(path, distance_matrix)
+
+
+@timed("savings")
+def savings_algorithm(
+    distance_matrix: np.ndarray | CandidateGraph,
+) -> Tuple[List[int], float]:
+    """The savings heuristic of Clarke and Wright, with the city closest to the
+    center of the instance as the hub.
+
+    Args:
+        distance_matrix (np.ndarray | CandidateGraph): The symmetric distance matrix
+            of the TSP problem, or a candidate graph for large instances.
+
+    Returns:
+        Tuple[List[int], float]: A tuple containing the tour, starting and ending in
+        city 0, and its total distance.
+    """
+    edge_lengths = _edge_lengths(distance_matrix)
+    if isinstance(distance_matrix, CandidateGraph):
+        coordinates = distance_matrix.coordinates
+        center = coordinates.mean(axis=0)
+        hub = int(np.argmin(np.hypot(*(coordinates - center).T)))
+    else:
+        # The city with the smallest total distance to the others
+        hub = int(np.argmin(np.asarray(distance_matrix, dtype=np.float64).sum(axis=1)))
+
+    cities = np.arange(_no_cities(distance_matrix))
+    hub_distances = edge_lengths(np.full(len(cities), hub), cities)
+
+    # Merging the round trips from the hub to a and b saves d(hub, a) + d(hub, b) -
+    # d(a, b), so the edges with the largest savings have the smallest weights
+    def negative_savings(city_a: np.ndarray, city_b: np.ndarray) -> np.ndarray:
+        savings: np.ndarray = (
+            edge_lengths(city_a, city_b) - hub_distances[city_a] - hub_distances[city_b]
+        )
+        return savings
+
+    path = _greedy_path(distance_matrix, negative_savings, hub=hub)
+    return _closed_tour(np.concatenate(([hub], path)), distance_matrix)
+
+
+@timed("hilbert")
+def hilbert_algorithm(
+    cities_coordinates: np.ndarray,
+    distance_matrix: np.ndarray | CandidateGraph | None = None,
+) -> Tuple[List[int], float]:
+    """Visits the cities in the order of the Hilbert curve.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        distance_matrix (np.ndarray | CandidateGraph | None, optional): The
+            distances the tour length is computed with. Defaults to None, which
+            means the Euclidean distances of the coordinates.
+
+    Returns:
+        Tuple[List[int], float]: A tuple containing the tour, starting and ending in
+        city 0, and its total distance.
+    """
+    coordinates = np.asarray(cities_coordinates, dtype=np.float64)
+    return _closed_tour(hilbert_order(coordinates), distance_matrix, coordinates)
+
+
+def choose_method(
+    no_cities: int,
+    time_limit: timedelta | None = None,
+    symmetric: bool = True,
+    has_coordinates: bool = True,
+    has_distances: bool = True,
+) -> ConstructionMethod:
+    """The method construct uses with method="auto": the method with the best tours
+    that is expected to finish within the time limit.
+
+    Args:
+        no_cities (int): The number of cities of the instance.
+        time_limit (timedelta | None, optional): The time the construction may
+            take. Defaults to None, i.e. no limit.
+        symmetric (bool, optional): Whether the distances are symmetric, which the
+            edge heuristics need. Defaults to True.
+        has_coordinates (bool, optional): Whether the coordinates of the cities are
+            known, which the Hilbert curve needs. Defaults to True.
+        has_distances (bool, optional): Whether a distance matrix or candidate
+            graph is given. Otherwise the other methods first build a candidate
+            graph from the coordinates, which takes about as long as the edge
+            heuristics themselves. Defaults to True.
+
+    Returns:
+        ConstructionMethod: The name of the method.
+    """
+    if not symmetric:
+        return "nearest_neighbor"
+
+    for method, max_cities, seconds_per_city in _AUTO_METHODS:
+        if method == "hilbert" and not has_coordinates:
+            continue
+        graph_seconds_per_city = (
+            _CANDIDATE_GRAPH_SECONDS_PER_CITY
+            if method != "hilbert" and not has_distances
+            else 0.0
+        )
+        fits_time_limit = (
+            time_limit is None
+            or no_cities * (seconds_per_city + graph_seconds_per_city)
+            <= time_limit.total_seconds()
+        )
+        if no_cities <= max_cities and fits_time_limit:
+            return method
+
+    # The Hilbert curve is the fastest method, and greedy edge the fastest that
+    # works without coordinates
+    return "hilbert" if has_coordinates else "greedy_edge"
+
+
+@timed("construct")
+def construct(
+    distance_matrix: np.ndarray | CandidateGraph | None = None,
+    method: ConstructionMethod = "auto",
+    *,
+    cities_coordinates: np.ndarray | None = None,
+    time_limit: timedelta | None = None,
+) -> Tuple[List[int], float]:
+    """Builds a tour with a construction heuristic.
+
+    Args:
+        distance_matrix (np.ndarray | CandidateGraph | None, optional): The distance
+            matrix of the TSP problem, or a candidate graph for large instances in
+            which case the distances are computed on demand from the coordinates.
+            Defaults to None, which means the Euclidean distances of the
+            cities_coordinates, e.g. for instances of millions of cities.
+        method (ConstructionMethod, optional): "nearest_neighbor", "hilbert",
+            "greedy_edge" or "savings", see the module documentation. Defaults to
+            "auto", which uses choose_method.
+        cities_coordinates (np.ndarray | None, optional): The coordinates of the
+            cities, which "hilbert" needs unless a candidate graph is given.
+            Defaults to None.
+        time_limit (timedelta | None, optional): The time the construction may take,
+            used to choose the method with "auto". Defaults to None, i.e. no limit.
+
+    Returns:
+        Tuple[List[int], float]: A tuple containing the tour, starting and ending in
+        city 0, and its total distance.
+    """
+    if cities_coordinates is None and isinstance(distance_matrix, CandidateGraph):
+        cities_coordinates = distance_matrix.coordinates
+    if distance_matrix is None:
+        if cities_coordinates is None:
+            raise ValueError("Either distance_matrix or cities_coordinates is needed.")
+        no_cities = len(cities_coordinates)
+    else:
+        no_cities = _no_cities(distance_matrix)
+    symmetric = not isinstance(distance_matrix, np.ndarray) or is_symmetric(
+        distance_matrix
+    )
+
+    if method == "auto":
+        method = choose_method(
+            no_cities,
+            time_limit=time_limit,
+            symmetric=symmetric,
+            has_coordinates=cities_coordinates is not None,
+            has_distances=distance_matrix is not None,
+        )
+    add_attributes(method=method, no_cities=no_cities)
+    log.info("Constructing a tour of %s cities with %s.", no_cities, method)
+
+    if method == "hilbert":
+        if cities_coordinates is None:
+            raise ValueError("The method 'hilbert' needs the cities_coordinates.")
+        return hilbert_algorithm(cities_coordinates, distance_matrix)
+
+    if method in ("greedy_edge", "savings") and not symmetric:
+        raise ValueError(f"The method {method!r} needs symmetric distances.")
+    if distance_matrix is None:
+        assert cities_coordinates is not None
+        distance_matrix = build_candidate_graph(cities_coordinates)
+
+    # With fewer than three cities there is only a single tour
+    if method == "nearest_neighbor" or no_cities < 3:
+        tour, objective = greedy_algorithm(distance_matrix)
+        return tour, float(objective)
+    if method == "greedy_edge":
+        return greedy_edge_algorithm(distance_matrix)
+    if method == "savings":
+        return savings_algorithm(distance_matrix)
+    raise ValueError(f"Unknown construction method {method!r}.")
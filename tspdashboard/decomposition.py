@@ -0,0 +1,282 @@
+"""Solve large instances by decomposing their tours into windows that are solved
+exactly.
+
+A tour of a large instance is built with the greedy algorithm and local search on
+the candidate graph. It is then cut into windows of window_size consecutive cities.
+Every window is the shortest path from its first to its last city through its
+cities, so it can be solved on its own with exact_algorithm. With the default window
+size, exact_algorithm uses the dynamic program of Held and Karp. A dummy city is
+added that is next to the first and the last city and far from all other cities.
+Windows whose paths are shorter replace their cities in the tour. The first and last
+cities of the windows stay in place, so the windows stitch back together without
+changing the rest of the tour. They are independent, so they can be solved in
+parallel worker processes.
+
+The windows only move cities within them, so the cities around the ends of the
+windows are repaired with local search starting from the cities of the changed
+windows. The next pass shifts the windows, so their ends fall elsewhere. The passes
+stop when a pass changes no window, or after max_passes passes.
+
+Partitioning the cities into clusters of the coordinates (k-means or grid) is not
+used. A tour that visits every cluster once and stitches the optimal paths through
+the clusters crosses the borders of the clusters far less often than good tours do.
+Local search does not repair this: on random instances of 5,000 cities, such tours
+were 0.4 % to 3 % longer than the greedy algorithm followed by local search, for
+clusters of 1,000 down to 12 cities. A window of a good tour is a compact group of
+nearby cities with good entry and exit points. On the same instances, windows of 12
+cities give tours about 0.8 % shorter than local search alone, within about 7 % of
+the Held-Karp bound.
+"""
+
+import functools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from tspdashboard.candidate_graph import build_candidate_graph
+from tspdashboard.exact_mip_agorithm import (
+    DYNAMIC_PROGRAMMING_MAX_CITIES,
+    exact_algorithm,
+)
+from tspdashboard.greedy_algorithm import greedy_algorithm
+from tspdashboard.instrumentation import add_attributes, timed
+from tspdashboard.local_search import local_search
+from tspdashboard.utilities import generate_distance_matrix, tour_length, validate_tour
+
+log = logging.getLogger(__name__)
+
+# The number of cities of a window, whose path the dynamic program solves in a few
+# milliseconds. Larger windows take much longer and barely shorten the tours.
+DEFAULT_WINDOW_SIZE = 12
+
+# The largest number of passes over the windows
+DEFAULT_MAX_PASSES = 8
+
+# The time limit of every exact solve that builds a MIP model
+_DEFAULT_SUBPROBLEM_TIME_LIMIT = timedelta(seconds=10)
+
+
+def _solve_path(
+    cities_coordinates: np.ndarray, exact_max_cities: int, time_limit: timedelta
+) -> List[int]:
+    """The shortest path through the cities from the first to the last city. It is
+    optimal if there are fewer than exact_max_cities cities and the exact solve
+    finishes in time.
+
+    The path is the tour through the cities and a dummy city, without the dummy
+    city. The dummy city is next to the first and the last city. It is further from
+    the other cities than any path is long.
+    """
+    no_cities = len(cities_coordinates)
+    if no_cities <= 3:
+        return list(range(no_cities))
+
+    distance_matrix = generate_distance_matrix(cities_coordinates)
+    far = float(distance_matrix.max()) * no_cities + 1.0
+    path_matrix = np.full((no_cities + 1, no_cities + 1), far)
+    path_matrix[:no_cities, :no_cities] = distance_matrix
+    path_matrix[no_cities, [0, no_cities - 1, no_cities]] = 0.0
+    path_matrix[[0, no_cities - 1], no_cities] = 0.0
+
+    # The dynamic program needs no initial tour, the other solvers start from it
+    tour: List[int] = []
+    if no_cities + 1 > min(exact_max_cities, DYNAMIC_PROGRAMMING_MAX_CITIES):
+        tour, _ = greedy_algorithm(path_matrix)
+        tour, _ = local_search(tour, path_matrix)
+    if no_cities + 1 <= exact_max_cities:
+        try:
+            tour, _ = exact_algorithm(
+                path_matrix,
+                solve_time_limit=time_limit,
+                formulation="dfj",
+                initial_tour=tour or None,
+            )
+        except RuntimeError as error:
+            # Keep the heuristic path if the solver found no tour in time
+            if not tour:
+                raise
+            log.warning("Exact solve of a path failed: %s", error)
+
+    # Cut the tour at the dummy city and follow it from the first city
+    dummy = tour.index(no_cities)
+    path = tour[dummy + 1 : -1] + tour[:dummy]
+    return path if path[0] == 0 else path[::-1]
+
+
+def _improve_windows(
+    cities_coordinates: np.ndarray,
+    tour: List[int],
+    window_size: int,
+    offset: int,
+    solve_paths: Callable[[List[np.ndarray]], List[List[int]]],
+) -> Tuple[List[int], List[int]]:
+    """Re-optimizes the windows of window_size consecutive cities of the tour,
+    starting at the offset, as paths between their first and last city. Consecutive
+    windows share a city, so every edge of the tour is in a window.
+
+    Returns:
+        Tuple[List[int], List[int]]: The improved tour and the cities of the windows
+        that changed.
+    """
+    cities = np.roll(np.asarray(tour[:-1]), -offset)
+    starts = range(0, len(cities) - 3, window_size - 1)
+    windows = [cities[start : start + window_size] for start in starts]
+
+    orders = solve_paths([cities_coordinates[window] for window in windows])
+
+    changed = []
+    for start, window, window_order in zip(starts, windows, orders, strict=True):
+        new_window = window[window_order]
+        if (
+            tour_length(new_window, cities_coordinates=cities_coordinates)
+            < tour_length(window, cities_coordinates=cities_coordinates) - 1e-9
+        ):
+            cities[start : start + len(window)] = new_window
+            changed.extend(new_window.tolist())
+
+    start = int(np.flatnonzero(cities == 0)[0])
+    return [*np.roll(cities, -start).tolist(), 0], changed
+
+
+def _executor(no_workers: int) -> ProcessPoolExecutor | None:
+    """The pool of no_workers worker processes the windows are solved in, or None
+    to solve them in the calling process."""
+    if no_workers == 1:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=no_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def _solve_paths(
+    solve_path: Callable[[np.ndarray], List[int]],
+    paths_coordinates: List[np.ndarray],
+    executor: ProcessPoolExecutor | None,
+    no_workers: int,
+) -> List[List[int]]:
+    """Solves the paths through the cities of every array of coordinates with
+    solve_path, in the worker processes of the executor if there is one."""
+    if executor is None:
+        return [solve_path(path) for path in paths_coordinates]
+
+    # Several chunks per worker even out differences in speed between them, while
+    # every chunk has enough windows to be worth sending to a process
+    chunk_size = max(1, len(paths_coordinates) // (4 * no_workers))
+    return list(executor.map(solve_path, paths_coordinates, chunksize=chunk_size))
+
+
+@timed("decomposition")
+def decomposition_algorithm(  # noqa: PLR0913
+    cities_coordinates: np.ndarray,
+    window_size: int = DEFAULT_WINDOW_SIZE,
+    time_limit: timedelta | None = None,
+    *,
+    initial_tour: List[int] | None = None,
+    max_passes: int = DEFAULT_MAX_PASSES,
+    exact_max_cities: int = DYNAMIC_PROGRAMMING_MAX_CITIES,
+    subproblem_time_limit: timedelta = _DEFAULT_SUBPROBLEM_TIME_LIMIT,
+    no_workers: int = 1,
+) -> Tuple[List[int], float]:
+    """Solves a large instance by solving windows of consecutive cities of its tour
+    exactly, stitching them back into the tour and repairing their ends with local
+    search.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates,
+            whose Euclidean distances are the distances between the cities.
+        window_size (int, optional): The number of cities of a window. Defaults to
+            DEFAULT_WINDOW_SIZE.
+        time_limit (timedelta | None, optional): No new pass is started after this
+            amount of time. Defaults to None, which means no limit.
+        initial_tour (List[int] | None, optional): The tour to improve, starting and
+            ending in the same city. Defaults to None, in which case it is built
+            with the greedy algorithm and local search.
+        max_passes (int, optional): The largest number of passes over the windows.
+            Defaults to DEFAULT_MAX_PASSES.
+        exact_max_cities (int, optional): Windows with fewer cities are solved with
+            exact_algorithm, larger ones with the greedy algorithm and local search.
+            Defaults to DYNAMIC_PROGRAMMING_MAX_CITIES, i.e. only the dynamic program
+            is used.
+        subproblem_time_limit (timedelta, optional): The time limit of every exact
+            solve with a MIP model. Defaults to 10 seconds.
+        no_workers (int, optional): The number of processes the windows are solved
+            in. Defaults to 1, which solves them in the calling process.
+
+    Returns:
+        Tuple[List[int], float]: A tuple containing the tour, starting and ending in
+        city 0, and its total distance.
+    """
+    start_time = time.monotonic()
+    coordinates = np.asarray(cities_coordinates, dtype=np.float64)
+    no_cities = len(coordinates)
+
+    # Check that the arguments are valid
+    if coordinates.ndim != 2 or coordinates.shape[1] != 2:
+        raise ValueError("The cities_coordinates should have shape (no_cities, 2).")
+    if no_cities < 2:
+        raise ValueError("The cities_coordinates should have at least 2 cities.")
+    if window_size < 4:
+        raise ValueError("The window_size should be at least 4.")
+    if max_passes < 0:
+        raise ValueError("The max_passes should not be negative.")
+    if no_workers < 1:
+        raise ValueError("The number of workers should be at least 1.")
+
+    def remaining_time() -> timedelta | None:
+        if time_limit is None:
+            return None
+        return time_limit - timedelta(seconds=time.monotonic() - start_time)
+
+    candidate_graph = build_candidate_graph(coordinates)
+    if initial_tour is None:
+        tour, _ = greedy_algorithm(candidate_graph)
+        tour, _ = local_search(tour, candidate_graph, time_limit=remaining_time())
+    else:
+        validate_tour(initial_tour, no_cities)
+        start = initial_tour.index(0)
+        tour = [*initial_tour[start:-1], *initial_tour[:start], 0]
+
+    solve_path = functools.partial(
+        _solve_path, exact_max_cities=exact_max_cities, time_limit=subproblem_time_limit
+    )
+    executor = _executor(no_workers)
+    solve_paths = functools.partial(
+        _solve_paths, solve_path, executor=executor, no_workers=no_workers
+    )
+
+    # Shift the windows by about half a window in every pass, so their ends fall
+    # between the ends of the windows of the previous pass
+    no_passes = 0
+    try:
+        while no_passes < max_passes:
+            time_left = remaining_time()
+            if time_left is not None and time_left <= timedelta(0):
+                break
+            offset = no_passes * (window_size // 2) % (window_size - 1)
+            no_passes += 1
+
+            with timed("windows"):
+                tour, changed = _improve_windows(
+                    coordinates, tour, window_size, offset, solve_paths
+                )
+            log.info("Pass %d changed %d cities", no_passes, len(changed))
+            if not changed:
+                break
+            with timed("repair"):
+                tour, _ = local_search(
+                    tour,
+                    candidate_graph,
+                    time_limit=remaining_time(),
+                    active_cities=changed,
+                )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    add_attributes(no_cities=no_cities, no_passes=no_passes)
+    return tour, tour_length(tour, candidate_graph)
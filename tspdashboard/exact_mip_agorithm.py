@@ -1,4 +1,8 @@
-from typing import Tuple, List
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, Literal, Tuple, List
 
 import numpy as np
 from ortools.math_opt.python import mathopt
@@ -6,83 +10,639 @@ import time
 from datetime import timedelta
 import logging
 
+from tspdashboard.held_karp_algorithm import held_karp_algorithm
+from tspdashboard.instrumentation import add_attributes, timed
+from tspdashboard.utilities import condensed_index, tour_length, validate_tour
+
 log = logging.getLogger(__name__)
 
+Formulation = Literal["gavish_graves", "dfj"]
+
+# Solvers that support lazy constraints and user cuts in MathOpt callbacks. Other
+# solvers use the DFJ formulation by re-solving with the violated cuts added.
+_CALLBACK_SOLVER_TYPES = (mathopt.SolverType.GSCIP, mathopt.SolverType.GUROBI)
+
+# Instances with at most this many cities are solved with the dynamic program of
+# Held and Karp, which is faster than the MIP solvers up to about this size
+DYNAMIC_PROGRAMMING_MAX_CITIES = 20
+
+# Edges with a value above these thresholds are used to look for violated subtour
+# elimination constraints in fractional solutions.
+_SEPARATION_THRESHOLDS = (1e-6, 0.5, 0.99)
+
+
+@dataclass(frozen=True)
+class SolverProgress:
+    """A snapshot of the progress of the exact solver.
+
+    Attributes:
+        elapsed (timedelta): The time the solver has been running.
+        incumbent_objective (float | None): The objective of the best tour found so
+            far, or None if no tour has been found yet.
+        best_bound (float): The best proven lower bound on the optimal objective.
+    """
+
+    elapsed: timedelta
+    incumbent_objective: float | None
+    best_bound: float
+
+    @property
+    def gap(self) -> float | None:
+        """The relative gap between the incumbent and the bound, or None if there is
+        no incumbent or bound yet."""
+        if self.incumbent_objective is None or not np.isfinite(self.best_bound):
+            return None
+        if self.incumbent_objective == 0:
+            return 0.0
+        return abs(self.incumbent_objective - self.best_bound) / abs(
+            self.incumbent_objective
+        )
+
+
+ProgressCallback = Callable[[SolverProgress], None]
+
+
+class _ProgressTracker:
+    """Turns solver callback data into SolverProgress reports, sending a report
+    whenever the incumbent or the bound changes."""
+
+    def __init__(
+        self,
+        progress_callback: ProgressCallback,
+        variables: List[mathopt.Variable],
+        objective_coefficients: np.ndarray,
+    ) -> None:
+        self.progress_callback = progress_callback
+        self.variables = variables
+        self.objective_coefficients = objective_coefficients
+        self.incumbent_objective = np.inf
+        self.best_bound = -np.inf
+        self.last_report: Tuple[float, float] | None = None
+
+    def solution_objective(self, callback_data: mathopt.CallbackData) -> float:
+        """The objective of the solution in the callback data."""
+        assert callback_data.solution is not None
+        values = np.fromiter(
+            (callback_data.solution[variable] for variable in self.variables),
+            dtype=np.float64,
+            count=len(self.variables),
+        )
+        return float(self.objective_coefficients @ values)
+
+    def on_callback(
+        self, callback_data: mathopt.CallbackData, solution_accepted: bool = True
+    ) -> None:
+        """Records the progress from a MIP_SOLUTION or MIP_NODE callback. Solutions
+        rejected by the callback (e.g. because of subtours) are not incumbents."""
+        if (
+            callback_data.event == mathopt.Event.MIP_SOLUTION
+            and callback_data.solution is not None
+            and solution_accepted
+        ):
+            self.incumbent_objective = min(
+                self.incumbent_objective, self.solution_objective(callback_data)
+            )
+
+        mip_stats = callback_data.mip_stats
+        self.incumbent_objective = min(self.incumbent_objective, mip_stats.primal_bound)
+        self.best_bound = max(self.best_bound, mip_stats.dual_bound)
+        self.report(callback_data.runtime)
+
+    def on_result(self, result: mathopt.SolveResult) -> None:
+        """Records the final progress from the result of a solve."""
+        if result.has_primal_feasible_solution():
+            self.incumbent_objective = result.objective_value()
+        self.best_bound = max(
+            self.best_bound, result.termination.objective_bounds.dual_bound
+        )
+        self.report(result.solve_stats.solve_time)
+
+    def report(self, elapsed: timedelta) -> None:
+        """Calls the progress callback if the incumbent or bound has changed."""
+        if self.last_report == (self.incumbent_objective, self.best_bound):
+            return
+        self.last_report = (self.incumbent_objective, self.best_bound)
 
-def build_model(distance_matrix: np.ndarray) -> Tuple[mathopt.Model, dict]:
-    # Build the model.
+        self.progress_callback(
+            SolverProgress(
+                elapsed=elapsed,
+                incumbent_objective=(
+                    float(self.incumbent_objective)
+                    if np.isfinite(self.incumbent_objective)
+                    else None
+                ),
+                best_bound=float(self.best_bound),
+            )
+        )
+
+
+def _tour_from_city_0(tour: List[int], no_cities: int) -> List[int]:
+    """Validates a tour (open or closed) and rotates it to start in city 0.
+
+    Returns:
+        List[int]: The cities of the tour, without repeating the first city.
+    """
+    cities = list(tour[:-1]) if len(tour) > 1 and tour[0] == tour[-1] else list(tour)
+    if sorted(cities) != list(range(no_cities)):
+        raise ValueError("The initial_tour should visit every city exactly once.")
+
+    start = cities.index(0)
+    return cities[start:] + cities[:start]
+
+
+@dataclass(frozen=True)
+class _GavishGravesModel:
+    """The Gavish-Graves model of a TSP with no_cities cities.
+
+    The structure only depends on the number of cities, so the model can be reused
+    for several instances of the same size by setting a new objective.
+    """
+
+    model: mathopt.Model
+    arcs: np.ndarray
+    x: List[mathopt.Variable]
+    f: List[mathopt.Variable]
+
+
+def _build_gavish_graves_model(
+    no_cities: int, variable_names: bool = False
+) -> _GavishGravesModel:
+    """Builds the constraints of the Gavish-Graves model without an objective.
+
+    Variables are only created for the arcs (i, j) with i != j. The model is built
+    directly on the model storage, which avoids creating a Python expression object
+    for each of the O(no_cities^2) constraints.
+    """
     model = mathopt.Model(name="TSP")
+    storage = model.storage
+
+    rows, cols = np.nonzero(~np.eye(no_cities, dtype=bool))
+    arcs = np.column_stack((rows, cols))
+    arc_list = arcs.tolist()
 
     # Add variables
-    x = {}
-    for i in range(len(distance_matrix)):
-        for j in range(len(distance_matrix[i])):
-            if i != j:
-                x[i, j] = model.add_binary_variable(name=f"x[{i},{j}]")
-            else:
-                x[i, j] = model.add_variable(name=f"x[{i},{j}]", lb=0, ub=0)
+    x_ids = [
+        storage.add_variable(0.0, 1.0, True, f"x[{i},{j}]" if variable_names else "")
+        for i, j in arc_list
+    ]
+    f_ids = [
+        storage.add_variable(
+            0.0, float(no_cities), False, f"f[{i},{j}]" if variable_names else ""
+        )
+        for i, j in arc_list
+    ]
+
+    outgoing_arcs: List[List[int]] = [[] for _ in range(no_cities)]
+    incoming_arcs: List[List[int]] = [[] for _ in range(no_cities)]
+    for arc, (i, j) in enumerate(arc_list):
+        outgoing_arcs[i].append(arc)
+        incoming_arcs[j].append(arc)
 
     # Add constraints (in-degree 1 and out-degree 1)
-    for i in range(len(distance_matrix)):
-        model.add_linear_constraint(
-            mathopt.fast_sum(x[i, j] for j in range(len(distance_matrix))) == 1
-        )
+    for arcs_of_city in (*outgoing_arcs, *incoming_arcs):
+        constraint = storage.add_linear_constraint(1.0, 1.0, "")
+        for arc in arcs_of_city:
+            storage.set_linear_constraint_coefficient(constraint, x_ids[arc], 1.0)
 
-    for j in range(len(distance_matrix)):
-        model.add_linear_constraint(
-            mathopt.fast_sum(x[i, j] for i in range(len(distance_matrix))) == 1
+    # Add subtour elimination constraints of by Gavish and Graves (1978), i.e.
+    # constraints for the "one commodity flow" formulation
+    for i in range(1, no_cities):
+        constraint = storage.add_linear_constraint(1.0, 1.0, "")
+        for arc in outgoing_arcs[i]:
+            storage.set_linear_constraint_coefficient(constraint, f_ids[arc], 1.0)
+        for arc in incoming_arcs[i]:
+            storage.set_linear_constraint_coefficient(constraint, f_ids[arc], -1.0)
+
+    # Flow is only allowed on arcs in the tour, f[i,j] <= (n - 1) * x[i,j]
+    for x_id, f_id in zip(x_ids, f_ids, strict=True):
+        constraint = storage.add_linear_constraint(-np.inf, 0.0, "")
+        storage.set_linear_constraint_coefficient(constraint, f_id, 1.0)
+        storage.set_linear_constraint_coefficient(constraint, x_id, -(no_cities - 1.0))
+
+    storage.set_is_maximize(False)
+
+    return _GavishGravesModel(
+        model=model,
+        arcs=arcs,
+        x=[model.get_variable(x_id) for x_id in x_ids],
+        f=[model.get_variable(f_id) for f_id in f_ids],
+    )
+
+
+def _set_objective(
+    gavish_graves_model: _GavishGravesModel, distance_matrix: np.ndarray
+) -> None:
+    """Sets the objective of the model to the distances of the given instance."""
+    arcs = gavish_graves_model.arcs
+    distances = np.asarray(distance_matrix, dtype=np.float64)[arcs[:, 0], arcs[:, 1]]
+
+    storage = gavish_graves_model.model.storage
+    for variable, distance in zip(
+        gavish_graves_model.x, distances.tolist(), strict=True
+    ):
+        storage.set_linear_objective_coefficient(variable.id, distance)
+
+
+# Idle models per number of cities, so the constraints are only built once for
+# each size. Models are taken out of the pool while they are solved, such that
+# concurrent solves never share a model.
+_MODEL_POOL: OrderedDict[int, List[_GavishGravesModel]] = OrderedDict()
+_MODEL_POOL_LOCK = threading.Lock()
+_MAX_POOLED_SIZES = 8
+_MAX_POOLED_MODELS_PER_SIZE = 2
+
+
+@contextmanager
+def _pooled_model(no_cities: int) -> Iterator[_GavishGravesModel]:
+    """Takes a Gavish-Graves model for no_cities cities from the pool, or builds one,
+    and returns it to the pool afterwards."""
+    with _MODEL_POOL_LOCK:
+        idle_models = _MODEL_POOL.get(no_cities)
+        gavish_graves_model = idle_models.pop() if idle_models else None
+
+    if gavish_graves_model is None:
+        gavish_graves_model = _build_gavish_graves_model(no_cities)
+
+    try:
+        yield gavish_graves_model
+    finally:
+        with _MODEL_POOL_LOCK:
+            idle_models = _MODEL_POOL.setdefault(no_cities, [])
+            _MODEL_POOL.move_to_end(no_cities)
+            if len(idle_models) < _MAX_POOLED_MODELS_PER_SIZE:
+                idle_models.append(gavish_graves_model)
+            while len(_MODEL_POOL) > _MAX_POOLED_SIZES:
+                _MODEL_POOL.popitem(last=False)
+
+
+@timed("build_model")
+def build_model(
+    distance_matrix: np.ndarray, variable_names: bool = False
+) -> Tuple[mathopt.Model, dict]:
+    """Builds the Gavish-Graves (1978) single commodity flow model of the TSP.
+
+    The model has a variable for each direction of travel between two cities, so
+    the distance matrix does not need to be symmetric.
+
+    Args:
+        distance_matrix (np.ndarray): The distance matrix of the TSP problem, where
+            distance_matrix[i, j] is the distance from city i to city j.
+        variable_names (bool, optional): Whether to name the variables x[i,j] and
+            f[i,j], which is useful for debugging but slows down the build. Defaults
+            to False.
+
+    Returns:
+        Tuple[mathopt.Model, dict]: The model and the dict of the binary arc
+        variables x[i, j] for i != j.
+    """
+    gavish_graves_model = _build_gavish_graves_model(
+        len(distance_matrix), variable_names=variable_names
+    )
+    _set_objective(gavish_graves_model, distance_matrix)
+
+    x = dict(
+        zip(
+            map(tuple, gavish_graves_model.arcs.tolist()),
+            gavish_graves_model.x,
+            strict=True,
         )
+    )
+    return gavish_graves_model.model, x
 
-    # Add subtour elimination constraints of by Gavish and Graves (1978)
-    f = {}
-    for i in range(len(distance_matrix)):
-        for j in range(len(distance_matrix[i])):
-            f[i, j] = model.add_variable(
-                name=f"f[{i},{j}]", lb=0, ub=len(distance_matrix)
-            )
 
-    # Add constraints for the "one commodity flow" formulation
-    for i in range(1, len(distance_matrix)):
+def _extract_tour(no_cities: int, arcs: np.ndarray, values: np.ndarray) -> List[int]:
+    """Extracts the tour starting and ending in city 0 from the values of the arc
+    variables using a successor array."""
+    selected = values > 0.5
+    successor = np.empty(no_cities, dtype=np.int64)
+    successor[arcs[selected, 0]] = arcs[selected, 1]
+
+    extracted_sol = [0]
+    while len(extracted_sol) < no_cities:
+        extracted_sol.append(int(successor[extracted_sol[-1]]))
+
+    # Add the starting city to the end of the tour
+    extracted_sol.append(extracted_sol[0])
+
+    return extracted_sol
+
+
+def _gavish_graves_hint(
+    gavish_graves_model: _GavishGravesModel, cities: List[int]
+) -> mathopt.SolutionHint:
+    """A complete solution hint for the Gavish-Graves model from a tour starting in
+    city 0, including the commodity flow: the k-th arc of the tour carries a flow
+    of k, so every city except city 0 sends out one unit more than it receives."""
+    no_cities = len(cities)
+    arc_index = {
+        (i, j): arc for arc, (i, j) in enumerate(gavish_graves_model.arcs.tolist())
+    }
+
+    x_values = dict.fromkeys(gavish_graves_model.x, 0.0)
+    f_values = dict.fromkeys(gavish_graves_model.f, 0.0)
+    for position, city in enumerate(cities):
+        arc = arc_index[city, cities[(position + 1) % no_cities]]
+        x_values[gavish_graves_model.x[arc]] = 1.0
+        f_values[gavish_graves_model.f[arc]] = float(position)
+
+    return mathopt.SolutionHint(variable_values={**x_values, **f_values})
+
+
+def build_dfj_model(
+    distance_matrix: np.ndarray,
+) -> Tuple[mathopt.Model, List[mathopt.Variable], np.ndarray]:
+    """Builds the symmetric edge formulation of the TSP with degree constraints only,
+    i.e. the relaxation of the Dantzig-Fulkerson-Johnson (1954) formulation without
+    any subtour elimination constraints. These are added lazily when solving.
+
+    The edge variables are continuous in [0, 1], such that the model can be solved
+    as an LP first. Set them to integer before solving the MIP.
+
+    Returns:
+        Tuple[mathopt.Model, List[mathopt.Variable], np.ndarray]: The model, the edge
+        variables and the (no_edges, 2) array of the cities each edge connects.
+    """
+    no_cities = len(distance_matrix)
+    rows, cols = np.triu_indices(no_cities, k=1)
+    edges = np.column_stack((rows, cols))
+
+    model = mathopt.Model(name="TSP (DFJ)")
+    edge_variables = [model.add_variable(lb=0, ub=1) for _ in range(len(edges))]
+
+    # Add constraints (every city has degree 2)
+    incident_edges: List[List[int]] = [[] for _ in range(no_cities)]
+    for edge, (i, j) in enumerate(edges.tolist()):
+        incident_edges[i].append(edge)
+        incident_edges[j].append(edge)
+
+    for i in range(no_cities):
         model.add_linear_constraint(
-            mathopt.fast_sum(f[i, j] - f[j, i] for j in range(len(distance_matrix)))
-            == 1
+            mathopt.fast_sum(edge_variables[edge] for edge in incident_edges[i]) == 2
         )
 
-    # Add constraints for the "one commodity flow" formulation
-    for i in range(len(distance_matrix)):
-        for j in range(len(distance_matrix)):
-            model.add_linear_constraint(f[i, j] <= (len(distance_matrix) - 1) * x[i, j])
-
     # Add objective
     model.minimize_linear_objective(
-        mathopt.LinearSum(
-            distance_matrix[i][j] * x[i, j]
-            for i in range(len(distance_matrix))
-            for j in range(len(distance_matrix[i]))
+        mathopt.fast_sum(
+            float(distance) * variable
+            for distance, variable in zip(
+                distance_matrix[rows, cols].tolist(), edge_variables, strict=True
+            )
         )
     )
 
-    return model, x
+    return model, edge_variables, edges
+
+
+def _connected_components(
+    no_cities: int, edges: np.ndarray, selected: np.ndarray
+) -> List[np.ndarray]:
+    """Returns the connected components of the graph with the selected edges."""
+    parent = list(range(no_cities))
+
+    def find(city: int) -> int:
+        while parent[city] != city:
+            parent[city] = parent[parent[city]]
+            city = parent[city]
+        return city
+
+    for i, j in edges[selected].tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[root_i] = root_j
+
+    roots = np.array([find(city) for city in range(no_cities)])
+    return [np.flatnonzero(roots == root) for root in np.unique(roots)]
+
+
+def _violated_subtour_cuts(
+    no_cities: int,
+    edges: np.ndarray,
+    edge_variables: List[mathopt.Variable],
+    values: np.ndarray,
+    thresholds: Tuple[float, ...],
+) -> List[mathopt.BoundedLinearExpression]:
+    """Finds subtour elimination constraints violated by the edge values.
+
+    For each threshold, the connected components of the edges with a value above it
+    are candidate sets S, and the constraint sum(x_e for e leaving S) >= 2 is returned
+    for the sets where it is violated.
+    """
+    cuts = []
+    for threshold in thresholds:
+        components = _connected_components(no_cities, edges, values > threshold)
+        if len(components) == 1:
+            continue
+
+        for component in components:
+            in_component = np.zeros(no_cities, dtype=bool)
+            in_component[component] = True
+            crossing = np.flatnonzero(
+                in_component[edges[:, 0]] != in_component[edges[:, 1]]
+            )
+            if values[crossing].sum() < 2 - 1e-6:
+                cuts.append(
+                    mathopt.fast_sum(edge_variables[edge] for edge in crossing) >= 2
+                )
+
+        # The cuts of the lowest threshold are usually enough
+        if cuts:
+            break
+
+    return cuts
+
+
+def _remaining_time(deadline: float) -> timedelta:
+    """The time left until the deadline (from time.time()), at least zero."""
+    return timedelta(seconds=max(0.0, deadline - time.time()))
+
+
+@dataclass(frozen=True)
+class _DfjModel:
+    """The DFJ model together with its edge variables and the edges they represent."""
+
+    model: mathopt.Model
+    edge_variables: List[mathopt.Variable]
+    edges: np.ndarray
+
+    @property
+    def no_cities(self) -> int:
+        """The number of cities of the model."""
+        return int(self.edges.max()) + 1
+
+    def hint(self, cities: List[int]) -> mathopt.SolutionHint:
+        """A solution hint setting the edges of the tour to 1 and all others to 0."""
+        no_cities = self.no_cities
+        values = dict.fromkeys(self.edge_variables, 0.0)
+        for position, city in enumerate(cities):
+            next_city = cities[(position + 1) % no_cities]
+            values[self.edge_variables[condensed_index(city, next_city, no_cities)]] = (
+                1.0
+            )
+        return mathopt.SolutionHint(variable_values=values)
 
 
-def exact_algorithm(
+def _solve_dfj(
     distance_matrix: np.ndarray,
-    solver_type: mathopt.SolverType = mathopt.SolverType.GSCIP,
-    solve_time_limit: timedelta = timedelta(seconds=120),
+    solver_type: mathopt.SolverType,
+    solve_time_limit: timedelta,
+    initial_tour: List[int] | None,
+    progress_callback: ProgressCallback | None,
 ) -> Tuple[List[int], float]:
-    """Build a TSP model and solve it using the given solver type."""
+    """Solves the TSP with the DFJ formulation and lazily added subtour cuts."""
+    no_cities = len(distance_matrix)
+    deadline = time.time() + solve_time_limit.total_seconds()
+
+    start = time.perf_counter()
+    dfj_model = _DfjModel(*build_dfj_model(distance_matrix))
+    model, edge_variables, edges = (
+        dfj_model.model,
+        dfj_model.edge_variables,
+        dfj_model.edges,
+    )
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+
+    # Strengthen the assignment relaxation by solving it as an LP and adding the
+    # violated subtour cuts until the support of the LP solution is connected
+    no_lp_cuts = 0
+    while time.time() < deadline:
+        lp_result = mathopt.solve(model, mathopt.SolverType.GLOP)
+        if lp_result.termination.reason != mathopt.TerminationReason.OPTIMAL:
+            break
+        values = np.array(lp_result.variable_values(edge_variables))
+        cuts = _violated_subtour_cuts(
+            no_cities, edges, edge_variables, values, thresholds=(1e-6,)
+        )
+        if not cuts:
+            break
+        for cut in cuts:
+            model.add_linear_constraint(cut)
+        no_lp_cuts += len(cuts)
+
+    log.info("Added %s subtour cuts to the LP relaxation", no_lp_cuts)
+
+    for variable in edge_variables:
+        variable.integer = True
+
+    model_params = mathopt.ModelSolveParameters()
+    if initial_tour is not None:
+        model_params.solution_hints.append(
+            dfj_model.hint(_tour_from_city_0(initial_tour, no_cities))
+        )
 
-    # Build a model
-    model, x = build_model(distance_matrix)
+    progress = None
+    if progress_callback is not None:
+        progress = _ProgressTracker(
+            progress_callback,
+            edge_variables,
+            np.asarray(distance_matrix, dtype=np.float64)[edges[:, 0], edges[:, 1]],
+        )
+
+    if solver_type in _CALLBACK_SOLVER_TYPES:
+        result = _solve_dfj_with_callback(
+            dfj_model, solver_type, _remaining_time(deadline), model_params, progress
+        )
+    else:
+        result = _solve_dfj_iteratively(dfj_model, solver_type, deadline, model_params)
+
+    if progress is not None:
+        progress.on_result(result)
+
+    solve_time = time.perf_counter() - start
+
+    # Walk along the selected edges starting from city 0
+    start = time.perf_counter()
+    values = np.array(result.variable_values(edge_variables))
+    neighbors: List[List[int]] = [[] for _ in range(no_cities)]
+    for i, j in edges[values > 0.5].tolist():
+        neighbors[i].append(j)
+        neighbors[j].append(i)
+
+    extracted_sol = [0, min(neighbors[0])]
+    while len(extracted_sol) < no_cities:
+        previous_city, current_city = extracted_sol[-2], extracted_sol[-1]
+        next_city = next(
+            city for city in neighbors[current_city] if city != previous_city
+        )
+        extracted_sol.append(next_city)
+
+    # Add the starting city to the end of the tour
+    extracted_sol.append(extracted_sol[0])
+    validate_tour(extracted_sol, no_cities)
+    extract_time = time.perf_counter() - start
+
+    log.info(
+        "Time: build %s, solve %s, extract %s seconds",
+        build_time,
+        solve_time,
+        extract_time,
+    )
+
+    return extracted_sol, tour_length(extracted_sol, distance_matrix)
+
+
+def _solve_dfj_with_callback(
+    dfj_model: _DfjModel,
+    solver_type: mathopt.SolverType,
+    solve_time_limit: timedelta,
+    model_params: mathopt.ModelSolveParameters,
+    progress: _ProgressTracker | None,
+) -> mathopt.SolveResult:
+    """Solves the DFJ model adding subtour cuts from a solver callback: as lazy
+    constraints for integer solutions and as user cuts at the nodes of the branch and
+    bound tree."""
+    no_cities, edges, edge_variables = (
+        dfj_model.no_cities,
+        dfj_model.edges,
+        dfj_model.edge_variables,
+    )
+
+    def separate(callback_data: mathopt.CallbackData) -> mathopt.CallbackResult:
+        callback_result = mathopt.CallbackResult()
+        if callback_data.solution is None:
+            if progress is not None:
+                progress.on_callback(callback_data)
+            return callback_result
+
+        values = np.fromiter(
+            (callback_data.solution[variable] for variable in edge_variables),
+            dtype=np.float64,
+            count=len(edge_variables),
+        )
+
+        if callback_data.event == mathopt.Event.MIP_SOLUTION:
+            cuts = _violated_subtour_cuts(
+                no_cities, edges, edge_variables, values, thresholds=(0.5,)
+            )
+            for cut in cuts:
+                callback_result.add_lazy_constraint(cut)
+        else:
+            cuts = _violated_subtour_cuts(
+                no_cities, edges, edge_variables, values, _SEPARATION_THRESHOLDS
+            )
+            for cut in cuts:
+                callback_result.add_user_cut(cut)
 
-    # Set parameters, e.g. turn on logging.
-    params = mathopt.SolveParameters(enable_output=False, time_limit=solve_time_limit)
+        if progress is not None:
+            progress.on_callback(callback_data, solution_accepted=not cuts)
 
-    # Time the model solving
-    start = time.time()
+        return callback_result
 
-    # Solve the model
-    result = mathopt.solve(model, solver_type, params=params)
+    result = mathopt.solve(
+        dfj_model.model,
+        solver_type,
+        params=mathopt.SolveParameters(
+            enable_output=False, time_limit=solve_time_limit
+        ),
+        model_params=model_params,
+        callback_reg=mathopt.CallbackRegistration(
+            events={mathopt.Event.MIP_SOLUTION, mathopt.Event.MIP_NODE},
+            add_lazy_constraints=True,
+            add_cuts=True,
+        ),
+        cb=separate,
+    )
 
     if result.termination.reason not in (
         mathopt.TerminationReason.OPTIMAL,
@@ -90,27 +650,238 @@ def exact_algorithm(
     ):
         raise RuntimeError(f"model failed to solve: {result.termination}")
 
-    solution_time = time.time() - start
+    return result
 
-    log.info("Time: %s seconds", solution_time)
 
-    # Extract the solution
-    extracted_sol = []
-    next_city = 0
+def _solve_dfj_iteratively(
+    dfj_model: _DfjModel,
+    solver_type: mathopt.SolverType,
+    deadline: float,
+    model_params: mathopt.ModelSolveParameters,
+) -> mathopt.SolveResult:
+    """Solves the DFJ model by re-solving with the subtour cuts violated by the
+    previous solution added, until the solution is a single tour."""
+    while True:
+        params = mathopt.SolveParameters(
+            enable_output=False, time_limit=_remaining_time(deadline)
+        )
+        result = mathopt.solve(
+            dfj_model.model, solver_type, params=params, model_params=model_params
+        )
 
-    extracted_sol.append(next_city)
+        if result.termination.reason not in (
+            mathopt.TerminationReason.OPTIMAL,
+            mathopt.TerminationReason.FEASIBLE,
+        ):
+            raise RuntimeError(f"model failed to solve: {result.termination}")
 
-    while len(extracted_sol) < len(distance_matrix):
-        for j in range(len(distance_matrix)):
-            if result.variable_values()[x[next_city, j]] > 0.5:
-                next_city = j
-                extracted_sol.append(next_city)
-                break
+        values = np.array(result.variable_values(dfj_model.edge_variables))
+        cuts = _violated_subtour_cuts(
+            dfj_model.no_cities,
+            dfj_model.edges,
+            dfj_model.edge_variables,
+            values,
+            thresholds=(0.5,),
+        )
+        if not cuts:
+            return result
 
-    # Add the starting city to the end of the tour
-    extracted_sol.append(extracted_sol[0])
+        if time.time() >= deadline:
+            raise RuntimeError("time limit reached before all subtours were removed")
+
+        for cut in cuts:
+            dfj_model.model.add_linear_constraint(cut)
+
+
+def _solve_held_karp(
+    distance_matrix: np.ndarray,
+    initial_tour: List[int] | None,
+    progress_callback: ProgressCallback | None,
+) -> Tuple[List[int], float]:
+    """Solves a small instance with the dynamic program of Held and Karp, reporting
+    the optimal objective as both the incumbent and the bound."""
+    if initial_tour is not None:
+        _tour_from_city_0(initial_tour, len(distance_matrix))
+
+    start = time.perf_counter()
+    tour, objective = held_karp_algorithm(distance_matrix)
+    if progress_callback is not None:
+        progress_callback(
+            SolverProgress(
+                elapsed=timedelta(seconds=time.perf_counter() - start),
+                incumbent_objective=objective,
+                best_bound=objective,
+            )
+        )
+    return tour, objective
+
+
+def exact_algorithm(  # noqa: PLR0913
+    distance_matrix: np.ndarray,
+    solver_type: mathopt.SolverType = mathopt.SolverType.GSCIP,
+    solve_time_limit: timedelta = timedelta(seconds=120),
+    formulation: Formulation = "gavish_graves",
+    *,
+    initial_tour: List[int] | None = None,
+    progress_callback: ProgressCallback | None = None,
+    dynamic_programming_max_cities: int = DYNAMIC_PROGRAMMING_MAX_CITIES,
+) -> Tuple[List[int], float]:
+    """Build a TSP model and solve it using the given solver type. Small instances
+    are solved with the dynamic program of Held and Karp instead.
+
+    Args:
+        distance_matrix (np.ndarray): The distance matrix of the TSP problem, where
+            distance_matrix[i, j] is the distance from city i to city j. It may be
+            asymmetric with the "gavish_graves" formulation.
+        solver_type (mathopt.SolverType, optional): The MIP solver to use. Defaults
+            to mathopt.SolverType.GSCIP.
+        solve_time_limit (timedelta, optional): The time limit of the solve. Defaults
+            to 120 seconds.
+        formulation (Formulation, optional): "gavish_graves" uses the single
+            commodity flow formulation of Gavish and Graves (1978). "dfj" uses the
+            symmetric edge formulation of Dantzig, Fulkerson and Johnson (1954), where
+            subtour elimination constraints are added lazily; it needs a symmetric
+            distance matrix but scales to much larger instances. Defaults to
+            "gavish_graves".
+        initial_tour (List[int] | None, optional): A known tour, e.g. the greedy
+            solution, which is passed to the solver as a hint (MIP start) so it can
+            prune from the start. Defaults to None.
+        progress_callback (ProgressCallback | None, optional): Called with the
+            incumbent objective, best bound and gap whenever they change during the
+            solve. Defaults to None.
+        dynamic_programming_max_cities (int, optional): Instances with at most this
+            many cities are solved with held_karp_algorithm, which ignores the
+            solver type and time limit. 0 always builds a model. Defaults to
+            DYNAMIC_PROGRAMMING_MAX_CITIES.
+
+    Returns:
+        Tuple[List[int], float]: A tuple containing the tour, starting and ending in
+        city 0, and its objective value. If the time limit is reached, this is the
+        best tour found, which is not necessarily optimal.
+    """
+    if formulation not in ("gavish_graves", "dfj"):
+        raise ValueError(f"Unknown formulation {formulation!r}.")
+    if formulation == "dfj" and not np.allclose(
+        distance_matrix, np.transpose(distance_matrix)
+    ):
+        raise ValueError("The dfj formulation needs a symmetric distance matrix.")
 
+    if len(distance_matrix) <= dynamic_programming_max_cities:
+        return _solve_held_karp(distance_matrix, initial_tour, progress_callback)
+
+    if formulation == "dfj":
+        # With two cities, the only tour uses the single edge twice
+        if len(distance_matrix) == 2:
+            return [0, 1, 0], tour_length([0, 1, 0], distance_matrix)
+
+        extracted_sol, objective = _solve_dfj(
+            distance_matrix,
+            solver_type,
+            solve_time_limit,
+            initial_tour,
+            progress_callback,
+        )
+        log.info("Extracted solution: %s", extracted_sol)
+
+        return extracted_sol, objective
+
+    no_cities = len(distance_matrix)
+
+    with _pooled_model(no_cities) as gavish_graves_model:
+        # Build a model, i.e. set the objective of the pooled model
+        start = time.perf_counter()
+        with timed("build_model"):
+            _set_objective(gavish_graves_model, distance_matrix)
+
+            # Pass the initial tour to the solver as a solution hint
+            model_params = mathopt.ModelSolveParameters()
+            if initial_tour is not None:
+                model_params.solution_hints.append(
+                    _gavish_graves_hint(
+                        gavish_graves_model, _tour_from_city_0(initial_tour, no_cities)
+                    )
+                )
+            # The degree and flow conservation constraints of the cities, and a flow
+            # capacity constraint for every arc
+            no_arcs = len(gavish_graves_model.arcs)
+            add_attributes(
+                no_variables=2 * no_arcs,
+                no_constraints=2 * no_cities + (no_cities - 1) + no_arcs,
+            )
+        build_time = time.perf_counter() - start
+
+        # Set parameters, e.g. turn on logging.
+        params = mathopt.SolveParameters(
+            enable_output=False, time_limit=solve_time_limit
+        )
+
+        # Report the progress from a callback if requested
+        progress = None
+        callback_kwargs = {}
+        if progress_callback is not None:
+            arcs = gavish_graves_model.arcs
+            progress = _ProgressTracker(
+                progress_callback,
+                gavish_graves_model.x,
+                np.asarray(distance_matrix, dtype=np.float64)[arcs[:, 0], arcs[:, 1]],
+            )
+            if solver_type in _CALLBACK_SOLVER_TYPES:
+                callback_kwargs = {
+                    "callback_reg": mathopt.CallbackRegistration(
+                        events={mathopt.Event.MIP_SOLUTION, mathopt.Event.MIP_NODE}
+                    ),
+                    "cb": _progress_only_callback(progress),
+                }
+
+        # Solve the model
+        start = time.perf_counter()
+        with timed("solve"):
+            result = mathopt.solve(
+                gavish_graves_model.model,
+                solver_type,
+                params=params,
+                model_params=model_params,
+                **callback_kwargs,
+            )
+        solve_time = time.perf_counter() - start
+
+        if result.termination.reason not in (
+            mathopt.TerminationReason.OPTIMAL,
+            mathopt.TerminationReason.FEASIBLE,
+        ):
+            raise RuntimeError(f"model failed to solve: {result.termination}")
+
+        if progress is not None:
+            progress.on_result(result)
+
+        # Extract the solution with a single lookup of all arc values
+        start = time.perf_counter()
+        with timed("extract_tour"):
+            values = np.array(result.variable_values(gavish_graves_model.x))
+            extracted_sol = _extract_tour(no_cities, gavish_graves_model.arcs, values)
+            validate_tour(extracted_sol, no_cities)
+        extract_time = time.perf_counter() - start
+
+    log.info(
+        "Time: build %s, solve %s, extract %s seconds",
+        build_time,
+        solve_time,
+        extract_time,
+    )
     log.info("Extracted solution: %s", extracted_sol)
 
-    # Return the solution and the objective value
-    return extracted_sol, result.best_objective_bound()
+    # Return the solution and the length of the incumbent, which is computed from
+    # the distances since the solver objective includes its tolerances
+    return extracted_sol, tour_length(extracted_sol, distance_matrix)
+
+
+def _progress_only_callback(
+    progress: _ProgressTracker,
+) -> Callable[[mathopt.CallbackData], mathopt.CallbackResult]:
+    """A solver callback that only records the progress of the solve."""
+
+    def report_progress(callback_data: mathopt.CallbackData) -> mathopt.CallbackResult:
+        progress.on_callback(callback_data)
+        return mathopt.CallbackResult()
+
+    return report_progress
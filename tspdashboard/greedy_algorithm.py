@@ -1,23 +1,72 @@
 """A simple greedy algorithm for the TSP problem."""
 
-from typing import Tuple
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Literal, Sequence, Tuple
 
 import numpy as np
 
+from tspdashboard.candidate_graph import CandidateGraph, nearest_unvisited_city
+from tspdashboard.instrumentation import timed
+from tspdashboard.utilities import (
+    DEFAULT_MEMORY_BUDGET_BYTES,
+    tour_length,
+    tour_lengths,
+)
 
+GreedyMethod = Literal["auto", "loop", "argmin", "spatial"]
+
+# The length of the neighbor lists searched before the full row by the multi-start
+# greedy algorithm
+_NO_CANDIDATE_NEIGHBORS = 16
+
+# The distance matrix of a worker process of multi_start_greedy_algorithm, which is
+# attached to the shared memory of the parent process when the worker starts
+_WORKER_STATE: dict[str, Any] = {}
+
+
+@timed("greedy_algorithm")
 def greedy_algorithm(
-    distance_matrix: np.ndarray, start_city: int = 0
+    distance_matrix: np.ndarray | CandidateGraph,
+    start_city: int = 0,
+    method: GreedyMethod = "auto",
 ) -> Tuple[list[int], float]:
     """A simple greedy algorithm for the TSP problem.
 
     Args:
-        distance_matrix (np.ndarray): The distance matrix of the TSP problem.
+        distance_matrix (np.ndarray | CandidateGraph): The distance matrix of the TSP
+            problem, or a candidate graph for large instances in which case the
+            distances are computed on demand from the coordinates. The tour follows
+            the rows of the matrix, i.e. the distances from the current city, so
+            the matrix may be asymmetric.
         start_city (int, optional): The index of the starting city. Defaults to 0.
+        method (GreedyMethod, optional): How the nearest unvisited city is found.
+            "loop" scans the unvisited cities in Python, "argmin" takes a masked
+            argmin over the row of the distance matrix and "spatial" uses the
+            neighbor lists and grid of a candidate graph. "loop" and "argmin" both
+            resolve ties in favour of the lowest city index and give identical
+            tours. Defaults to "auto", which uses "spatial" for a candidate graph
+            and "argmin" for a distance matrix.
 
     Returns:
         Tuple[np.ndarray, float]: A tuple containing the best tour found by the
         greedy algorithm and the total distance of the tour.
     """
+    if isinstance(distance_matrix, CandidateGraph):
+        if method not in ("auto", "spatial"):
+            raise ValueError(
+                f"The method {method!r} needs a distance matrix, not a candidate graph."
+            )
+        return _greedy_candidate_graph(distance_matrix, start_city=start_city)
+
+    if method == "spatial":
+        raise ValueError("The method 'spatial' needs a candidate graph.")
+    if method in ("auto", "argmin"):
+        return _greedy_argmin(distance_matrix, start_city=start_city)
+    if method != "loop":
+        raise ValueError(f"Unknown greedy method {method!r}.")
+
     no_cities = distance_matrix.shape[0]
     # Initialize the tour with the first city
     tour = [start_city]
@@ -27,9 +76,6 @@ def greedy_algorithm(
     # Remove the starting city
     unvisited_cities.remove(start_city)
 
-    # Initialize the total distance
-    total_distance = 0
-
     # Repeat until all cities have been visited
     while unvisited_cities:
         # Get the last city in the tour
@@ -42,13 +88,281 @@ def greedy_algorithm(
         tour.append(nearest_city)
         # Remove the nearest city from the set of unvisited cities
         unvisited_cities.remove(nearest_city)
-        # Update the total distance
-        total_distance += distance_matrix[current_city, nearest_city]
 
-    # Add the distance back to the starting city
-    total_distance += distance_matrix[tour[-1], tour[0]]
+    # Add the starting city to the end of the tour
+    tour.append(tour[0])
+
+    return tour, tour_length(tour, distance_matrix)
+
+
+def _greedy_argmin(
+    distance_matrix: np.ndarray, start_city: int = 0
+) -> Tuple[list[int], float]:
+    """The greedy algorithm using a masked argmin over the row of the current city.
+
+    Each step is a single vectorized pass over one row instead of a Python-level
+    comparison per unvisited city. np.argmin returns the first minimum, so ties are
+    resolved exactly as in the loop version and the tours are identical.
+    """
+    no_cities = distance_matrix.shape[0]
+    tour = [start_city]
+    visited = np.zeros(no_cities, dtype=bool)
+    visited[start_city] = True
+
+    for _ in range(no_cities - 1):
+        current_city = tour[-1]
+        # Find the nearest unvisited city by masking out the visited ones
+        masked_row = np.where(visited, np.inf, distance_matrix[current_city])
+        nearest_city = int(np.argmin(masked_row))
+
+        tour.append(nearest_city)
+        visited[nearest_city] = True
 
     # Add the starting city to the end of the tour
     tour.append(tour[0])
 
-    return tour, total_distance
+    return tour, tour_length(tour, distance_matrix)
+
+
+def _greedy_candidate_graph(
+    candidate_graph: CandidateGraph, start_city: int = 0
+) -> Tuple[list[int], float]:
+    """The greedy algorithm on a candidate graph.
+
+    The nearest unvisited city is the first unvisited city in the (sorted) neighbor
+    list of the current city. Only when all k neighbors are visited, the grid of the
+    candidate graph is searched, so no distance matrix is ever needed.
+    """
+    no_cities = candidate_graph.no_cities
+    grid = candidate_graph.grid
+
+    visited = np.zeros(no_cities, dtype=bool)
+    unvisited_per_cell = np.diff(grid.cell_start)
+
+    tour = [start_city]
+    visited[start_city] = True
+    unvisited_per_cell[grid.city_cells[start_city]] -= 1
+
+    for _ in range(no_cities - 1):
+        current_city = tour[-1]
+        neighbors = candidate_graph.neighbors[current_city]
+        unvisited_neighbors = neighbors[~visited[neighbors]]
+
+        if unvisited_neighbors.shape[0] > 0:
+            nearest_city = int(unvisited_neighbors[0])
+        else:
+            nearest_city = nearest_unvisited_city(
+                candidate_graph, current_city, visited, unvisited_per_cell
+            )
+
+        tour.append(nearest_city)
+        visited[nearest_city] = True
+        unvisited_per_cell[grid.city_cells[nearest_city]] -= 1
+
+    # Compute the total distance of the closed tour from the coordinates
+    tour.append(tour[0])
+
+    return tour, tour_length(tour, candidate_graph)
+
+
+def _sorted_nearest_neighbors(
+    distance_matrix: np.ndarray, no_neighbors: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The no_neighbors nearest cities of every city, sorted by distance and then by
+    index, with their distances and the largest of these distances per city."""
+    distances = np.array(distance_matrix, dtype=np.float64)
+    np.fill_diagonal(distances, np.inf)
+
+    nearest = np.argpartition(distances, no_neighbors - 1, axis=1)[:, :no_neighbors]
+    nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+    order = np.lexsort((nearest, nearest_distances), axis=1)
+
+    neighbors = np.take_along_axis(nearest, order, axis=1)
+    neighbor_distances = np.take_along_axis(nearest_distances, order, axis=1)
+    return neighbors, neighbor_distances, neighbor_distances[:, -1]
+
+
+def _greedy_batch(
+    distance_matrix: np.ndarray,
+    start_cities: np.ndarray,
+    memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Runs the greedy algorithm from several start cities at once.
+
+    The tours are built in lockstep. In every step, the nearest unvisited city of
+    each tour is looked up in the sorted list of the nearest neighbors of its
+    current city, which is a vectorized operation over a small array. Only tours
+    whose neighbors are all visited, or whose candidate ties with a city outside
+    the list, fall back to a masked argmin over the full row. The tours and totals
+    are identical to those of the "argmin" method.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The open tours (one row per start city) and
+        their total distances.
+    """
+    no_cities = distance_matrix.shape[0]
+    no_starts = start_cities.shape[0]
+    tours = np.empty((no_starts, no_cities), dtype=np.int64)
+    totals = np.zeros(no_starts, dtype=np.float64)
+
+    if no_cities == 1:
+        tours[:, 0] = start_cities
+        return tours, totals
+
+    neighbors, neighbor_distances, boundary_distances = _sorted_nearest_neighbors(
+        distance_matrix, min(_NO_CANDIDATE_NEIGHBORS, no_cities - 1)
+    )
+
+    # Every tour in a batch needs a row of visited flags, and a row of float64
+    # distances in the worst case that all tours fall back to the full row
+    bytes_per_tour = no_cities * (np.dtype(np.float64).itemsize + 1)
+    batch_size = max(1, min(no_starts, memory_budget_bytes // bytes_per_tour))
+
+    for batch_start in range(0, no_starts, batch_size):
+        batch = slice(batch_start, min(batch_start + batch_size, no_starts))
+        current_cities = start_cities[batch].astype(np.int64)
+        batch_rows = np.arange(current_cities.shape[0])
+
+        visited = np.zeros((current_cities.shape[0], no_cities), dtype=bool)
+        visited[batch_rows, current_cities] = True
+        tours[batch, 0] = current_cities
+
+        for step in range(1, no_cities):
+            # The first unvisited city in the neighbor list of the current city
+            candidates = neighbors[current_cities]
+            unvisited = ~visited[batch_rows[:, None], candidates]
+            first = np.argmax(unvisited, axis=1)
+            nearest_cities = candidates[batch_rows, first]
+            nearest_distances = neighbor_distances[current_cities, first]
+
+            # It is the nearest unvisited city if it is strictly closer than the
+            # cities outside the list, otherwise use the full row
+            fallback = ~unvisited[batch_rows, first] | (
+                nearest_distances >= boundary_distances[current_cities]
+            )
+            if fallback.any():
+                fallback_rows = batch_rows[fallback]
+                # Integer distances are masked with infinity too, so use floats
+                rows = distance_matrix[current_cities[fallback_rows]].astype(
+                    np.float64, copy=False
+                )
+                np.putmask(rows, visited[fallback_rows], np.inf)
+                nearest_cities[fallback_rows] = np.argmin(rows, axis=1)
+
+            visited[batch_rows, nearest_cities] = True
+            tours[batch, step] = nearest_cities
+            current_cities = nearest_cities
+
+        # Evaluate the closed tours of the batch at once
+        totals[batch] = tour_lengths(
+            np.column_stack((tours[batch], tours[batch, 0])), distance_matrix
+        )
+
+    return tours, totals
+
+
+def _attach_shared_distance_matrix(
+    name: str, shape: Tuple[int, int], dtype: str
+) -> None:
+    """Initializes a worker process with the distance matrix in shared memory."""
+    shared_memory = SharedMemory(name=name)
+    # Keep a reference to the shared memory, since the array does not
+    _WORKER_STATE["shared_memory"] = shared_memory
+    _WORKER_STATE["distance_matrix"] = np.ndarray(
+        shape, dtype=dtype, buffer=shared_memory.buf
+    )
+
+
+def _best_of_batch(start_cities: np.ndarray) -> Tuple[list[int], float]:
+    """Runs the greedy algorithm from the start cities in a worker process and
+    returns the best open tour."""
+    tours, totals = _greedy_batch(_WORKER_STATE["distance_matrix"], start_cities)
+    best = int(np.argmin(totals))
+    return tours[best].tolist(), float(totals[best])
+
+
+def _best_of_batches_in_processes(
+    distance_matrix: np.ndarray, start_cities: np.ndarray, no_workers: int
+) -> Tuple[list[int], float]:
+    """Spreads the start cities over a pool of worker processes which read the
+    distance matrix from shared memory, so it is not pickled for every task."""
+    shared_memory = SharedMemory(create=True, size=max(1, distance_matrix.nbytes))
+    try:
+        shared_matrix = np.ndarray(
+            distance_matrix.shape, dtype=distance_matrix.dtype, buffer=shared_memory.buf
+        )
+        shared_matrix[:] = distance_matrix
+
+        # Several batches per worker even out differences in speed between them
+        batches = np.array_split(start_cities, min(len(start_cities), 4 * no_workers))
+        with ProcessPoolExecutor(
+            max_workers=no_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_attach_shared_distance_matrix,
+            initargs=(
+                shared_memory.name,
+                distance_matrix.shape,
+                distance_matrix.dtype.str,
+            ),
+        ) as executor:
+            results = list(executor.map(_best_of_batch, batches))
+        del shared_matrix
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+    # The first best batch keeps the tie-breaking of the start cities in order
+    return min(results, key=lambda result: result[1])
+
+
+def multi_start_greedy_algorithm(
+    distance_matrix: np.ndarray,
+    start_cities: int | Sequence[int] | None = None,
+    no_workers: int = 1,
+    seed: int | None = None,
+) -> Tuple[list[int], float]:
+    """Runs the greedy algorithm from many start cities and returns the best tour.
+
+    Args:
+        distance_matrix (np.ndarray): The distance matrix of the TSP problem.
+        start_cities (int | Sequence[int] | None, optional): The start cities to
+            try, or the number of start cities to sample at random. Defaults to
+            None, which means all cities.
+        no_workers (int, optional): The number of processes to spread the start
+            cities over. The distance matrix is shared with the processes through
+            shared memory. Defaults to 1, which runs in the calling process.
+        seed (int | None, optional): The seed for sampling the start cities.
+            Defaults to None.
+
+    Returns:
+        Tuple[list[int], float]: A tuple containing the best tour, rotated to start
+        and end in city 0, and its total distance.
+    """
+    if isinstance(distance_matrix, CandidateGraph):
+        raise ValueError("The multi-start greedy algorithm needs a distance matrix.")
+    if no_workers < 1:
+        raise ValueError("The number of workers should be at least 1.")
+
+    no_cities = distance_matrix.shape[0]
+    if start_cities is None:
+        starts = np.arange(no_cities)
+    elif isinstance(start_cities, int):
+        rng = np.random.default_rng(seed)
+        starts = np.sort(rng.choice(no_cities, size=start_cities, replace=False))
+    else:
+        starts = np.asarray(start_cities, dtype=np.int64)
+
+    if no_workers == 1 or len(starts) == 1:
+        tours, totals = _greedy_batch(distance_matrix, starts)
+        tour = tours[int(np.argmin(totals))].tolist()
+    else:
+        tour, _ = _best_of_batches_in_processes(distance_matrix, starts, no_workers)
+
+    # Rotate the tour to start in city 0 and add it to the end of the tour
+    start = tour.index(0)
+    tour = tour[start:] + tour[:start]
+    tour.append(tour[0])
+
+    # Sum the distances along the rotated tour, so the objective is the same as the
+    # one the other solvers report for this tour, to the last bit
+    return tour, tour_length(tour, distance_matrix)
@@ -0,0 +1,388 @@
+"""Re-optimize a tour after cities are added, removed or moved.
+
+Solving an edited instance from scratch recomputes the whole distance matrix and
+the nearest neighbors of every city, and builds and improves a new tour. An edit of
+a few cities only changes a few rows and columns of the distance matrix, so the
+incremental functions instead:
+
+* recompute the rows and columns of the edited cities from their coordinates,
+* recompute the neighbor lists of the cities that gained or lost a nearest neighbor,
+* repair the tour by splicing out the removed cities and inserting the new cities
+  where they lengthen the tour the least (cheapest insertion), and
+* run the local search starting only from the cities around the repaired places,
+  with a time limit.
+
+The distances are computed with one of the coordinate metrics, which are symmetric.
+"""
+
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from typing import List, Sequence
+
+import numpy as np
+
+from tspdashboard.candidate_graph import DEFAULT_NO_NEIGHBORS
+from tspdashboard.instrumentation import timed
+from tspdashboard.local_search import local_search, nearest_neighbors
+from tspdashboard.metrics import Metric, block_function
+from tspdashboard.utilities import tour_length
+
+# The default time limit of the local search after an edit
+DEFAULT_REPAIR_TIME_LIMIT = timedelta(seconds=1)
+
+
+@dataclass(frozen=True)
+class IncrementalSolution:
+    """An instance together with everything that is updated when it is edited.
+
+    Attributes:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        distance_matrix (np.ndarray): The distance matrix of the cities.
+        neighbors (np.ndarray): The nearest neighbors of every city, as returned by
+            nearest_neighbors.
+        tour (List[int]): The tour, starting and ending in city 0.
+        objective (float): The total distance of the tour.
+        metric (Metric): The metric of the distances. Defaults to "euclidean".
+    """
+
+    cities_coordinates: np.ndarray
+    distance_matrix: np.ndarray
+    neighbors: np.ndarray
+    tour: List[int]
+    objective: float
+    metric: Metric = "euclidean"
+
+
+def incremental_solution(
+    cities_coordinates: np.ndarray,
+    distance_matrix: np.ndarray,
+    tour: List[int],
+    metric: Metric = "euclidean",
+    no_neighbors: int = DEFAULT_NO_NEIGHBORS,
+) -> IncrementalSolution:
+    """Prepares a solved instance for incremental edits by computing the neighbor
+    lists of the cities once.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        distance_matrix (np.ndarray): The distance matrix of the cities computed with
+            the metric.
+        tour (List[int]): A tour of the cities, e.g. from the local search.
+        metric (Metric, optional): The metric of the distances. Defaults to
+            "euclidean".
+        no_neighbors (int, optional): The number of nearest neighbors kept for every
+            city. Defaults to DEFAULT_NO_NEIGHBORS.
+
+    Returns:
+        IncrementalSolution: The instance, its neighbor lists and the tour.
+    """
+    no_cities = distance_matrix.shape[0]
+    neighbors = nearest_neighbors(
+        distance_matrix, min(no_neighbors, max(1, no_cities - 1))
+    )
+    tour = _tour_from_city_0(_open_tour(tour))
+    return IncrementalSolution(
+        cities_coordinates=cities_coordinates,
+        distance_matrix=distance_matrix,
+        neighbors=neighbors,
+        tour=tour,
+        objective=tour_length(tour, distance_matrix),
+        metric=metric,
+    )
+
+
+def distance_rows(
+    cities_coordinates: np.ndarray, cities: np.ndarray, metric: Metric = "euclidean"
+) -> np.ndarray:
+    """Computes the distances from the given cities to all cities.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        cities (np.ndarray): The indices of the cities.
+        metric (Metric, optional): The metric of the distances. Defaults to
+            "euclidean".
+
+    Returns:
+        np.ndarray: The (len(cities), no_cities) rows of the distance matrix.
+    """
+    distance_block, _ = block_function(metric)
+
+    # The block functions compute contiguous rows, so the cities are put first
+    no_rows = len(cities)
+    coordinates = np.concatenate((cities_coordinates[cities], cities_coordinates))
+    rows: np.ndarray = distance_block(coordinates, 0, no_rows)[:, no_rows:]
+    return rows
+
+
+def _open_tour(tour: Sequence[int]) -> List[int]:
+    """The cities of a tour without the return to the starting city."""
+    return list(tour[:-1] if len(tour) > 1 and tour[0] == tour[-1] else tour)
+
+
+def _tour_from_city_0(cities: List[int]) -> List[int]:
+    """Rotates the cities of an open tour to start in city 0 and closes it."""
+    start = cities.index(0)
+    return [*cities[start:], *cities[:start], 0]
+
+
+def cheapest_insertion(
+    tour: List[int], distance_matrix: np.ndarray, cities: Sequence[int]
+) -> List[int]:
+    """Inserts cities into a tour one at a time, each between the two consecutive
+    cities where it lengthens the tour the least.
+
+    Args:
+        tour (List[int]): The closed tour of the other cities.
+        distance_matrix (np.ndarray): The distance matrix of all cities.
+        cities (Sequence[int]): The cities to insert, in order.
+
+    Returns:
+        List[int]: The closed tour including the cities, starting in the same city.
+    """
+    order = np.asarray(_open_tour(tour), dtype=np.int64)
+    for city in cities:
+        following = np.roll(order, -1)
+        added_distance = (
+            distance_matrix[order, city]
+            + distance_matrix[city, following]
+            - distance_matrix[order, following]
+        )
+        order = np.insert(order, int(np.argmin(added_distance)) + 1, city)
+
+    closed_tour: List[int] = order.tolist()
+    closed_tour.append(closed_tour[0])
+    return closed_tour
+
+
+def _refresh_neighbors(
+    distance_matrix: np.ndarray, neighbors: np.ndarray, changed: np.ndarray
+) -> np.ndarray:
+    """Recomputes the neighbor lists of the changed cities, of the cities which had
+    a changed city as neighbor, and of the cities a changed city has come closer to
+    than their farthest neighbor."""
+    no_cities = distance_matrix.shape[0]
+    cities = np.arange(no_cities)
+    farthest_neighbor_distance = distance_matrix[cities, neighbors[:, -1]]
+
+    stale = np.isin(neighbors, changed).any(axis=1)
+    stale |= (
+        distance_matrix[:, changed] < farthest_neighbor_distance[:, np.newaxis]
+    ).any(axis=1)
+    stale[changed] = True
+
+    neighbors[stale] = nearest_neighbors(
+        distance_matrix, neighbors.shape[1], cities[stale]
+    )
+    return neighbors
+
+
+def _improve(
+    solution: IncrementalSolution,
+    tour: List[int],
+    repaired_cities: Sequence[int],
+    time_limit: timedelta,
+) -> IncrementalSolution:
+    """Improves the repaired tour with a local search starting from the repaired
+    cities and their neighbors in the tour."""
+    cities = _open_tour(tour)
+    if len(cities) < 2:
+        return replace(solution, tour=[*cities, cities[0]])
+
+    position = {city: index for index, city in enumerate(cities)}
+    active_cities = []
+    for city in repaired_cities:
+        index = position[city]
+        active_cities += [
+            cities[index - 1],
+            city,
+            cities[(index + 1) % len(cities)],
+        ]
+
+    improved_tour, _ = local_search(
+        tour,
+        solution.distance_matrix,
+        time_limit=time_limit,
+        neighbors=solution.neighbors,
+        active_cities=active_cities,
+    )
+    improved_tour = _tour_from_city_0(_open_tour(improved_tour))
+    return replace(
+        solution,
+        tour=improved_tour,
+        objective=tour_length(improved_tour, solution.distance_matrix),
+    )
+
+
+@timed("add_cities")
+def add_cities(
+    solution: IncrementalSolution,
+    new_coordinates: np.ndarray,
+    time_limit: timedelta = DEFAULT_REPAIR_TIME_LIMIT,
+) -> IncrementalSolution:
+    """Adds cities to a solved instance and inserts them into the tour.
+
+    Args:
+        solution (IncrementalSolution): The solved instance.
+        new_coordinates (np.ndarray): The (no_new_cities, 2) coordinates of the new
+            cities, which get the indices after the existing cities.
+        time_limit (timedelta, optional): The time limit of the local search after
+            inserting the cities. Defaults to DEFAULT_REPAIR_TIME_LIMIT.
+
+    Returns:
+        IncrementalSolution: The edited instance with the repaired tour.
+    """
+    new_coordinates = np.asarray(new_coordinates, dtype=np.float64).reshape(-1, 2)
+    no_old_cities = solution.distance_matrix.shape[0]
+    no_cities = no_old_cities + new_coordinates.shape[0]
+    new_cities = np.arange(no_old_cities, no_cities)
+    cities_coordinates = np.concatenate((solution.cities_coordinates, new_coordinates))
+
+    # Copy the old distances and compute only the rows and columns of the new cities
+    distance_matrix = np.empty(
+        (no_cities, no_cities), dtype=solution.distance_matrix.dtype
+    )
+    distance_matrix[:no_old_cities, :no_old_cities] = solution.distance_matrix
+    rows = distance_rows(cities_coordinates, new_cities, solution.metric)
+    distance_matrix[new_cities] = rows
+    distance_matrix[:, new_cities] = rows.T
+
+    # The neighbor lists of the new cities are computed from scratch
+    no_neighbors = min(
+        max(solution.neighbors.shape[1], DEFAULT_NO_NEIGHBORS), no_cities - 1
+    )
+    if no_neighbors != solution.neighbors.shape[1]:
+        neighbors = nearest_neighbors(distance_matrix, no_neighbors)
+    else:
+        neighbors = np.zeros((no_cities, no_neighbors), dtype=solution.neighbors.dtype)
+        neighbors[:no_old_cities] = solution.neighbors
+        neighbors = _refresh_neighbors(distance_matrix, neighbors, new_cities)
+
+    tour = cheapest_insertion(solution.tour, distance_matrix, new_cities.tolist())
+    edited = replace(
+        solution,
+        cities_coordinates=cities_coordinates,
+        distance_matrix=distance_matrix,
+        neighbors=neighbors,
+    )
+    return _improve(edited, tour, new_cities.tolist(), time_limit)
+
+
+@timed("remove_cities")
+def remove_cities(
+    solution: IncrementalSolution,
+    cities: Sequence[int],
+    time_limit: timedelta = DEFAULT_REPAIR_TIME_LIMIT,
+) -> IncrementalSolution:
+    """Removes cities from a solved instance and splices them out of the tour.
+
+    Args:
+        solution (IncrementalSolution): The solved instance.
+        cities (Sequence[int]): The cities to remove. The remaining cities keep
+            their order, so their indices decrease by the number of removed cities
+            before them.
+        time_limit (timedelta, optional): The time limit of the local search after
+            splicing out the cities. Defaults to DEFAULT_REPAIR_TIME_LIMIT.
+
+    Returns:
+        IncrementalSolution: The edited instance with the repaired tour.
+    """
+    no_old_cities = solution.distance_matrix.shape[0]
+    removed = np.unique(np.asarray(cities, dtype=np.int64))
+    if removed.size and (removed[0] < 0 or removed[-1] >= no_old_cities):
+        raise ValueError("The cities to remove should be cities of the instance.")
+    if no_old_cities - removed.size < 2:
+        raise ValueError("The instance should keep at least 2 cities.")
+
+    keep = np.ones(no_old_cities, dtype=bool)
+    keep[removed] = False
+    new_index = np.cumsum(keep) - 1
+
+    distance_matrix = solution.distance_matrix[np.ix_(keep, keep)]
+    no_cities = distance_matrix.shape[0]
+
+    # Only the cities that lost a neighbor need new neighbor lists
+    no_neighbors = min(solution.neighbors.shape[1], no_cities - 1)
+    if no_neighbors != solution.neighbors.shape[1]:
+        neighbors = nearest_neighbors(distance_matrix, no_neighbors)
+    else:
+        old_neighbors = solution.neighbors[keep]
+        lost_neighbor = np.flatnonzero(np.isin(old_neighbors, removed).any(axis=1))
+        neighbors = new_index[old_neighbors]
+        neighbors[lost_neighbor] = nearest_neighbors(
+            distance_matrix, no_neighbors, lost_neighbor
+        )
+
+    # Splice the removed cities out of the tour, and remember the cities that
+    # became adjacent to another city
+    old_cities = np.asarray(_open_tour(solution.tour), dtype=np.int64)
+    kept = keep[old_cities]
+    next_to_removed = ~np.roll(kept, 1) | ~np.roll(kept, -1)
+    spliced: List[int] = new_index[old_cities[kept]].tolist()
+    repaired_cities: List[int] = new_index[old_cities[kept & next_to_removed]].tolist()
+
+    edited = replace(
+        solution,
+        cities_coordinates=solution.cities_coordinates[keep],
+        distance_matrix=distance_matrix,
+        neighbors=neighbors,
+    )
+    return _improve(edited, _tour_from_city_0(spliced), repaired_cities, time_limit)
+
+
+@timed("move_cities")
+def move_cities(
+    solution: IncrementalSolution,
+    cities: Sequence[int],
+    new_coordinates: np.ndarray,
+    time_limit: timedelta = DEFAULT_REPAIR_TIME_LIMIT,
+) -> IncrementalSolution:
+    """Moves cities of a solved instance and reinserts them into the tour.
+
+    The rows and columns of the moved cities are updated in a copy of the distance
+    matrix, so the solution and the matrix it was created from are not changed.
+
+    Args:
+        solution (IncrementalSolution): The solved instance.
+        cities (Sequence[int]): The cities to move.
+        new_coordinates (np.ndarray): The (len(cities), 2) new coordinates.
+        time_limit (timedelta, optional): The time limit of the local search after
+            reinserting the cities. Defaults to DEFAULT_REPAIR_TIME_LIMIT.
+
+    Returns:
+        IncrementalSolution: The edited instance with the repaired tour.
+    """
+    moved = np.asarray(cities, dtype=np.int64)
+    if len(np.unique(moved)) != len(moved):
+        raise ValueError("Every city should be moved at most once.")
+
+    cities_coordinates = solution.cities_coordinates.copy()
+    cities_coordinates[moved] = np.asarray(new_coordinates, dtype=np.float64).reshape(
+        -1, 2
+    )
+
+    distance_matrix = solution.distance_matrix.copy()
+    rows = distance_rows(cities_coordinates, moved, solution.metric)
+    distance_matrix[moved] = rows
+    distance_matrix[:, moved] = rows.T
+
+    neighbors = _refresh_neighbors(distance_matrix, solution.neighbors.copy(), moved)
+
+    # Take the moved cities out of the tour and insert them at their new places
+    is_moved = np.zeros(distance_matrix.shape[0], dtype=bool)
+    is_moved[moved] = True
+    remaining = [city for city in _open_tour(solution.tour) if not is_moved[city]]
+    if not remaining:
+        remaining = [int(moved[0])]
+    tour = cheapest_insertion(
+        [*remaining, remaining[0]],
+        distance_matrix,
+        [city for city in moved.tolist() if city not in remaining],
+    )
+
+    edited = replace(
+        solution,
+        cities_coordinates=cities_coordinates,
+        distance_matrix=distance_matrix,
+        neighbors=neighbors,
+    )
+    return _improve(edited, tour, moved.tolist(), time_limit)
@@ -0,0 +1,595 @@
+"""Reading instances from TSPLIB and CSV files, and writing tours as TSPLIB files.
+
+The files are parsed in a streaming fashion: the coordinates are read in chunks of
+rows straight into a preallocated, contiguous NumPy array, so the parser never holds
+more than one chunk of text in memory. Instances with more than
+MEMMAP_THRESHOLD_ROWS cities are read into a memory-mapped array backed by a
+temporary file (or a given .npy file), so multi-million-city files do not need to
+fit in memory.
+
+TSPLIB distances are integers which are rounded in a specific way for every
+EDGE_WEIGHT_TYPE. They are implemented here so tour lengths match the published
+optima. Instances given only by explicit edge weights get coordinates for drawing
+them from a classical multidimensional scaling (MDS) of the distances, unless the
+file has a DISPLAY_DATA_SECTION.
+"""
+
+import io
+import itertools
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator, List
+
+import numpy as np
+
+from tspdashboard.metrics import Metric, is_symmetric, precomputed_distance_matrix
+from tspdashboard.utilities import generate_distance_matrix
+
+# Instances with more cities than this are read into a memory-mapped array
+MEMMAP_THRESHOLD_ROWS = 1_000_000
+
+# The number of rows parsed at a time
+CHUNK_ROWS = 65_536
+
+# The EDGE_WEIGHT_TYPEs with coordinates whose distances can be computed
+COORDINATE_EDGE_WEIGHT_TYPES = ("EUC_2D", "CEIL_2D", "ATT", "GEO")
+
+# The radius of the earth used by the GEO distance
+_EARTH_RADIUS = 6378.388
+
+# The number of bytes read at a time when counting the lines of a file
+_COUNT_BLOCK_BYTES = 1024**2
+
+Source = str | Path | IO[str] | IO[bytes]
+
+
+@dataclass(frozen=True)
+class Instance:
+    """A TSP instance read from a file.
+
+    Attributes:
+        name (str): The name of the instance.
+        coordinates (np.ndarray): The (x, y) coordinates of the cities, used for
+            drawing them. For instances with explicit edge weights these are either
+            the display data of the file or a layout computed from the distances.
+        edge_weight_type (str | None): The TSPLIB EDGE_WEIGHT_TYPE defining the
+            distances, or None for unrounded distances computed with the metric
+            (e.g. CSV files).
+        explicit_distance_matrix (np.ndarray | None): The distance matrix of
+            instances with EDGE_WEIGHT_TYPE EXPLICIT, which is asymmetric for ATSP
+            files.
+        metric (Metric): The metric of the distances if edge_weight_type is None.
+            Defaults to "euclidean".
+    """
+
+    name: str
+    coordinates: np.ndarray
+    edge_weight_type: str | None = None
+    explicit_distance_matrix: np.ndarray | None = None
+    metric: Metric = "euclidean"
+
+    @property
+    def no_cities(self) -> int:
+        """The number of cities of the instance."""
+        return int(self.coordinates.shape[0])
+
+    def distance_matrix(self) -> np.ndarray:
+        """The distance matrix of the instance, computed from the coordinates unless
+        the distances are explicit."""
+        if self.explicit_distance_matrix is not None:
+            return self.explicit_distance_matrix
+        if self.edge_weight_type is None:
+            return generate_distance_matrix(self.coordinates, metric=self.metric)
+        return tsplib_distance_matrix(self.coordinates, self.edge_weight_type)
+
+
+def _nint(values: np.ndarray) -> np.ndarray:
+    """Rounds to the nearest integer as TSPLIB does, i.e. (int)(x + 0.5)."""
+    rounded: np.ndarray = np.floor(values + 0.5).astype(np.int64)
+    return rounded
+
+
+def _geo_radians(values: np.ndarray) -> np.ndarray:
+    """Converts TSPLIB GEO coordinates (degrees.minutes) to radians."""
+    degrees = np.trunc(values)
+    minutes = values - degrees
+    radians: np.ndarray = 3.141592 * (degrees + 5.0 * minutes / 3.0) / 180.0
+    return radians
+
+
+def tsplib_distance_matrix(
+    coordinates: np.ndarray, edge_weight_type: str
+) -> np.ndarray:
+    """The TSPLIB distance matrix of cities given by coordinates.
+
+    Args:
+        coordinates (np.ndarray): The coordinates of the cities.
+        edge_weight_type (str): "EUC_2D", "CEIL_2D", "ATT" or "GEO".
+
+    Returns:
+        np.ndarray: The integer distances between all pairs of cities.
+    """
+    x, y = coordinates[:, 0], coordinates[:, 1]
+    dx = x[:, None] - x[None, :]
+    dy = y[:, None] - y[None, :]
+
+    distances: np.ndarray
+    if edge_weight_type == "EUC_2D":
+        distances = _nint(np.hypot(dx, dy))
+    elif edge_weight_type == "CEIL_2D":
+        distances = np.ceil(np.hypot(dx, dy)).astype(np.int64)
+    elif edge_weight_type == "ATT":
+        pseudo_euclidean = np.sqrt((dx**2 + dy**2) / 10.0)
+        rounded = _nint(pseudo_euclidean)
+        distances = np.where(rounded < pseudo_euclidean, rounded + 1, rounded)
+    elif edge_weight_type == "GEO":
+        latitude, longitude = _geo_radians(x), _geo_radians(y)
+        q1 = np.cos(longitude[:, None] - longitude[None, :])
+        q2 = np.cos(latitude[:, None] - latitude[None, :])
+        q3 = np.cos(latitude[:, None] + latitude[None, :])
+        arc = np.arccos(np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1, 1))
+        distances = (_EARTH_RADIUS * arc + 1.0).astype(np.int64)
+        np.fill_diagonal(distances, 0)
+    else:
+        raise ValueError(f"Unsupported EDGE_WEIGHT_TYPE {edge_weight_type!r}.")
+
+    return distances
+
+
+def explicit_distance_matrix(
+    weights: np.ndarray, dimension: int, edge_weight_format: str
+) -> np.ndarray:
+    """The distance matrix from the numbers of an EDGE_WEIGHT_SECTION.
+
+    Args:
+        weights (np.ndarray): The numbers of the section in the order of the file.
+        dimension (int): The number of cities.
+        edge_weight_format (str): FULL_MATRIX or one of the triangular formats
+            UPPER_ROW, LOWER_ROW, UPPER_DIAG_ROW and LOWER_DIAG_ROW.
+
+    Returns:
+        np.ndarray: The distance matrix, which is only asymmetric for FULL_MATRIX.
+    """
+    if edge_weight_format == "FULL_MATRIX":
+        return weights.reshape(dimension, dimension)
+
+    if edge_weight_format not in (
+        "UPPER_ROW",
+        "LOWER_ROW",
+        "UPPER_DIAG_ROW",
+        "LOWER_DIAG_ROW",
+    ):
+        raise ValueError(f"Unsupported EDGE_WEIGHT_FORMAT {edge_weight_format!r}.")
+
+    # The triangular formats list either the upper or the lower triangle row by row,
+    # with or without the diagonal
+    lower = edge_weight_format.startswith("LOWER")
+    offset = 0 if "DIAG" in edge_weight_format else (-1 if lower else 1)
+    rows, columns = (
+        np.tril_indices(dimension, offset)
+        if lower
+        else np.triu_indices(dimension, offset)
+    )
+
+    distances = np.zeros((dimension, dimension), dtype=weights.dtype)
+    distances[rows, columns] = weights
+    distances[columns, rows] = weights
+    return distances
+
+
+def mds_layout(distance_matrix: np.ndarray) -> np.ndarray:
+    """Coordinates in the plane whose Euclidean distances approximate the distance
+    matrix, from classical multidimensional scaling. An asymmetric matrix is laid out
+    by the mean of the distances in both directions.
+
+    Returns:
+        np.ndarray: The N x 2 coordinates, scaled to the [0, 1] range.
+    """
+    no_cities = distance_matrix.shape[0]
+    distances = np.asarray(distance_matrix, dtype=np.float64)
+    squared = ((distances + distances.T) / 2) ** 2
+
+    # Double centering of the squared distances gives the Gram matrix of the points
+    centering = np.eye(no_cities) - 1.0 / no_cities
+    gram = -0.5 * centering @ squared @ centering
+
+    # The two largest eigenvalues give the best two-dimensional embedding
+    eigenvalues, eigenvectors = np.linalg.eigh(gram)
+    coordinates = eigenvectors[:, -2:][:, ::-1] * np.sqrt(
+        np.maximum(eigenvalues[-2:][::-1], 0.0)
+    )
+
+    # Scale both axes by the same factor to keep the proportions of the layout
+    span = float(np.ptp(coordinates, axis=0).max())
+    layout: np.ndarray = (coordinates - coordinates.min(axis=0)) / (span or 1.0)
+    return layout
+
+
+def _text_lines(source: Source) -> Iterator[str]:
+    """The lines of a file given by its path or as a (text or binary) file object."""
+    if isinstance(source, (str, Path)):
+        with open(source, encoding="utf-8") as file:
+            yield from file
+        return
+
+    if isinstance(source, io.TextIOBase):
+        yield from source
+        return
+
+    # Binary file objects, e.g. the files uploaded in the dashboard
+    yield from io.TextIOWrapper(source, encoding="utf-8")  # type: ignore[type-var]
+
+
+def _allocate_rows(no_rows: int, memmap_path: str | Path | None) -> np.ndarray:
+    """An uninitialized N x 2 array of coordinates, memory-mapped if a path is given
+    or the number of rows is above MEMMAP_THRESHOLD_ROWS."""
+    if memmap_path is not None:
+        memmap: np.ndarray = np.lib.format.open_memmap(
+            memmap_path, mode="w+", dtype=np.float64, shape=(no_rows, 2)
+        )
+        return memmap
+
+    if no_rows > MEMMAP_THRESHOLD_ROWS:
+        # The mapping stays valid after the temporary file is closed and deleted
+        with tempfile.TemporaryFile() as file:
+            return np.memmap(file, mode="w+", dtype=np.float64, shape=(no_rows, 2))
+
+    return np.empty((no_rows, 2), dtype=np.float64)
+
+
+def _read_rows(
+    lines: Iterator[str],
+    coordinates: np.ndarray,
+    usecols: tuple[int, int],
+    delimiter: str | None = None,
+) -> int:
+    """Parses lines of numbers in chunks into the coordinates array until it is
+    full or the lines run out.
+
+    Returns:
+        int: The number of rows that were read.
+    """
+    no_rows = 0
+    while no_rows < coordinates.shape[0]:
+        chunk_size = min(CHUNK_ROWS, coordinates.shape[0] - no_rows)
+        chunk = [
+            line
+            for line in itertools.islice(lines, chunk_size)
+            if line.strip() and line.strip() != "EOF"
+        ]
+        if not chunk:
+            break
+
+        values = np.loadtxt(
+            chunk, dtype=np.float64, delimiter=delimiter, usecols=usecols, ndmin=2
+        )
+        coordinates[no_rows : no_rows + values.shape[0]] = values
+        no_rows += values.shape[0]
+
+    return no_rows
+
+
+def _read_numbers(lines: Iterator[str], count: int) -> np.ndarray:
+    """Reads count whitespace separated numbers spread over any number of lines."""
+    numbers = np.empty(count, dtype=np.float64)
+    no_numbers = 0
+    for line in lines:
+        values = np.array(line.split(), dtype=np.float64)
+        numbers[no_numbers : no_numbers + values.shape[0]] = values
+        no_numbers += values.shape[0]
+        if no_numbers >= count:
+            break
+
+    if no_numbers != count:
+        raise ValueError(f"Expected {count} edge weights, found {no_numbers}.")
+    return numbers
+
+
+def _no_edge_weights(dimension: int, edge_weight_format: str) -> int:
+    """The number of values in an EDGE_WEIGHT_SECTION of the given format."""
+    if edge_weight_format == "FULL_MATRIX":
+        return dimension * dimension
+    if "DIAG" in edge_weight_format:
+        return dimension * (dimension + 1) // 2
+    return dimension * (dimension - 1) // 2
+
+
+def read_tsplib(
+    source: Source,
+    memmap_path: str | Path | None = None,
+    max_cities: int | None = None,
+) -> Instance:
+    """Reads a TSP instance from a TSPLIB .tsp file, or an asymmetric TSP instance
+    with a FULL_MATRIX of explicit edge weights from a .atsp file.
+
+    Args:
+        source (Source): The path of the file or an open (text or binary) file.
+        memmap_path (str | Path | None, optional): Read the coordinates into a
+            memory-mapped .npy file at this path. Defaults to None, which only
+            memory-maps instances with more than MEMMAP_THRESHOLD_ROWS cities.
+        max_cities (int | None, optional): Raise a ValueError if the DIMENSION of
+            the file is larger, before any section is read. Defaults to None, which
+            means no limit.
+
+    Returns:
+        Instance: The instance.
+    """
+    specification: dict[str, str] = {}
+    coordinates = None
+    weights = None
+
+    lines = _text_lines(source)
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped == "EOF":
+            break
+
+        keyword, _, value = stripped.partition(":")
+        keyword = keyword.strip()
+
+        if keyword in ("NODE_COORD_SECTION", "DISPLAY_DATA_SECTION"):
+            dimension = int(specification["DIMENSION"])
+            _check_no_cities(dimension, max_cities)
+            section_coordinates = _allocate_rows(dimension, memmap_path)
+            # Every line of the section is "index x y"
+            no_rows = _read_rows(lines, section_coordinates, usecols=(1, 2))
+            if no_rows != dimension:
+                raise ValueError(f"Expected {dimension} coordinates, found {no_rows}.")
+            # The node coordinates define the distances, so they take precedence
+            if coordinates is None or keyword == "NODE_COORD_SECTION":
+                coordinates = section_coordinates
+        elif keyword == "EDGE_WEIGHT_SECTION":
+            dimension = int(specification["DIMENSION"])
+            _check_no_cities(dimension, max_cities)
+            edge_weight_format = specification.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX")
+            weights = explicit_distance_matrix(
+                _read_numbers(lines, _no_edge_weights(dimension, edge_weight_format)),
+                dimension,
+                edge_weight_format,
+            )
+        elif keyword.endswith("_SECTION"):
+            raise ValueError(f"Unsupported section {keyword!r}.")
+        else:
+            specification[keyword] = value.strip()
+
+    return _tsplib_instance(specification, coordinates, weights)
+
+
+def _check_no_cities(no_cities: int, max_cities: int | None) -> None:
+    """Raises a ValueError if there are more than max_cities cities."""
+    if max_cities is not None and no_cities > max_cities:
+        raise ValueError(
+            f"The instance has {no_cities} cities, more than the limit of {max_cities}."
+        )
+
+
+def _tsplib_instance(
+    specification: dict[str, str],
+    coordinates: np.ndarray | None,
+    weights: np.ndarray | None,
+) -> Instance:
+    """Checks that the parsed sections of a TSPLIB file fit its specification and
+    combines them into an instance."""
+    problem_type = specification.get("TYPE", "TSP")
+    if problem_type not in ("TSP", "ATSP"):
+        raise ValueError(f"Unsupported TYPE {problem_type!r}.")
+
+    edge_weight_type = specification.get("EDGE_WEIGHT_TYPE")
+    if edge_weight_type == "EXPLICIT":
+        if weights is None:
+            raise ValueError("The file has no EDGE_WEIGHT_SECTION.")
+        weights = precomputed_distance_matrix(weights)
+        if problem_type == "TSP" and not is_symmetric(weights):
+            raise ValueError("The edge weights of a TSP file should be symmetric.")
+        if coordinates is None:
+            coordinates = mds_layout(weights)
+    elif problem_type == "ATSP":
+        raise ValueError("An ATSP file should have EXPLICIT edge weights.")
+    elif edge_weight_type in COORDINATE_EDGE_WEIGHT_TYPES:
+        if coordinates is None:
+            raise ValueError("The file has no NODE_COORD_SECTION.")
+    else:
+        raise ValueError(f"Unsupported EDGE_WEIGHT_TYPE {edge_weight_type!r}.")
+
+    return Instance(
+        name=specification.get("NAME", ""),
+        coordinates=coordinates,
+        edge_weight_type=edge_weight_type,
+        explicit_distance_matrix=weights,
+    )
+
+
+def _count_lines(source: Source) -> int | None:
+    """Counts the lines of a file without parsing it, or returns None if the file
+    cannot be read twice."""
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as file:
+            return _count_remaining_lines(file)
+
+    if not source.seekable():
+        return None
+
+    position = source.tell()
+    no_lines = _count_remaining_lines(source)
+    source.seek(position)
+    return no_lines
+
+
+def _count_remaining_lines(file: IO[str] | IO[bytes]) -> int:
+    """The number of lines from the current position to the end of the file, where
+    the last line may or may not end with a newline."""
+    newline = "\n" if isinstance(file, io.TextIOBase) else b"\n"
+    no_lines = 0
+    last_block = None
+    while block := file.read(_COUNT_BLOCK_BYTES):
+        no_lines += block.count(newline)  # type: ignore[arg-type]
+        last_block = block
+
+    # Count a last line without a newline at the end
+    if last_block is not None and not last_block.endswith(newline):  # type: ignore[arg-type]
+        no_lines += 1
+    return no_lines
+
+
+def read_csv(
+    source: Source,
+    name: str = "",
+    memmap_path: str | Path | None = None,
+    max_cities: int | None = None,
+) -> Instance:
+    """Reads the coordinates of the cities from a CSV file.
+
+    The file has a row per city. If the first row is a header with columns named x
+    and y, those columns are used. If it has columns named latitude and longitude
+    (or lat and lon), the coordinates are (longitude, latitude) and the distances
+    are great-circle distances. Otherwise the first two columns are the
+    coordinates.
+
+    Args:
+        source (Source): The path of the file or an open (text or binary) file.
+        name (str, optional): The name of the instance. Defaults to "".
+        memmap_path (str | Path | None, optional): Read the coordinates into a
+            memory-mapped .npy file at this path. Defaults to None, which only
+            memory-maps files with more than MEMMAP_THRESHOLD_ROWS rows.
+        max_cities (int | None, optional): Raise a ValueError if the file has more
+            rows, before they are parsed. Defaults to None, which means no limit.
+
+    Returns:
+        Instance: The instance, with unrounded Euclidean or great-circle distances.
+    """
+    # Count the lines first, so the coordinates can be read into a single array
+    max_rows = _count_lines(source)
+
+    lines = _text_lines(source)
+    first_line = next(lines, "")
+    fields = [field.strip().lower() for field in first_line.split(",")]
+
+    usecols = (0, 1)
+    metric: Metric = "euclidean"
+    try:
+        [float(field) for field in fields[:2]]
+    except ValueError:
+        # The first line is a header
+        if "x" in fields and "y" in fields:
+            usecols = (fields.index("x"), fields.index("y"))
+        elif geographic_columns := _geographic_columns(fields):
+            usecols = geographic_columns
+            metric = "haversine"
+        if max_rows is not None:
+            max_rows -= 1
+    else:
+        lines = itertools.chain([first_line], lines)
+
+    if max_rows is None:
+        # Without the number of lines, read chunks until the file ends
+        chunks = []
+        while True:
+            chunk = _allocate_rows(CHUNK_ROWS, None)
+            no_rows = _read_rows(lines, chunk, usecols, delimiter=",")
+            chunks.append(chunk[:no_rows])
+            _check_no_cities(sum(len(chunk) for chunk in chunks), max_cities)
+            if no_rows < CHUNK_ROWS:
+                break
+        coordinates = np.concatenate(chunks)
+    else:
+        _check_no_cities(max_rows, max_cities)
+        coordinates = _allocate_rows(max_rows, memmap_path)
+        coordinates = coordinates[
+            : _read_rows(lines, coordinates, usecols, delimiter=",")
+        ]
+
+    return Instance(name=name, coordinates=coordinates, metric=metric)
+
+
+def _geographic_columns(fields: List[str]) -> tuple[int, int] | None:
+    """The indices of the longitude and latitude columns of a CSV header, or None if
+    it does not have both."""
+    longitude = next((f for f in ("longitude", "lon", "lng") if f in fields), None)
+    latitude = next((f for f in ("latitude", "lat") if f in fields), None)
+    if longitude is None or latitude is None:
+        return None
+    return fields.index(longitude), fields.index(latitude)
+
+
+def read_instance(
+    source: Source, filename: str | None = None, max_cities: int | None = None
+) -> Instance:
+    """Reads an instance from a TSPLIB (.tsp or .atsp) or CSV (.csv) file.
+
+    Args:
+        source (Source): The path of the file or an open (text or binary) file.
+        filename (str | None, optional): The name of the file, which decides the
+            format. Defaults to None, which means the path of the source.
+        max_cities (int | None, optional): Raise a ValueError if the instance has
+            more cities, before its coordinates or edge weights are read. Defaults
+            to None, which means no limit.
+
+    Returns:
+        Instance: The instance.
+    """
+    if filename is None:
+        if not isinstance(source, (str, Path)):
+            raise ValueError("The filename is needed to read from a file object.")
+        filename = str(source)
+
+    path = Path(filename)
+    if path.suffix.lower() in (".tsp", ".atsp"):
+        return read_tsplib(source, max_cities=max_cities)
+    if path.suffix.lower() in (".csv", ".txt"):
+        return read_csv(source, name=path.stem, max_cities=max_cities)
+    raise ValueError(f"Unsupported file type {path.suffix!r}.")
+
+
+def read_tour(source: Source) -> List[int]:
+    """Reads a TSPLIB .tour file.
+
+    Returns:
+        List[int]: The tour of 0-based city indices, ending in the first city.
+    """
+    tour: List[int] = []
+    in_tour_section = False
+    for line in _text_lines(source):
+        stripped = line.strip()
+        if stripped == "TOUR_SECTION":
+            in_tour_section = True
+        elif in_tour_section:
+            values = stripped.split()
+            if "-1" in values or "EOF" in values:
+                values = values[: values.index("-1" if "-1" in values else "EOF")]
+                tour.extend(int(value) - 1 for value in values)
+                break
+            tour.extend(int(value) - 1 for value in values)
+
+    if not tour:
+        raise ValueError("The file has no TOUR_SECTION.")
+    return [*tour, tour[0]]
+
+
+def write_tour(
+    target: str | Path | IO[str], tour: List[int], name: str = "", comment: str = ""
+) -> None:
+    """Writes a tour as a TSPLIB .tour file.
+
+    Args:
+        target (str | Path | IO[str]): The path of the file or an open text file.
+        tour (List[int]): The tour of 0-based city indices, either closed (ending in
+            the first city) as returned by the algorithms or open.
+        name (str, optional): The NAME of the tour. Defaults to "".
+        comment (str, optional): The COMMENT of the tour. Defaults to "".
+    """
+    cities = tour[:-1] if len(tour) > 1 and tour[0] == tour[-1] else tour
+
+    header = [f"NAME : {name}", "TYPE : TOUR"]
+    if comment:
+        header.append(f"COMMENT : {comment}")
+    header += [f"DIMENSION : {len(cities)}", "TOUR_SECTION"]
+
+    text = "\n".join([*header, *(str(city + 1) for city in cities), "-1", "EOF", ""])
+
+    if isinstance(target, (str, Path)):
+        Path(target).write_text(text, encoding="utf-8")
+    else:
+        target.write(text)
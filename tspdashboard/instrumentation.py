@@ -0,0 +1,333 @@
+"""Timing and memory measurements of the solvers.
+
+A request, e.g. solving an instance with the greedy algorithm, is measured with
+record_performance. Within it, the phases of the work, e.g. computing the distance
+matrix or building the model, are measured with timed, which is used both as a
+context manager and as a decorator:
+
+    with record_performance("greedy") as record:
+        distance_matrix = generate_distance_matrix(cities_coordinates)
+        tour, total_distance = greedy_algorithm(distance_matrix)
+
+    print(record.to_json())
+
+Every phase records its duration and, while memory is traced, the peak memory it
+allocated on top of what was allocated when it started. The phases can attach
+attributes, e.g. the size of a model, with add_attributes. Outside of
+record_performance, timed does nothing but look up the active record, so the
+solvers can be instrumented at no cost.
+
+tracemalloc is global to the process, so its peak includes the allocations of all
+threads, e.g. of the other sessions of the dashboard. Memory is therefore only
+traced while a single request runs in the process. Requests that overlap, in any
+thread, report no memory, and their records say so in memory_skipped_reason.
+
+Records are appended as JSON lines to the file named by the
+TSPDASHBOARD_PERFORMANCE_LOG environment variable. If the
+TSPDASHBOARD_PROFILE_DIRECTORY environment variable is set, every request is also
+profiled with cProfile, and the statistics are dumped to a .prof file in that
+directory, which can be read with pstats or snakeviz.
+"""
+
+import contextvars
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# The environment variable naming the JSON lines file the records are appended to
+PERFORMANCE_LOG_ENVIRONMENT_VARIABLE = "TSPDASHBOARD_PERFORMANCE_LOG"
+
+# The environment variable naming the directory cProfile statistics are dumped to
+PROFILE_DIRECTORY_ENVIRONMENT_VARIABLE = "TSPDASHBOARD_PROFILE_DIRECTORY"
+
+
+@dataclass
+class PhaseRecord:
+    """The measurements of a phase of a request.
+
+    Attributes:
+        name (str): The name of the phase, e.g. "build_model".
+        depth (int): How many phases the phase is nested in.
+        seconds (float): The wall time of the phase.
+        peak_memory_bytes (int | None): The peak memory allocated during the phase,
+            or None if memory was not traced.
+        attributes (Dict[str, Any]): Further measurements, e.g. the size of a model.
+    """
+
+    name: str
+    depth: int
+    seconds: float = 0.0
+    peak_memory_bytes: int | None = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class PerformanceRecord:
+    """The measurements of a request.
+
+    Attributes:
+        request (str): The name of the request, e.g. "greedy".
+        started_at (str): When the request started, in ISO format.
+        seconds (float): The wall time of the request.
+        peak_memory_bytes (int | None): The peak memory allocated during the
+            request, or None if memory was not traced.
+        phases (List[PhaseRecord]): The phases of the request in the order they
+            started.
+        profile_path (str | None): The file the cProfile statistics were dumped
+            to, if the request was profiled.
+        memory_skipped_reason (str | None): Why the memory was not traced although
+            it was asked for, e.g. because another request ran at the same time.
+    """
+
+    request: str
+    started_at: str
+    seconds: float = 0.0
+    peak_memory_bytes: int | None = None
+    phases: List[PhaseRecord] = field(default_factory=list)
+    profile_path: str | None = None
+    memory_skipped_reason: str | None = None
+
+    def to_json(self) -> str:
+        """The record as a single line of JSON."""
+        return json.dumps(asdict(self), default=str)
+
+
+@dataclass
+class _Frame:
+    """A phase being measured, with the peak memory of the enclosing phase up to the
+    point where the tracemalloc peak was reset for this phase."""
+
+    phase: PhaseRecord
+    start_memory: int
+    peak_before: int
+    carried_peak: int = 0
+
+
+@dataclass
+class _ActiveRecord:
+    """The record of the running request and the stack of its running phases, whose
+    bottom is the request itself."""
+
+    record: PerformanceRecord
+    trace_memory: bool
+    frames: List[_Frame] = field(default_factory=list)
+    overlapped: bool = False
+
+
+_ACTIVE_RECORD: contextvars.ContextVar[_ActiveRecord | None] = contextvars.ContextVar(
+    "active_performance_record", default=None
+)
+
+
+# The reason recorded for requests whose memory is not traced because they overlap
+_OVERLAP_REASON = "another request ran at the same time"
+
+# The requests running in the process, in any thread, and the lock guarding them and
+# the starting and stopping of tracemalloc
+_RUNNING_LOCK = threading.Lock()
+_running_records: List[_ActiveRecord] = []
+
+
+def recording() -> bool:
+    """Whether a request is being measured, e.g. to skip computing attributes that
+    are only needed for the record."""
+    return _ACTIVE_RECORD.get() is not None
+
+
+def add_attributes(**attributes: Any) -> None:
+    """Attaches attributes, e.g. the size of a model, to the innermost running
+    phase. Does nothing if no request is being measured."""
+    active = _ACTIVE_RECORD.get()
+    if active is not None and len(active.frames) > 1:
+        active.frames[-1].phase.attributes.update(attributes)
+
+
+def _start_frame(active: _ActiveRecord, phase: PhaseRecord) -> _Frame:
+    """Starts measuring the memory of a phase by resetting the tracemalloc peak,
+    remembering the peak of the enclosing phase so far."""
+    start_memory, peak_before = 0, 0
+    if active.trace_memory:
+        start_memory, peak_before = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    return _Frame(phase=phase, start_memory=start_memory, peak_before=peak_before)
+
+
+def _end_frame(active: _ActiveRecord, frame: _Frame) -> int:
+    """The peak memory traced since the frame started, passing the peak on to the
+    enclosing phase, which also includes it."""
+    _, peak = tracemalloc.get_traced_memory()
+    peak = max(peak, frame.carried_peak)
+    if active.frames:
+        parent = active.frames[-1]
+        parent.carried_peak = max(parent.carried_peak, frame.peak_before, peak)
+    return peak
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Measures a phase of the running request. Can be used as a context manager
+    or as a decorator, and does nothing if no request is being measured.
+
+    Args:
+        name (str): The name of the phase.
+    """
+    active = _ACTIVE_RECORD.get()
+    if active is None:
+        yield
+        return
+
+    phase = PhaseRecord(name=name, depth=len(active.frames) - 1)
+    active.record.phases.append(phase)
+    frame = _start_frame(active, phase)
+    active.frames.append(frame)
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase.seconds = time.perf_counter() - start
+        active.frames.pop()
+        if active.trace_memory:
+            phase.peak_memory_bytes = _end_frame(active, frame) - frame.start_memory
+
+
+def _profile_path(directory: str, request: str) -> Path:
+    """A new file for the cProfile statistics of a request."""
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    safe_request = re.sub(r"[^\w.-]", "_", request)
+    return Path(directory) / f"{safe_request}-{timestamp}-{os.getpid()}.prof"
+
+
+def write_json_lines(record: PerformanceRecord, path: str | Path) -> None:
+    """Appends the record to a JSON lines file."""
+    with open(path, "a") as file:
+        file.write(record.to_json() + "\n")
+
+
+@contextmanager
+def record_performance(
+    request: str, trace_memory: bool = True
+) -> Iterator[PerformanceRecord]:
+    """Measures a request and its phases.
+
+    Args:
+        request (str): The name of the request, e.g. "greedy".
+        trace_memory (bool, optional): Whether to trace the peak memory with
+            tracemalloc, which slows down allocations while the request runs.
+            Defaults to True.
+
+    Yields:
+        PerformanceRecord: The record, which is complete when the context is left.
+    """
+    record = PerformanceRecord(
+        request=request, started_at=datetime.now(timezone.utc).isoformat()
+    )
+    active = _ActiveRecord(record=record, trace_memory=trace_memory)
+
+    # Only trace the memory if no other request is running, which marks the
+    # running requests as overlapped, and start tracing unless it is already on
+    with _RUNNING_LOCK:
+        for other in _running_records:
+            other.overlapped = True
+        active.overlapped = bool(_running_records)
+        active.trace_memory = trace_memory and not active.overlapped
+        _running_records.append(active)
+        started_tracing = active.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        frame = _start_frame(active, PhaseRecord(name=request, depth=-1))
+    active.frames.append(frame)
+
+    profile_directory = os.environ.get(PROFILE_DIRECTORY_ENVIRONMENT_VARIABLE)
+    profiler = cProfile.Profile() if profile_directory else None
+
+    token = _ACTIVE_RECORD.set(active)
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        record.seconds = time.perf_counter() - start
+        _ACTIVE_RECORD.reset(token)
+        active.frames.pop()
+
+        with _RUNNING_LOCK:
+            _running_records.remove(active)
+            if active.trace_memory:
+                record.peak_memory_bytes = (
+                    _end_frame(active, frame) - frame.start_memory
+                )
+            if started_tracing:
+                tracemalloc.stop()
+
+        # The peaks of a request that overlapped another include its allocations
+        if trace_memory and active.overlapped:
+            record.memory_skipped_reason = _OVERLAP_REASON
+            record.peak_memory_bytes = None
+            for phase in record.phases:
+                phase.peak_memory_bytes = None
+
+        if profiler is not None and profile_directory is not None:
+            os.makedirs(profile_directory, exist_ok=True)
+            path = _profile_path(profile_directory, request)
+            profiler.dump_stats(path)
+            record.profile_path = str(path)
+
+        performance_log = os.environ.get(PERFORMANCE_LOG_ENVIRONMENT_VARIABLE)
+        if performance_log:
+            write_json_lines(record, performance_log)
+
+
+def record_rows(record: PerformanceRecord) -> List[Dict[str, Any]]:
+    """The request and its phases as rows of a table, e.g. for st.dataframe, where
+    the names of the phases are indented by their depth.
+
+    Args:
+        record (PerformanceRecord): The record of a request.
+
+    Returns:
+        List[Dict[str, Any]]: A row for the request followed by a row for every
+        phase.
+    """
+
+    def row(
+        name: str, seconds: float, peak_memory_bytes: int | None, attributes: str
+    ) -> Dict[str, Any]:
+        return {
+            "phase": name,
+            "seconds": round(seconds, 4),
+            "peak memory (MB)": None
+            if peak_memory_bytes is None
+            else round(peak_memory_bytes / 1e6, 2),
+            "details": attributes,
+        }
+
+    memory_note = (
+        f"memory not traced: {record.memory_skipped_reason}"
+        if record.memory_skipped_reason
+        else ""
+    )
+    return [
+        row(record.request, record.seconds, record.peak_memory_bytes, memory_note),
+        *(
+            row(
+                "  " * (phase.depth + 1) + phase.name,
+                phase.seconds,
+                phase.peak_memory_bytes,
+                ", ".join(f"{key}={value}" for key, value in phase.attributes.items()),
+            )
+            for phase in record.phases
+        ),
+    ]
@@ -0,0 +1,296 @@
+"""Run solvers in background processes so the dashboard never waits on a solve.
+
+Every job runs in its own worker process, so a running solve can be cancelled by
+terminating its process, and a crashing solver cannot take the dashboard down with
+it. The number of jobs running at the same time is limited by the size of the pool;
+further jobs wait in a queue until a worker slot is free. Jobs are started and their
+progress collected whenever the pool is polled, so no background thread is needed.
+A job can be given a wall time limit, after which its process is terminated.
+The queue a job sends its messages over, which holds a pipe, is only created when
+the job starts and is closed when it finishes, so a long queue of jobs does not run
+out of file descriptors.
+Every job is measured with tspdashboard.instrumentation, and its performance record
+is sent back together with the result.
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, Dict, Literal
+
+from tspdashboard.instrumentation import PerformanceRecord, record_performance
+
+# The environment variable which overrides the number of concurrent solver processes
+POOL_SIZE_ENVIRONMENT_VARIABLE = "TSPDASHBOARD_SOLVER_WORKERS"
+
+JobStatus = Literal["queued", "running", "done", "failed", "cancelled", "timed_out"]
+
+# Worker processes are spawned instead of forked, since forking the multi-threaded
+# streamlit server is not safe
+_CONTEXT = multiprocessing.get_context("spawn")
+
+
+@dataclass
+class Job:
+    """The state of a job as seen from the dashboard.
+
+    Attributes:
+        job_id (int): The id of the job in the pool.
+        status (JobStatus): "queued", "running", "done", "failed", "cancelled" or
+            "timed_out".
+        progress (Any): The latest progress reported by the solver, if any.
+        result (Any): The return value of the solver once the job is done.
+        error (str | None): A description of the error if the job failed.
+        performance (PerformanceRecord | None): The timings and peak memory of the
+            solver once the job is done or failed.
+    """
+
+    job_id: int
+    status: JobStatus = "queued"
+    progress: Any = None
+    result: Any = None
+    error: str | None = None
+    performance: PerformanceRecord | None = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job is done, failed, cancelled or timed out."""
+        return self.status in ("done", "failed", "cancelled", "timed_out")
+
+
+@dataclass
+class _JobHandle:
+    """A job together with what is needed to run it and talk to its process."""
+
+    job: Job
+    target: Callable[..., Any]
+    kwargs: Dict[str, Any]
+    time_limit: timedelta | None = None
+    messages: Any = None
+    process: BaseProcess | None = None
+    deadline: float | None = None
+
+
+def _run_job(
+    target: Callable[..., Any],
+    kwargs: Dict[str, Any],
+    messages: Any,
+    trace_memory: bool,
+) -> None:
+    """The entry point of a worker process. Runs the target with a progress callback
+    which sends the progress back to the dashboard, followed by the performance
+    record and the result."""
+    try:
+        with record_performance(
+            getattr(target, "__name__", "job"), trace_memory=trace_memory
+        ) as record:
+            result = target(
+                **kwargs,
+                progress_callback=lambda progress: messages.put(("progress", progress)),
+            )
+    except Exception as error:
+        messages.put(("performance", record))
+        messages.put(("error", f"{type(error).__name__}: {error}"))
+    else:
+        messages.put(("performance", record))
+        messages.put(("result", result))
+
+
+def default_pool_size() -> int:
+    """The number of concurrent solver processes, read from the
+    TSPDASHBOARD_SOLVER_WORKERS environment variable and defaulting to the number of
+    CPUs."""
+    pool_size = os.environ.get(POOL_SIZE_ENVIRONMENT_VARIABLE)
+    if pool_size is not None:
+        return int(pool_size)
+    return os.cpu_count() or 1
+
+
+class SolverPool:
+    """A pool of solver processes shared by all sessions of the dashboard.
+
+    Args:
+        max_workers (int | None, optional): The maximum number of jobs running at the
+            same time. Defaults to None, which means default_pool_size().
+        trace_memory (bool, optional): Whether the performance records of the jobs
+            include their peak memory, which slows down allocation heavy solvers.
+            Defaults to True.
+    """
+
+    def __init__(
+        self, max_workers: int | None = None, trace_memory: bool = True
+    ) -> None:
+        if max_workers is None:
+            max_workers = default_pool_size()
+        if max_workers < 1:
+            raise ValueError("The pool needs at least one worker.")
+
+        self.max_workers = max_workers
+        self.trace_memory = trace_memory
+        self._job_ids = itertools.count()
+        self._handles: Dict[int, _JobHandle] = {}
+        self._queued: deque[int] = deque()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        target: Callable[..., Any],
+        *,
+        wall_time_limit: timedelta | None = None,
+        **kwargs: Any,
+    ) -> int:
+        """Queues a solver call and starts it if a worker slot is free.
+
+        Args:
+            target (Callable[..., Any]): A module-level function, e.g.
+                exact_algorithm, accepting the keyword arguments and a
+                progress_callback.
+            wall_time_limit (timedelta | None, optional): The time after which a
+                running job is terminated and marked as "timed_out". Defaults to
+                None, i.e. no limit.
+            **kwargs (Any): The (picklable) keyword arguments of the target.
+
+        Returns:
+            int: The id of the job, used to poll and cancel it.
+        """
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._handles[job_id] = _JobHandle(
+                Job(job_id), target, kwargs, time_limit=wall_time_limit
+            )
+            self._queued.append(job_id)
+            self._update()
+        return job_id
+
+    def poll(self, job_id: int) -> Job:
+        """Collects the progress of all jobs, starts queued jobs if there are free
+        worker slots, and returns the state of the given job."""
+        with self._lock:
+            self._update()
+            return self._handles[job_id].job
+
+    def cancel(self, job_id: int) -> None:
+        """Cancels a job, terminating its process if it is running."""
+        with self._lock:
+            handle = self._handles.get(job_id)
+            if handle is None or handle.job.finished:
+                return
+
+            if handle.process is not None:
+                handle.process.terminate()
+                handle.process.join()
+            else:
+                self._queued.remove(job_id)
+
+            handle.job.status = "cancelled"
+            self._close_messages(handle)
+            self._update()
+
+    def forget(self, job_id: int) -> None:
+        """Removes a job from the pool, cancelling it first if it has not finished."""
+        self.cancel(job_id)
+        with self._lock:
+            handle = self._handles.pop(job_id, None)
+            if handle is not None:
+                self._close_messages(handle)
+
+    def shutdown(self) -> None:
+        """Cancels all jobs, the queued jobs first, so cancelling the running jobs
+        does not start them."""
+        with self._lock:
+            for job_id in self._queued:
+                self._handles[job_id].job.status = "cancelled"
+            self._queued.clear()
+        for job_id in list(self._handles):
+            self.cancel(job_id)
+
+    @property
+    def no_running(self) -> int:
+        """The number of jobs that are currently running."""
+        return sum(handle.job.status == "running" for handle in self._handles.values())
+
+    def _update(self) -> None:
+        """Collects the messages of the running jobs and starts queued jobs. Must be
+        called with the lock held."""
+        for handle in self._handles.values():
+            if handle.job.status == "running":
+                self._collect(handle)
+            if (
+                handle.job.status == "running"
+                and handle.deadline is not None
+                and time.monotonic() > handle.deadline
+            ):
+                self._time_out(handle)
+
+        while self._queued and self.no_running < self.max_workers:
+            handle = self._handles[self._queued.popleft()]
+            handle.messages = _CONTEXT.Queue()
+            handle.process = _CONTEXT.Process(
+                target=_run_job,
+                args=(handle.target, handle.kwargs, handle.messages, self.trace_memory),
+                daemon=True,
+            )
+            handle.process.start()
+            handle.job.status = "running"
+            if handle.time_limit is not None:
+                handle.deadline = time.monotonic() + handle.time_limit.total_seconds()
+
+    @staticmethod
+    def _close_messages(handle: _JobHandle) -> None:
+        """Closes the message queue of a job that has finished, if it was started."""
+        if handle.messages is not None:
+            handle.messages.close()
+            handle.messages = None
+
+    @staticmethod
+    def _time_out(handle: _JobHandle) -> None:
+        """Terminates a job that has exceeded its wall time limit."""
+        assert handle.process is not None
+        assert handle.time_limit is not None
+        handle.process.terminate()
+        handle.process.join()
+        handle.job.status = "timed_out"
+        handle.job.error = (
+            "The job exceeded its time limit of "
+            f"{handle.time_limit.total_seconds():g} seconds"
+        )
+        SolverPool._close_messages(handle)
+
+    @staticmethod
+    def _collect(handle: _JobHandle) -> None:
+        """Reads the messages sent by a running job and detects if it has ended."""
+        assert handle.process is not None
+        # Check if the process is alive before reading, so a process that has ended
+        # has sent all of its messages when they are read
+        alive = handle.process.is_alive()
+
+        job = handle.job
+        while True:
+            try:
+                kind, payload = handle.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                job.progress = payload
+            elif kind == "performance":
+                job.performance = payload
+            elif kind == "result":
+                job.result, job.status = payload, "done"
+            else:
+                job.error, job.status = payload, "failed"
+
+        if not alive and not job.finished:
+            job.status = "failed"
+            job.error = f"The solver process exited with code {handle.process.exitcode}"
+
+        if job.finished:
+            handle.process.join()
+            SolverPool._close_messages(handle)
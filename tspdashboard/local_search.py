@@ -0,0 +1,366 @@
+"""2-opt and Or-opt local search for improving TSP tours.
+
+The local search takes any tour, e.g. the one returned by greedy_algorithm, and
+repeatedly applies improving moves until none are left:
+
+* 2-opt removes two edges and reconnects the tour by reversing the path between them.
+* Or-opt moves a segment of up to three consecutive cities to another place in the
+  tour, possibly reversed.
+
+Only moves that create an edge to one of the k nearest neighbors of a city are
+considered, and cities whose surroundings did not change since they were last
+examined are skipped (don't-look bits), so each pass is close to linear in the
+number of cities. The tour is kept in an array with a position lookup, and every
+reversal is applied to the shorter of the two sides of the tour.
+"""
+
+import math
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+
+from tspdashboard.candidate_graph import DEFAULT_NO_NEIGHBORS, CandidateGraph
+from tspdashboard.instrumentation import timed
+from tspdashboard.utilities import tour_length
+
+# Improvements smaller than this are treated as rounding noise
+_EPSILON = 1e-9
+
+# The lengths of the segments moved by Or-opt
+_OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+
+
+def nearest_neighbors(
+    distance_matrix: np.ndarray,
+    no_neighbors: int,
+    cities: np.ndarray | None = None,
+) -> np.ndarray:
+    """Returns the no_neighbors nearest cities of every city sorted by distance,
+    computed from a dense distance matrix.
+
+    Args:
+        distance_matrix (np.ndarray): The distance matrix of the TSP problem.
+        no_neighbors (int): The number of neighbors of every city.
+        cities (np.ndarray | None, optional): Only compute the neighbors of these
+            cities, e.g. the cities whose distances changed. Defaults to None, which
+            means all cities.
+
+    Returns:
+        np.ndarray: The (no_cities, no_neighbors) array of neighbors, or a row for
+        each of the given cities.
+    """
+    if cities is None:
+        cities = np.arange(distance_matrix.shape[0])
+    distances = np.array(distance_matrix[cities], dtype=np.float64)
+    distances[np.arange(len(cities)), cities] = np.inf
+
+    nearest = np.argpartition(distances, no_neighbors - 1, axis=1)[:, :no_neighbors]
+    order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1)
+    neighbors: np.ndarray = np.take_along_axis(nearest, order, axis=1)
+    return neighbors
+
+
+class _ArrayTour:
+    """A tour stored as an array of cities together with the position of each city,
+    supporting successor and predecessor lookups and 2-opt moves in place."""
+
+    __slots__ = ("no_cities", "order", "position")
+
+    def __init__(self, cities: list[int]) -> None:
+        self.no_cities = len(cities)
+        self.order = list(cities)
+        self.position = [0] * self.no_cities
+        for index, city in enumerate(cities):
+            self.position[city] = index
+
+    def succ(self, city: int) -> int:
+        """The city visited after city."""
+        return self.order[(self.position[city] + 1) % self.no_cities]
+
+    def pred(self, city: int) -> int:
+        """The city visited before city."""
+        return self.order[self.position[city] - 1]
+
+    def _reverse(self, first: int, last: int) -> None:
+        """Reverses the path of the tour running forward from city first to city
+        last. If the path covers more than half the tour, the rest of the tour is
+        reversed instead, which gives the same cycle."""
+        order, position, no_cities = self.order, self.position, self.no_cities
+        i, j = position[first], position[last]
+        length = (j - i) % no_cities + 1
+
+        if 2 * length > no_cities:
+            i, j = (j + 1) % no_cities, (i - 1) % no_cities
+            length = no_cities - length
+
+        for _ in range(length // 2):
+            city_i, city_j = order[i], order[j]
+            order[i], order[j] = city_j, city_i
+            position[city_j], position[city_i] = i, j
+            i = (i + 1) % no_cities
+            j = (j - 1) % no_cities
+
+    def two_opt_move(self, a: int, b: int, c: int, d: int) -> None:
+        """Removes the edges (a, b) and (c, d) and adds the edges (a, c) and (b, d).
+
+        The edges must be oriented the same way, i.e. either b follows a and d follows
+        c, or a follows b and c follows d.
+        """
+        if self.succ(a) == b:
+            self._reverse(b, c)
+        else:
+            self._reverse(c, b)
+
+    def cities(self, start_city: int) -> list[int]:
+        """The tour as a list of cities starting at start_city."""
+        index = self.position[start_city]
+        return self.order[index:] + self.order[:index]
+
+
+def _improve_two_opt(
+    tour: _ArrayTour,
+    city: int,
+    neighbors: np.ndarray,
+    dist: Callable[[int, int], float],
+) -> Tuple[int, ...]:
+    """Applies the first improving 2-opt move involving a new edge from city to one
+    of its neighbors. Returns the endpoints of the changed edges, or an empty tuple if
+    no improving move was found."""
+    for forward in (True, False):
+        a = city
+        b = tour.succ(a) if forward else tour.pred(a)
+        removed_ab = dist(a, b)
+
+        for c in neighbors[city].tolist():
+            added_ac = dist(a, c)
+            # A move is only improving if the new edge is shorter than the old one
+            if added_ac >= removed_ab:
+                break
+
+            d = tour.succ(c) if forward else tour.pred(c)
+            if c == b or d == a:
+                continue
+
+            delta = added_ac + dist(b, d) - removed_ab - dist(c, d)
+            if delta < -_EPSILON:
+                tour.two_opt_move(a, b, c, d)
+                return a, b, c, d
+
+    return ()
+
+
+def _improve_or_opt(
+    tour: _ArrayTour,
+    city: int,
+    neighbors: np.ndarray,
+    dist: Callable[[int, int], float],
+) -> Tuple[int, ...]:
+    """Applies the first improving Or-opt move of a segment of up to three cities
+    starting or ending at city. Returns the endpoints of the changed edges, or an
+    empty tuple if no improving move was found."""
+    for segment_length in _OR_OPT_SEGMENT_LENGTHS:
+        if segment_length + 2 >= tour.no_cities:
+            break
+
+        for starts_at_city in (True, False):
+            if segment_length == 1 and not starts_at_city:
+                continue
+
+            # Collect the segment s1..s2 in the forward direction of the tour
+            segment = [city]
+            for _ in range(segment_length - 1):
+                if starts_at_city:
+                    segment.append(tour.succ(segment[-1]))
+                else:
+                    segment.insert(0, tour.pred(segment[0]))
+            s1, s2 = segment[0], segment[-1]
+
+            p, nx = tour.pred(s1), tour.succ(s2)
+            removal_gain = dist(p, s1) + dist(s2, nx) - dist(p, nx)
+            if removal_gain <= _EPSILON:
+                continue
+
+            move = _insert_segment(tour, segment, removal_gain, neighbors, dist)
+            if move:
+                return move
+
+    return ()
+
+
+def _insert_segment(
+    tour: _ArrayTour,
+    segment: list[int],
+    removal_gain: float,
+    neighbors: np.ndarray,
+    dist: Callable[[int, int], float],
+) -> Tuple[int, ...]:
+    """Looks for an edge (c, e) near the segment s1..s2 to insert the segment into,
+    and applies the first move that improves the tour."""
+    s1, s2 = segment[0], segment[-1]
+    p, nx = tour.pred(s1), tour.succ(s2)
+
+    for end in (s1, s2):
+        for neighbor in neighbors[end].tolist():
+            # Heuristic pruning: the new edge to the segment must beat the gain
+            if dist(neighbor, end) >= removal_gain:
+                break
+            if neighbor in segment:
+                continue
+
+            # Try the edges on both sides of the neighbor, oriented so e follows c
+            for c, e in (
+                (neighbor, tour.succ(neighbor)),
+                (tour.pred(neighbor), neighbor),
+            ):
+                # Inserting between pred(p) and p is the same as moving p instead
+                if c in segment or e in segment or e == p:
+                    continue
+
+                added_cost = dist(c, e)
+                forward_cost = dist(c, s1) + dist(s2, e) - added_cost
+                reversed_cost = dist(c, s2) + dist(s1, e) - added_cost
+                if min(forward_cost, reversed_cost) < removal_gain - _EPSILON:
+                    _move_segment(tour, segment, c, e, forward_cost < reversed_cost)
+                    return s1, s2, p, nx, c, e
+
+    return ()
+
+
+def _move_segment(
+    tour: _ArrayTour, segment: list[int], c: int, e: int, keep_orientation: bool
+) -> None:
+    """Moves the segment s1..s2 (with p before and nx after it) between c and e,
+    where e follows c, using a sequence of 2-opt moves."""
+    s1, s2 = segment[0], segment[-1]
+    p, nx = tour.pred(s1), tour.succ(s2)
+
+    # p s1..s2 nx .. c e  ->  p c .. nx s2..s1 e
+    tour.two_opt_move(p, s1, c, e)
+    # p c .. nx s2..s1 e  ->  p nx .. c s2..s1 e
+    if c != nx:
+        tour.two_opt_move(p, c, nx, s2)
+    # c s2..s1 e  ->  c s1..s2 e
+    if keep_orientation and s1 != s2:
+        tour.two_opt_move(c, s2, s1, e)
+
+
+def _neighbors_and_distance(
+    distance_matrix: np.ndarray | CandidateGraph,
+    no_neighbors: int,
+    neighbors: np.ndarray | None,
+) -> Tuple[np.ndarray, Callable[[int, int], float]]:
+    """The neighbor lists of the cities and a function looking up the distance
+    between two cities."""
+    if isinstance(distance_matrix, CandidateGraph):
+        neighbors = distance_matrix.neighbors
+        xs = distance_matrix.coordinates[:, 0].tolist()
+        ys = distance_matrix.coordinates[:, 1].tolist()
+
+        def dist(city_a: int, city_b: int) -> float:
+            return math.hypot(xs[city_a] - xs[city_b], ys[city_a] - ys[city_b])
+
+    else:
+        no_cities = distance_matrix.shape[0]
+        if neighbors is None:
+            neighbors = nearest_neighbors(
+                distance_matrix, min(no_neighbors, max(1, no_cities - 1))
+            )
+        matrix = np.asarray(distance_matrix, dtype=np.float64)
+
+        # 2-opt reverses paths of the tour, so the distances should be the same in
+        # both directions. Checking the candidate edges catches asymmetric matrices
+        # without a pass over the whole matrix.
+        cities_of_neighbors = np.arange(no_cities)[:, np.newaxis]
+        if not np.allclose(
+            matrix[cities_of_neighbors, neighbors],
+            matrix[neighbors, cities_of_neighbors],
+        ):
+            raise ValueError("The local search needs a symmetric distance matrix.")
+
+        def dist(city_a: int, city_b: int) -> float:
+            return float(matrix.item(city_a, city_b))
+
+    return neighbors, dist
+
+
+@timed("local_search")
+def local_search(  # noqa: PLR0913
+    tour: list[int],
+    distance_matrix: np.ndarray | CandidateGraph,
+    no_neighbors: int = DEFAULT_NO_NEIGHBORS,
+    time_limit: timedelta | None = None,
+    *,
+    neighbors: np.ndarray | None = None,
+    active_cities: Sequence[int] | None = None,
+) -> Tuple[list[int], float]:
+    """Improves a tour with 2-opt and Or-opt moves until no improving move is left.
+
+    Args:
+        tour (list[int]): The tour to improve, as returned by greedy_algorithm, i.e.
+            starting and ending in the same city.
+        distance_matrix (np.ndarray | CandidateGraph): The (symmetric) distance matrix
+            of the TSP problem, or a candidate graph in which case the distances are
+            computed on demand from the coordinates.
+        no_neighbors (int, optional): The number of nearest neighbors considered for
+            new edges when a distance matrix is given. Defaults to
+            DEFAULT_NO_NEIGHBORS.
+        time_limit (timedelta | None, optional): Stop improving after this amount of
+            time. Defaults to None, which means no limit.
+        neighbors (np.ndarray | None, optional): The precomputed neighbor lists of a
+            distance matrix, as returned by nearest_neighbors, which saves a pass over
+            the matrix. Defaults to None.
+        active_cities (Sequence[int] | None, optional): Only start looking for moves
+            around these cities, e.g. where the tour was changed, instead of all
+            cities. Cities next to an improving move are examined as usual. Defaults
+            to None, which means all cities.
+
+    Returns:
+        Tuple[list[int], float]: A tuple containing the improved tour, starting and
+        ending in the same city as the given tour, and its total distance.
+    """
+    start_city = tour[0]
+    cities = tour[:-1] if len(tour) > 1 and tour[-1] == tour[0] else list(tour)
+
+    neighbors, dist = _neighbors_and_distance(distance_matrix, no_neighbors, neighbors)
+    no_cities = len(neighbors)
+
+    if sorted(cities) != list(range(no_cities)):
+        raise ValueError("The tour should visit every city exactly once.")
+
+    array_tour = _ArrayTour(cities)
+    deadline = None
+    if time_limit is not None:
+        deadline = time.monotonic() + time_limit.total_seconds()
+
+    # Small tours have no moves, and 2-opt needs at least two non-adjacent edges
+    if no_cities >= 5:
+        # The active cities start with their don't-look bit off, i.e. in the queue
+        queue = deque(cities if active_cities is None else dict.fromkeys(active_cities))
+        in_queue = [False] * no_cities
+        for city in queue:
+            in_queue[city] = True
+
+        while queue:
+            if deadline is not None and time.monotonic() > deadline:
+                break
+
+            city = queue.popleft()
+            in_queue[city] = False
+
+            changed = _improve_two_opt(array_tour, city, neighbors, dist)
+            if not changed:
+                changed = _improve_or_opt(array_tour, city, neighbors, dist)
+
+            # Wake up the cities at the endpoints of the changed edges
+            for changed_city in changed:
+                if not in_queue[changed_city]:
+                    in_queue[changed_city] = True
+                    queue.append(changed_city)
+
+    improved_tour = array_tour.cities(start_city)
+    improved_tour.append(start_city)
+
+    return improved_tour, tour_length(improved_tour, distance_matrix)
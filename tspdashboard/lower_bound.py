@@ -0,0 +1,524 @@
+"""Held-Karp lower bounds on the length of the optimal tour.
+
+A 1-tree is a spanning tree of the cities other than city 0, together with the two
+shortest edges from city 0 to the tree. Every tour is a 1-tree in which every city
+has degree 2, so the shortest 1-tree is no longer than the optimal tour. Adding a
+penalty pi[i] to every edge of city i adds 2 * sum(pi) to the length of every tour,
+but changes which 1-tree is the shortest, so
+
+    w(pi) = length of the shortest 1-tree with the penalties - 2 * sum(pi)
+
+is a lower bound for any penalties. Held and Karp (1970, 1971) maximize w(pi) with
+subgradient optimization: the penalties of the cities with degree above 2 are
+raised and those of leaves lowered, until the 1-tree looks like a tour. The bound
+is typically within 1 % of the optimal tour for Euclidean instances, and within
+about 2 % after the DEFAULT_MAX_ITERATIONS iterations done here.
+
+The subgradient iterations compute the spanning trees on the edges to the k
+nearest neighbors of every city with Boruvka's algorithm, vectorized with NumPy.
+The final bound is computed with Prim's algorithm on all edges, so it is a
+guaranteed lower bound even if a spanning tree would need an edge that is not
+among the candidates.
+
+The alpha-nearness of an edge (Helsgaun, 2000) is how much longer the shortest
+1-tree becomes if it must contain the edge. Edges of the optimal tour have small
+alpha values, so sorting the neighbor lists by alpha-nearness makes short candidate
+lists, e.g. for the local search, much more likely to contain the optimal edges.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Tuple
+
+import numpy as np
+
+from tspdashboard.candidate_graph import CandidateGraph
+from tspdashboard.instrumentation import add_attributes, timed
+from tspdashboard.local_search import nearest_neighbors
+from tspdashboard.metrics import is_symmetric
+
+# The number of nearest neighbors spanning trees are searched among during the
+# subgradient iterations
+DEFAULT_NO_CANDIDATES = 10
+
+# The maximum number of subgradient iterations
+DEFAULT_MAX_ITERATIONS = 100
+
+# The number of iterations without improving the bound after which the step size is
+# halved, and the smallest step size factor before stopping
+_PATIENCE = 5
+_MIN_STEP_FACTOR = 1e-3
+
+
+@dataclass(frozen=True)
+class LowerBound:
+    """A Held-Karp lower bound and the shortest 1-tree it was computed from.
+
+    Attributes:
+        value (float): The lower bound on the length of every tour.
+        penalties (np.ndarray): The penalties of the cities.
+        tree_parents (np.ndarray): The parent of every city in the spanning tree of
+            the cities other than city 0, with the penalties. The root of the tree
+            and city 0 have parent -1.
+        tree_order (np.ndarray): The cities of the spanning tree in the order they
+            were added, i.e. every city comes after its parent.
+        city_0_neighbors (Tuple[int, int]): The two cities joined to city 0.
+        iterations (int): The number of subgradient iterations.
+    """
+
+    value: float
+    penalties: np.ndarray
+    tree_parents: np.ndarray
+    tree_order: np.ndarray
+    city_0_neighbors: Tuple[int, int]
+    iterations: int
+
+    def gap(self, objective: float) -> float:
+        """The largest possible relative gap between a tour of the given length and
+        the optimal tour."""
+        if self.value <= 0:
+            return float("inf")
+        return max(0.0, (objective - self.value) / self.value)
+
+
+def _distance_rows(
+    distance_matrix: np.ndarray | CandidateGraph,
+) -> Tuple[
+    int, Callable[[int], np.ndarray], Callable[[np.ndarray, np.ndarray], np.ndarray]
+]:
+    """The number of cities, a function computing the distances from a city to all
+    cities, and a function computing the distances between pairs of cities."""
+    if isinstance(distance_matrix, CandidateGraph):
+        coordinates = np.asarray(distance_matrix.coordinates, dtype=np.float64)
+        xs = np.ascontiguousarray(coordinates[:, 0])
+        ys = np.ascontiguousarray(coordinates[:, 1])
+
+        def row(city: int) -> np.ndarray:
+            distances: np.ndarray = np.hypot(xs - xs[city], ys - ys[city])
+            return distances
+
+        def pairs(city_a: np.ndarray, city_b: np.ndarray) -> np.ndarray:
+            distances: np.ndarray = np.hypot(
+                xs[city_a] - xs[city_b], ys[city_a] - ys[city_b]
+            )
+            return distances
+
+        return distance_matrix.no_cities, row, pairs
+
+    matrix = np.asarray(distance_matrix, dtype=np.float64)
+
+    def matrix_row(city: int) -> np.ndarray:
+        distances: np.ndarray = matrix[city]
+        return distances
+
+    def matrix_pairs(city_a: np.ndarray, city_b: np.ndarray) -> np.ndarray:
+        distances: np.ndarray = matrix[city_a, city_b]
+        return distances
+
+    return matrix.shape[0], matrix_row, matrix_pairs
+
+
+def _candidate_edges(
+    distance_matrix: np.ndarray | CandidateGraph, no_candidates: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The undirected edges from every city to its nearest neighbors, without
+    duplicates, as arrays of the first and second city and the distance."""
+    if isinstance(distance_matrix, CandidateGraph):
+        neighbors = distance_matrix.neighbors[:, :no_candidates]
+    else:
+        no_cities = distance_matrix.shape[0]
+        neighbors = nearest_neighbors(
+            distance_matrix, min(no_candidates, no_cities - 1)
+        )
+
+    no_cities, no_neighbors = neighbors.shape
+    cities = np.repeat(np.arange(no_cities), no_neighbors)
+    others = neighbors.ravel().astype(np.int64)
+    edges = np.unique(
+        np.column_stack((np.minimum(cities, others), np.maximum(cities, others))),
+        axis=0,
+    )
+    _, _, pairs = _distance_rows(distance_matrix)
+    return edges[:, 0], edges[:, 1], pairs(edges[:, 0], edges[:, 1])
+
+
+def _boruvka(
+    no_cities: int, first: np.ndarray, second: np.ndarray, weights: np.ndarray
+) -> np.ndarray:
+    """The indices of the edges of a minimum spanning forest, computed with
+    Boruvka's algorithm: every component joins the component at the other end of its
+    cheapest outgoing edge, and the components are merged by pointer jumping, which
+    takes O(log no_cities) vectorized rounds."""
+    no_edges = len(first)
+
+    # Rank the edges once and compare the ranks instead of the weights, so that
+    # ties are broken consistently and no cycles are formed
+    sorted_edges = np.argsort(weights)
+    rank = np.empty(no_edges, dtype=np.int64)
+    rank[sorted_edges] = np.arange(no_edges)
+
+    cities = np.arange(no_cities)
+    component = cities.copy()
+    chosen = []
+
+    while True:
+        first_component = component[first]
+        second_component = component[second]
+        outgoing = np.flatnonzero(first_component != second_component)
+        if len(outgoing) == 0:
+            break
+
+        # The cheapest outgoing edge of every component
+        cheapest_rank = np.full(no_cities, no_edges)
+        np.minimum.at(cheapest_rank, first_component[outgoing], rank[outgoing])
+        np.minimum.at(cheapest_rank, second_component[outgoing], rank[outgoing])
+        sources = np.flatnonzero(cheapest_rank < no_edges)
+        cheapest = sorted_edges[cheapest_rank[sources]]
+        chosen.append(np.unique(cheapest))
+
+        # Point every component to the component its cheapest edge leads to. Pairs
+        # of components choosing the same edge point at each other, and the one
+        # with the smaller index becomes the root.
+        pointer = cities.copy()
+        pointer[sources] = np.where(
+            first_component[cheapest] == sources,
+            second_component[cheapest],
+            first_component[cheapest],
+        )
+        mutual = (pointer[pointer] == cities) & (cities < pointer)
+        pointer[mutual] = cities[mutual]
+        while True:
+            jumped = pointer[pointer]
+            if np.array_equal(jumped, pointer):
+                break
+            pointer = jumped
+        component = pointer[component]
+
+    if not chosen:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(chosen)
+
+
+def _candidate_one_tree(
+    no_cities: int,
+    first: np.ndarray,
+    second: np.ndarray,
+    distances: np.ndarray,
+    penalties: np.ndarray,
+) -> Tuple[float, np.ndarray]:
+    """The length and the degrees of the shortest 1-tree on the candidate edges with
+    the penalties."""
+    weights = distances + penalties[first] + penalties[second]
+    at_city_0 = first == 0
+
+    tree = _boruvka(
+        no_cities, first[~at_city_0], second[~at_city_0], weights[~at_city_0]
+    )
+    tree_first = first[~at_city_0][tree]
+    tree_second = second[~at_city_0][tree]
+
+    # The two shortest candidate edges of city 0
+    city_0_edges = np.flatnonzero(at_city_0)
+    city_0_edges = city_0_edges[np.argsort(weights[city_0_edges])[:2]]
+
+    length = float(weights[~at_city_0][tree].sum() + weights[city_0_edges].sum())
+    degrees = np.bincount(
+        np.concatenate(
+            (tree_first, tree_second, first[city_0_edges], second[city_0_edges])
+        ),
+        minlength=no_cities,
+    )
+    return length, degrees
+
+
+def _one_tree(
+    no_cities: int, row: Callable[[int], np.ndarray], penalties: np.ndarray
+) -> Tuple[float, np.ndarray, np.ndarray, Tuple[int, int]]:
+    """The shortest 1-tree on all edges with the penalties, computed with Prim's
+    algorithm, which adds the city closest to the tree one at a time and updates the
+    distances of the other cities to the tree with one vectorized row.
+
+    Returns:
+        Tuple[float, np.ndarray, np.ndarray, Tuple[int, int]]: The length of the
+        1-tree, the parents and the order of the cities in the spanning tree, and
+        the two cities joined to city 0.
+    """
+    parents = np.full(no_cities, -1, dtype=np.int64)
+    order = np.empty(no_cities - 1, dtype=np.int64)
+    in_tree = np.zeros(no_cities, dtype=bool)
+    in_tree[0] = True
+
+    # Grow the spanning tree of the cities other than city 0 from city 1
+    root = 1
+    in_tree[root] = True
+    order[0] = root
+    distance_to_tree = row(root) + penalties + penalties[root]
+    distance_to_tree[in_tree] = np.inf
+    parents[~in_tree] = root
+    length = 0.0
+
+    for index in range(1, no_cities - 1):
+        city = int(np.argmin(distance_to_tree))
+        length += float(distance_to_tree[city])
+        in_tree[city] = True
+        order[index] = city
+        distance_to_tree[city] = np.inf
+
+        distances = row(city) + penalties + penalties[city]
+        closer = (distances < distance_to_tree) & ~in_tree
+        distance_to_tree[closer] = distances[closer]
+        parents[closer] = city
+
+    parents[root] = -1
+    parents[0] = -1
+
+    # Join city 0 to the tree with its two shortest edges
+    city_0_distances = row(0) + penalties + penalties[0]
+    city_0_distances[0] = np.inf
+    nearest = np.argsort(city_0_distances)[:2]
+    length += float(city_0_distances[nearest].sum())
+
+    return length, parents, order, (int(nearest[0]), int(nearest[-1]))
+
+
+def _check_symmetric(distance_matrix: np.ndarray | CandidateGraph) -> None:
+    """Raises a ValueError for asymmetric distance matrices, for which 1-trees are
+    not defined."""
+    if isinstance(distance_matrix, CandidateGraph):
+        return
+    if not is_symmetric(distance_matrix):
+        raise ValueError("The lower bound needs a symmetric distance matrix.")
+
+
+@timed("lower_bound")
+def held_karp_bound(
+    distance_matrix: np.ndarray | CandidateGraph,
+    upper_bound: float | None = None,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+    no_candidates: int = DEFAULT_NO_CANDIDATES,
+) -> LowerBound:
+    """Computes the Held-Karp lower bound of an instance with subgradient
+    optimization.
+
+    Args:
+        distance_matrix (np.ndarray | CandidateGraph): The symmetric distance matrix
+            of the TSP problem, or a candidate graph in which case the distances are
+            computed on demand from the coordinates.
+        upper_bound (float | None, optional): The length of a known tour, e.g. from
+            a heuristic, which sets the step sizes. Defaults to None, which uses
+            twice the length of the spanning tree (the double tree bound).
+        max_iterations (int, optional): The maximum number of subgradient
+            iterations. Defaults to DEFAULT_MAX_ITERATIONS.
+        no_candidates (int, optional): The number of nearest neighbors of every
+            city that the spanning trees of the iterations are searched among.
+            Defaults to DEFAULT_NO_CANDIDATES.
+
+    Returns:
+        LowerBound: The lower bound on the length of every tour, and the 1-tree it
+        was computed from.
+    """
+    _check_symmetric(distance_matrix)
+    no_cities, row, _ = _distance_rows(distance_matrix)
+    if no_cities <= 2:
+        raise ValueError("The instance should have at least 3 cities.")
+
+    first, second, distances = _candidate_edges(distance_matrix, no_candidates)
+
+    penalties = np.zeros(no_cities)
+    best_penalties = penalties
+    best_value = -np.inf
+    step_factor = 2.0
+    no_unimproved = 0
+
+    no_iterations = 0
+    for _ in range(max_iterations):
+        no_iterations += 1
+        length, degrees = _candidate_one_tree(
+            no_cities, first, second, distances, penalties
+        )
+        value = length - 2 * penalties.sum()
+        if upper_bound is None:
+            upper_bound = 2 * length
+
+        if value > best_value + 1e-9 * abs(value):
+            best_value, best_penalties = value, penalties.copy()
+            no_unimproved = 0
+        else:
+            no_unimproved += 1
+            if no_unimproved >= _PATIENCE:
+                step_factor /= 2
+                no_unimproved = 0
+
+        # The 1-tree is a tour, so the bound cannot be improved
+        subgradient = degrees - 2
+        norm = float(subgradient @ subgradient)
+        if norm == 0 or step_factor < _MIN_STEP_FACTOR:
+            break
+
+        # The step of Polyak (1969) towards the length of the known tour
+        step = step_factor * max(upper_bound - value, 0.0) / norm
+        if step == 0:
+            break
+        penalties = penalties + step * subgradient
+
+    # Evaluate the best penalties on all edges, which is a guaranteed bound
+    length, parents, order, city_0_neighbors = _one_tree(no_cities, row, best_penalties)
+    add_attributes(no_cities=no_cities, iterations=no_iterations)
+
+    return LowerBound(
+        value=length - 2 * float(best_penalties.sum()),
+        penalties=best_penalties,
+        tree_parents=parents,
+        tree_order=order,
+        city_0_neighbors=city_0_neighbors,
+        iterations=no_iterations,
+    )
+
+
+def _max_edge_on_paths(
+    bound: LowerBound,
+    weights: np.ndarray,
+    city_a: np.ndarray,
+    city_b: np.ndarray,
+) -> np.ndarray:
+    """The longest edge on the paths between pairs of cities in the spanning tree,
+    using binary lifting: the 2^j-th ancestor of every city and the longest edge on
+    the way up to it are tabulated, so every query takes O(log no_cities) vectorized
+    steps."""
+    parents = bound.tree_parents
+    no_cities = len(parents)
+
+    # The depth of every city, from the order in which the tree was built
+    depth = np.zeros(no_cities, dtype=np.int64)
+    for city in bound.tree_order[1:].tolist():
+        depth[city] = depth[parents[city]] + 1
+
+    # The root points to itself, with no edge
+    ancestors = [np.where(parents >= 0, parents, np.arange(no_cities))]
+    longest = [np.where(parents >= 0, weights, -np.inf)]
+    for _ in range(max(1, int(depth.max()).bit_length())):
+        ancestors.append(ancestors[-1][ancestors[-1]])
+        longest.append(np.maximum(longest[-1], longest[-1][ancestors[-2]]))
+
+    result = np.full(len(city_a), -np.inf)
+    a, b = city_a.copy(), city_b.copy()
+
+    # Lift the deeper city of every pair to the depth of the other
+    swap = depth[a] < depth[b]
+    a[swap], b[swap] = b[swap], a[swap]
+    difference = depth[a] - depth[b]
+    for level in range(len(ancestors)):
+        lift = (difference >> level) & 1 == 1
+        result[lift] = np.maximum(result[lift], longest[level][a[lift]])
+        a[lift] = ancestors[level][a[lift]]
+
+    # Lift both cities up to just below their lowest common ancestor
+    for level in reversed(range(len(ancestors))):
+        lift = ancestors[level][a] != ancestors[level][b]
+        result[lift] = np.maximum(
+            result[lift],
+            np.maximum(longest[level][a[lift]], longest[level][b[lift]]),
+        )
+        a[lift] = ancestors[level][a[lift]]
+        b[lift] = ancestors[level][b[lift]]
+
+    below = a != b
+    result[below] = np.maximum(
+        result[below], np.maximum(longest[0][a[below]], longest[0][b[below]])
+    )
+    return result
+
+
+def alpha_nearness(
+    distance_matrix: np.ndarray | CandidateGraph,
+    bound: LowerBound,
+    neighbors: np.ndarray,
+) -> np.ndarray:
+    """The alpha-nearness of the edges from every city to its neighbors, i.e. how
+    much longer the shortest 1-tree of the bound becomes if it must contain the
+    edge.
+
+    For an edge between two cities other than city 0, the edge replaces the longest
+    edge on the path between them in the spanning tree. For an edge of city 0, it
+    replaces the longer of the two edges of city 0.
+
+    Args:
+        distance_matrix (np.ndarray | CandidateGraph): The distances the bound was
+            computed from.
+        bound (LowerBound): The lower bound, as returned by held_karp_bound.
+        neighbors (np.ndarray): The (no_cities, no_neighbors) neighbor lists, e.g.
+            from nearest_neighbors or a candidate graph.
+
+    Returns:
+        np.ndarray: The alpha-nearness of every edge in the neighbor lists, which is
+        0 for the edges of the 1-tree.
+    """
+    _, _, pairs = _distance_rows(distance_matrix)
+    penalties = bound.penalties
+    no_cities, no_neighbors = neighbors.shape
+
+    city_a = np.repeat(np.arange(no_cities), no_neighbors)
+    city_b = neighbors.ravel().astype(np.int64)
+    weights = pairs(city_a, city_b) + penalties[city_a] + penalties[city_b]
+
+    # The penalized lengths of the edges from every city to its parent
+    parents = bound.tree_parents
+    has_parent = parents >= 0
+    tree_weights = np.zeros(no_cities)
+    children = np.flatnonzero(has_parent)
+    tree_weights[children] = (
+        pairs(children, parents[children])
+        + penalties[children]
+        + penalties[parents[children]]
+    )
+
+    replaced = np.empty(len(city_a))
+    at_city_0 = (city_a == 0) | (city_b == 0)
+    replaced[~at_city_0] = _max_edge_on_paths(
+        bound, tree_weights, city_a[~at_city_0], city_b[~at_city_0]
+    )
+
+    city_0_neighbors = np.asarray(bound.city_0_neighbors)
+    city_0_weights = (
+        pairs(np.zeros(2, dtype=np.int64), city_0_neighbors)
+        + penalties[0]
+        + penalties[city_0_neighbors]
+    )
+    replaced[at_city_0] = city_0_weights.max()
+
+    alpha = np.maximum(weights - replaced, 0.0)
+
+    # The edges of the 1-tree have nothing to replace
+    in_tree = (has_parent[city_a] & (parents[city_a] == city_b)) | (
+        has_parent[city_b] & (parents[city_b] == city_a)
+    )
+    in_tree |= at_city_0 & np.isin(city_a + city_b, city_0_neighbors)
+    alpha[in_tree] = 0.0
+
+    alpha_values: np.ndarray = alpha.reshape(no_cities, no_neighbors)
+    return alpha_values
+
+
+def alpha_candidates(
+    distance_matrix: np.ndarray | CandidateGraph,
+    bound: LowerBound,
+    neighbors: np.ndarray,
+    no_candidates: int,
+) -> np.ndarray:
+    """Prunes neighbor lists to the neighbors with the smallest alpha-nearness.
+
+    Args:
+        distance_matrix (np.ndarray | CandidateGraph): The distances the bound was
+            computed from.
+        bound (LowerBound): The lower bound, as returned by held_karp_bound.
+        neighbors (np.ndarray): The (no_cities, no_neighbors) neighbor lists to
+            prune, e.g. the 10 nearest neighbors.
+        no_candidates (int): The number of neighbors to keep for every city.
+
+    Returns:
+        np.ndarray: The (no_cities, no_candidates) neighbor lists sorted by
+        alpha-nearness, with ties broken by the original order.
+    """
+    alpha = alpha_nearness(distance_matrix, bound, neighbors)
+    order = np.argsort(alpha, axis=1, kind="stable")[:, :no_candidates]
+    candidates: np.ndarray = np.take_along_axis(neighbors, order, axis=1)
+    return candidates
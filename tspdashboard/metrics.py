@@ -0,0 +1,249 @@
+"""The metrics defining the distances between cities.
+
+Distances are computed from the coordinates of the cities with one of the
+coordinate metrics:
+
+* "euclidean" is the straight line distance in the plane.
+* "haversine" is the great-circle distance in kilometers on the earth, where the
+  coordinates are (longitude, latitude) in degrees, i.e. x and y on a map.
+* "manhattan" is the sum of the distances along both axes, as on a grid of streets.
+
+Each metric computes a block of rows of the distance matrix with broadcasting, which
+generate_distance_matrix uses to compute the whole matrix in blocks that fit a memory
+budget. Distances that are not given by coordinates, e.g. the travel times of a road
+network, are passed as a precomputed distance matrix, which may be asymmetric.
+"""
+
+import math
+from typing import Callable, Literal
+
+import numpy as np
+
+Metric = Literal["euclidean", "haversine", "manhattan"]
+
+METRICS: tuple[Metric, ...] = ("euclidean", "haversine", "manhattan")
+
+# The mean radius of the earth in kilometers
+EARTH_RADIUS_KILOMETERS = 6371.0088
+
+
+def euclidean_block(
+    cities_coordinates: np.ndarray, start: int, stop: int
+) -> np.ndarray:
+    """Computes the Euclidean distances from the cities start..stop-1 to all cities
+    using broadcasting."""
+    block = cities_coordinates[start:stop]
+    delta_x = block[:, 0, np.newaxis] - cities_coordinates[np.newaxis, :, 0]
+    delta_y = block[:, 1, np.newaxis] - cities_coordinates[np.newaxis, :, 1]
+    distances: np.ndarray = np.hypot(delta_x, delta_y)
+    return distances
+
+
+def manhattan_block(
+    cities_coordinates: np.ndarray, start: int, stop: int
+) -> np.ndarray:
+    """Computes the Manhattan distances from the cities start..stop-1 to all cities
+    using broadcasting."""
+    block = cities_coordinates[start:stop]
+    distances: np.ndarray = np.abs(
+        block[:, 0, np.newaxis] - cities_coordinates[np.newaxis, :, 0]
+    )
+    distances += np.abs(block[:, 1, np.newaxis] - cities_coordinates[np.newaxis, :, 1])
+    return distances
+
+
+def haversine_block(
+    cities_coordinates: np.ndarray, start: int, stop: int
+) -> np.ndarray:
+    """Computes the great-circle distances in kilometers from the cities
+    start..stop-1 to all cities using broadcasting, where the coordinates are
+    (longitude, latitude) in degrees."""
+    longitude = np.radians(cities_coordinates[:, 0])
+    latitude = np.radians(cities_coordinates[:, 1])
+    block_longitude = longitude[start:stop, np.newaxis]
+    block_latitude = latitude[start:stop, np.newaxis]
+
+    # The haversine formula, which is accurate for small distances unlike the
+    # spherical law of cosines
+    sin_delta_latitude = np.sin((block_latitude - latitude[np.newaxis, :]) / 2)
+    sin_delta_longitude = np.sin((block_longitude - longitude[np.newaxis, :]) / 2)
+    haversine = sin_delta_latitude**2 + (
+        np.cos(block_latitude) * np.cos(latitude[np.newaxis, :])
+    ) * (sin_delta_longitude**2)
+
+    distances: np.ndarray = (
+        2 * EARTH_RADIUS_KILOMETERS * np.arcsin(np.sqrt(np.minimum(haversine, 1.0)))
+    )
+    return distances
+
+
+# The function computing a block of rows and the number of float64 scratch arrays
+# of the size of the block it needs, for every metric
+_BLOCK_FUNCTIONS: dict[
+    str, tuple[Callable[[np.ndarray, int, int], np.ndarray], int]
+] = {
+    "euclidean": (euclidean_block, 3),
+    "haversine": (haversine_block, 5),
+    "manhattan": (manhattan_block, 3),
+}
+
+
+def block_function(
+    metric: Metric,
+) -> tuple[Callable[[np.ndarray, int, int], np.ndarray], int]:
+    """The function computing a block of rows of the distance matrix for the metric.
+
+    Args:
+        metric (Metric): The name of the metric.
+
+    Returns:
+        tuple[Callable[[np.ndarray, int, int], np.ndarray], int]: The function taking
+        the coordinates and the first and last (exclusive) row of the block, and the
+        number of float64 scratch arrays of the size of the block it needs.
+    """
+    if metric not in _BLOCK_FUNCTIONS:
+        raise ValueError(f"Unknown metric {metric!r}.")
+    return _BLOCK_FUNCTIONS[metric]
+
+
+def pair_distances(
+    cities_coordinates: np.ndarray,
+    cities_a: np.ndarray,
+    cities_b: np.ndarray,
+    metric: Metric = "euclidean",
+) -> np.ndarray:
+    """Computes the distances between pairs of cities at once, e.g. along the edges
+    of a tour, without computing the rest of the distance matrix.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        cities_a (np.ndarray): The indices of the first cities of the pairs.
+        cities_b (np.ndarray): The indices of the second cities of the pairs, of the
+            same shape as cities_a.
+        metric (Metric, optional): The name of the metric. Defaults to "euclidean".
+
+    Returns:
+        np.ndarray: The distance from cities_a[i] to cities_b[i] for every i.
+    """
+    coordinates_a = cities_coordinates[cities_a]
+    coordinates_b = cities_coordinates[cities_b]
+
+    if metric == "euclidean":
+        euclidean: np.ndarray = np.hypot(
+            coordinates_a[..., 0] - coordinates_b[..., 0],
+            coordinates_a[..., 1] - coordinates_b[..., 1],
+        )
+        return euclidean
+
+    if metric == "manhattan":
+        manhattan: np.ndarray = np.abs(coordinates_a - coordinates_b).sum(axis=-1)
+        return manhattan
+
+    if metric == "haversine":
+        radians_a = np.radians(coordinates_a)
+        radians_b = np.radians(coordinates_b)
+        sin_delta = np.sin((radians_a - radians_b) / 2)
+        value = sin_delta[..., 1] ** 2 + (
+            np.cos(radians_a[..., 1]) * np.cos(radians_b[..., 1])
+        ) * (sin_delta[..., 0] ** 2)
+        haversine: np.ndarray = (
+            2 * EARTH_RADIUS_KILOMETERS * np.arcsin(np.sqrt(np.minimum(value, 1.0)))
+        )
+        return haversine
+
+    raise ValueError(f"Unknown metric {metric!r}.")
+
+
+def distance_function(
+    cities_coordinates: np.ndarray, metric: Metric = "euclidean"
+) -> Callable[[int, int], float]:
+    """A function computing the distance between two cities on demand, for
+    algorithms that look up single distances instead of using the whole matrix.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        metric (Metric, optional): The name of the metric. Defaults to "euclidean".
+
+    Returns:
+        Callable[[int, int], float]: The function taking the indices of two cities
+        and returning the distance between them.
+    """
+    # Python floats are much faster than NumPy scalars for single lookups
+    xs: list[float] = np.asarray(cities_coordinates[:, 0], dtype=np.float64).tolist()
+    ys: list[float] = np.asarray(cities_coordinates[:, 1], dtype=np.float64).tolist()
+
+    if metric == "euclidean":
+
+        def euclidean(city_a: int, city_b: int) -> float:
+            return math.hypot(xs[city_a] - xs[city_b], ys[city_a] - ys[city_b])
+
+        return euclidean
+
+    if metric == "manhattan":
+
+        def manhattan(city_a: int, city_b: int) -> float:
+            return abs(xs[city_a] - xs[city_b]) + abs(ys[city_a] - ys[city_b])
+
+        return manhattan
+
+    if metric == "haversine":
+        longitudes = [math.radians(x) for x in xs]
+        latitudes = [math.radians(y) for y in ys]
+        cos_latitudes = [math.cos(latitude) for latitude in latitudes]
+
+        def haversine(city_a: int, city_b: int) -> float:
+            sin_delta_latitude = math.sin((latitudes[city_a] - latitudes[city_b]) / 2)
+            sin_delta_longitude = math.sin(
+                (longitudes[city_a] - longitudes[city_b]) / 2
+            )
+            value = sin_delta_latitude**2 + (
+                cos_latitudes[city_a] * cos_latitudes[city_b]
+            ) * (sin_delta_longitude**2)
+            return 2 * EARTH_RADIUS_KILOMETERS * math.asin(math.sqrt(min(value, 1.0)))
+
+        return haversine
+
+    raise ValueError(f"Unknown metric {metric!r}.")
+
+
+def precomputed_distance_matrix(distance_matrix: np.ndarray) -> np.ndarray:
+    """Checks a precomputed distance matrix, e.g. the travel times of a road network.
+
+    The matrix may be asymmetric, i.e. distance_matrix[i, j] is the distance from
+    city i to city j, which can differ from the distance from j to i.
+
+    Args:
+        distance_matrix (np.ndarray): The (no_cities, no_cities) distance matrix.
+
+    Returns:
+        np.ndarray: The distance matrix as an array.
+    """
+    distance_matrix = np.asarray(distance_matrix)
+
+    # Test that the matrix is square and has at least 2 cities
+    if (
+        distance_matrix.ndim != 2
+        or distance_matrix.shape[0] != distance_matrix.shape[1]
+        or distance_matrix.shape[0] <= 1
+    ):
+        raise ValueError(
+            "The distance matrix should have shape (no_cities, no_cities) with at "
+            "least 2 cities."
+        )
+
+    # Test that the distances are finite and non-negative
+    if not np.all(np.isfinite(distance_matrix)) or np.any(distance_matrix < 0):
+        raise ValueError("The distances should be finite and non-negative.")
+
+    return distance_matrix
+
+
+def is_symmetric(distance_matrix: np.ndarray) -> bool:
+    """Whether the distance from every city to another equals the distance back."""
+    # Computed distances are usually exactly symmetric, which is much faster to
+    # check than symmetric up to rounding
+    transposed = np.transpose(distance_matrix)
+    return bool(
+        np.array_equal(distance_matrix, transposed)
+        or np.allclose(distance_matrix, transposed)
+    )
@@ -0,0 +1,257 @@
+"""Drawing instances and tours for the dashboard.
+
+The dashboard redraws the map whenever a tour is toggled, while the cities stay the
+same. The cities are therefore rendered once into a base layer image, which is
+cached per instance, and each redraw only adds the tours on top of it. All tours
+are drawn as a single LineCollection with one path per tour, which renders several
+times faster than a segment per edge. Instances with more than MAX_DRAWN_CITIES
+cities are decimated to one city per cell of a grid that is finer than the
+markers, which looks the same.
+
+Figures are created with matplotlib.figure.Figure rather than pyplot, so they are
+not kept alive by the pyplot figure registry, and are cleared as soon as they are
+drawn.
+
+Alternatively, vega_lite_spec describes the map as a Vega-Lite chart, which is
+rendered in the browser with st.vega_lite_chart, so the server does not render
+images at all.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, Sequence, Tuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+# The size of the figure in inches and its resolution
+FIGURE_SIZE = (6.4, 4.8)
+DPI = 100
+
+# The number of cities drawn at most, beyond which the cities are decimated
+MAX_DRAWN_CITIES = 20_000
+
+# The tours to draw, as (tour, color) pairs
+Tours = Sequence[Tuple[Sequence[int], str]]
+
+# The base layers of recently drawn instances, by the hash of their coordinates
+_BASE_LAYER_CACHE: OrderedDict[str, "BaseLayer"] = OrderedDict()
+_BASE_LAYER_CACHE_LOCK = threading.Lock()
+_MAX_CACHED_BASE_LAYERS = 16
+
+
+@dataclass(frozen=True)
+class BaseLayer:
+    """The cities of an instance rendered as an image.
+
+    Attributes:
+        image (np.ndarray): The RGBA image of the cities, with a transparent
+            background.
+        extent (Tuple[float, float, float, float]): The (left, right, bottom, top)
+            data coordinates covered by the image.
+        no_drawn_cities (int): The number of cities drawn after decimation.
+    """
+
+    image: np.ndarray
+    extent: Tuple[float, float, float, float]
+    no_drawn_cities: int
+
+
+def decimate(
+    cities_coordinates: np.ndarray, max_cities: int = MAX_DRAWN_CITIES
+) -> np.ndarray:
+    """Reduces the cities to at most about max_cities by keeping one city in every
+    cell of a grid over the instance, such that the drawing looks the same.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        max_cities (int, optional): The number of cities above which the cities are
+            decimated. Defaults to MAX_DRAWN_CITIES.
+
+    Returns:
+        np.ndarray: The coordinates of the cities to draw.
+    """
+    if cities_coordinates.shape[0] <= max_cities:
+        return cities_coordinates
+
+    # A square grid with max_cities cells over the bounding box of the cities
+    no_cells_per_axis = max(1, int(np.sqrt(max_cities)))
+    minimum = cities_coordinates.min(axis=0)
+    extent = np.ptp(cities_coordinates, axis=0)
+    cells = np.floor(
+        (cities_coordinates - minimum)
+        / np.where(extent > 0, extent, 1.0)
+        * (no_cells_per_axis - 1)
+    ).astype(np.int64)
+
+    _, first_city_in_cell = np.unique(
+        cells[:, 0] * no_cells_per_axis + cells[:, 1], return_index=True
+    )
+    decimated: np.ndarray = cities_coordinates[np.sort(first_city_in_cell)]
+    return decimated
+
+
+def _extent(cities_coordinates: np.ndarray) -> Tuple[float, float, float, float]:
+    """The data coordinates covered by the map, i.e. the bounding box of the cities
+    with a margin for the markers."""
+    minimum = cities_coordinates.min(axis=0)
+    maximum = cities_coordinates.max(axis=0)
+    margin = 0.05 * np.where(maximum > minimum, maximum - minimum, 1.0)
+    return (
+        float(minimum[0] - margin[0]),
+        float(maximum[0] + margin[0]),
+        float(minimum[1] - margin[1]),
+        float(maximum[1] + margin[1]),
+    )
+
+
+def _render_base_layer(cities_coordinates: np.ndarray) -> BaseLayer:
+    """Renders the (decimated) cities into a transparent image."""
+    drawn_cities = decimate(cities_coordinates)
+    extent = _extent(cities_coordinates)
+
+    fig = Figure(figsize=FIGURE_SIZE, dpi=DPI)
+    fig.patch.set_alpha(0.0)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.axis("off")
+
+    # Smaller markers for larger instances, so the cities do not merge into a blob
+    marker_size = 6.0 if drawn_cities.shape[0] <= 1_000 else 1.0
+    ax.plot(drawn_cities[:, 0], drawn_cities[:, 1], "o", markersize=marker_size)
+
+    canvas.draw()
+    image = np.asarray(canvas.buffer_rgba()).copy()
+    fig.clear()
+
+    return BaseLayer(image=image, extent=extent, no_drawn_cities=drawn_cities.shape[0])
+
+
+def base_layer(cities_coordinates: np.ndarray) -> BaseLayer:
+    """The cities of the instance rendered as an image, which is only rendered the
+    first time the instance is drawn.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+
+    Returns:
+        BaseLayer: The image of the cities and the area it covers.
+    """
+    cities_coordinates = np.ascontiguousarray(cities_coordinates, dtype=np.float64)
+    key = hashlib.sha256(cities_coordinates.tobytes()).hexdigest()
+
+    with _BASE_LAYER_CACHE_LOCK:
+        layer = _BASE_LAYER_CACHE.get(key)
+        if layer is not None:
+            _BASE_LAYER_CACHE.move_to_end(key)
+            return layer
+
+    layer = _render_base_layer(cities_coordinates)
+
+    with _BASE_LAYER_CACHE_LOCK:
+        _BASE_LAYER_CACHE[key] = layer
+        while len(_BASE_LAYER_CACHE) > _MAX_CACHED_BASE_LAYERS:
+            _BASE_LAYER_CACHE.popitem(last=False)
+
+    return layer
+
+
+@contextmanager
+def tour_figure(cities_coordinates: np.ndarray, tours: Tours) -> Iterator[Figure]:
+    """A figure of the cities with the tours drawn on top, which is cleared when the
+    context is left.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        tours (Tours): The tours to draw and their colors.
+
+    Yields:
+        Figure: The figure, e.g. to pass to st.pyplot.
+    """
+    layer = base_layer(cities_coordinates)
+
+    fig = Figure(figsize=FIGURE_SIZE, dpi=DPI)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.imshow(layer.image, extent=layer.extent, interpolation="nearest")
+    ax.set_xlim(layer.extent[0], layer.extent[1])
+    ax.set_ylim(layer.extent[2], layer.extent[3])
+    ax.set_aspect("auto")
+    ax.axis("off")
+
+    # All tours in a single collection, with a path through the cities of each tour
+    if tours:
+        paths = [
+            cities_coordinates[np.asarray(tour, dtype=np.int64)] for tour, _ in tours
+        ]
+        ax.add_collection(
+            LineCollection(
+                paths,
+                colors=[color for _, color in tours],
+                linewidths=1.5,
+            )
+        )
+
+    try:
+        yield fig
+    finally:
+        fig.clear()
+
+
+def vega_lite_spec(
+    cities_coordinates: np.ndarray, tours: Sequence[Tuple[Sequence[int], str, str]]
+) -> dict[str, Any]:
+    """A Vega-Lite chart of the cities and the tours, rendered in the browser.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        tours (Sequence[Tuple[Sequence[int], str, str]]): The tours to draw, with
+            their names and colors.
+
+    Returns:
+        dict[str, Any]: The chart specification including its data, e.g. to pass to
+        st.vega_lite_chart.
+    """
+    drawn_cities = decimate(cities_coordinates)
+    extent = _extent(cities_coordinates)
+
+    x_scale = {"domain": [extent[0], extent[1]], "nice": False}
+    y_scale = {"domain": [extent[2], extent[3]], "nice": False}
+    encoding = {
+        "x": {"field": "x", "type": "quantitative", "axis": None, "scale": x_scale},
+        "y": {"field": "y", "type": "quantitative", "axis": None, "scale": y_scale},
+    }
+
+    layers: list[dict[str, Any]] = [
+        {
+            "data": {"values": [{"x": x, "y": y} for x, y in drawn_cities.tolist()]},
+            "mark": {"type": "point", "filled": True},
+            "encoding": encoding,
+        }
+    ]
+    for tour, name, color in tours:
+        stops = cities_coordinates[np.asarray(tour, dtype=np.int64)].tolist()
+        layers.append(
+            {
+                "data": {
+                    "values": [
+                        {"x": x, "y": y, "order": order, "tour": name}
+                        for order, (x, y) in enumerate(stops)
+                    ]
+                },
+                "mark": {"type": "line", "color": color},
+                "encoding": {
+                    **encoding,
+                    "order": {"field": "order", "type": "quantitative"},
+                    "tooltip": {"field": "tour", "type": "nominal"},
+                },
+            }
+        )
+
+    return {"layer": layers, "config": {"view": {"stroke": None}}}
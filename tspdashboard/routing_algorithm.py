@@ -0,0 +1,238 @@
+"""A TSP solver based on the vehicle routing library of OR-Tools.
+
+The routing solver builds a first tour with a construction heuristic, e.g. by
+repeatedly extending the path with the cheapest arc, and improves it with local
+search guided by a metaheuristic until the time limit. Guided local search escapes
+local optima by penalizing the long arcs of the tours it gets stuck in, and finds
+tours within a few percent of optimal for instances far beyond the reach of the
+exact algorithm.
+
+The routing library works with integer arc costs, so the distances are scaled and
+rounded. The distances are either given as a distance matrix, or computed on demand
+from the coordinates of the cities by a transit callback, which avoids building the
+dense matrix for large instances at the cost of calling back into Python for every
+lookup. The returned objective is the length of the tour in the original distances.
+"""
+
+import logging
+import time
+from datetime import timedelta
+from typing import Callable, List, Literal, Tuple, get_args
+
+import numpy as np
+from ortools.constraint_solver import (
+    pywrapcp,
+    routing_enums_pb2,
+    routing_parameters_pb2,
+)
+
+from tspdashboard.exact_mip_agorithm import ProgressCallback, SolverProgress
+from tspdashboard.instrumentation import timed
+from tspdashboard.metrics import EARTH_RADIUS_KILOMETERS, Metric, distance_function
+from tspdashboard.utilities import tour_length, validate_tour
+
+log = logging.getLogger(__name__)
+
+FirstSolutionStrategy = Literal[
+    "automatic",
+    "path_cheapest_arc",
+    "global_cheapest_arc",
+    "local_cheapest_insertion",
+    "savings",
+    "christofides",
+]
+
+Metaheuristic = Literal["guided_local_search", "greedy_descent"]
+
+# The largest scaled distance between two cities. Rounding the scaled distances
+# to integers changes them by at most 0.5 / _MAX_ARC_COST of the largest distance,
+# while the length of a tour of a million cities still fits an int64.
+_MAX_ARC_COST = 10**6
+
+
+def _scale(max_distance: float) -> float:
+    """The factor turning distances of at most max_distance into integer arc
+    costs."""
+    if max_distance <= 0:
+        return 1.0
+    return _MAX_ARC_COST / max_distance
+
+
+def _max_distance(cities_coordinates: np.ndarray, metric: Metric) -> float:
+    """An upper bound on the distance between two cities, from the bounding box of
+    the coordinates."""
+    extent = np.ptp(np.asarray(cities_coordinates, dtype=np.float64), axis=0)
+    if metric == "manhattan":
+        return float(extent.sum())
+    if metric == "haversine":
+        # Half the circumference of the earth
+        return float(np.pi * EARTH_RADIUS_KILOMETERS)
+    return float(np.hypot(*extent))
+
+
+def _search_parameters(
+    first_solution_strategy: FirstSolutionStrategy,
+    metaheuristic: Metaheuristic,
+    solve_time_limit: timedelta,
+) -> routing_parameters_pb2.RoutingSearchParameters:
+    """The parameters of the search, i.e. the heuristics and the time limit."""
+    if first_solution_strategy not in get_args(FirstSolutionStrategy):
+        raise ValueError(
+            f"Unknown first solution strategy {first_solution_strategy!r}."
+        )
+    if metaheuristic not in get_args(Metaheuristic):
+        raise ValueError(f"Unknown metaheuristic {metaheuristic!r}.")
+
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = getattr(
+        routing_enums_pb2.FirstSolutionStrategy, first_solution_strategy.upper()
+    )
+    search_parameters.local_search_metaheuristic = getattr(
+        routing_enums_pb2.LocalSearchMetaheuristic, metaheuristic.upper()
+    )
+    search_parameters.time_limit.FromTimedelta(solve_time_limit)
+    return search_parameters
+
+
+def _progress_reporter(
+    routing: pywrapcp.RoutingModel,
+    scale: float,
+    progress_callback: ProgressCallback,
+    start: float,
+) -> Callable[[], None]:
+    """A solution callback reporting the length of every improved tour. Guided local
+    search also accepts worse tours to escape local optima, which are not
+    reported."""
+    best_cost = np.inf
+
+    def report_progress() -> None:
+        nonlocal best_cost
+        cost = routing.CostVar().Value()
+        if cost >= best_cost:
+            return
+        best_cost = cost
+        progress_callback(
+            SolverProgress(
+                elapsed=timedelta(seconds=time.perf_counter() - start),
+                incumbent_objective=cost / scale,
+                best_bound=-np.inf,
+            )
+        )
+
+    return report_progress
+
+
+def routing_algorithm(  # noqa: PLR0913
+    distance_matrix: np.ndarray | None = None,
+    solve_time_limit: timedelta = timedelta(seconds=10),
+    first_solution_strategy: FirstSolutionStrategy = "path_cheapest_arc",
+    metaheuristic: Metaheuristic = "guided_local_search",
+    *,
+    cities_coordinates: np.ndarray | None = None,
+    metric: Metric = "euclidean",
+    progress_callback: ProgressCallback | None = None,
+) -> Tuple[List[int], float]:
+    """Solve the TSP with the OR-Tools routing solver.
+
+    Args:
+        distance_matrix (np.ndarray | None, optional): The distance matrix of the TSP
+            problem, which may be asymmetric. Integer matrices are used as they are,
+            other matrices are scaled to integers. Defaults to None, in which case
+            cities_coordinates should be given.
+        solve_time_limit (timedelta, optional): The time limit of the search.
+            Defaults to 10 seconds.
+        first_solution_strategy (FirstSolutionStrategy, optional): The heuristic
+            building the first tour. Defaults to "path_cheapest_arc", the nearest
+            neighbor heuristic.
+        metaheuristic (Metaheuristic, optional): "guided_local_search" improves the
+            tour until the time limit. "greedy_descent" stops at the first local
+            optimum. Defaults to "guided_local_search".
+        cities_coordinates (np.ndarray | None, optional): The (no_cities, 2) array of
+            coordinates, from which the distances are computed on demand instead of
+            using a distance matrix. Defaults to None.
+        metric (Metric, optional): The metric of the distances computed from
+            cities_coordinates. Defaults to "euclidean".
+        progress_callback (ProgressCallback | None, optional): Called with the
+            length of every improved tour found during the search. Defaults to None.
+
+    Returns:
+        Tuple[List[int], float]: A tuple containing the tour, starting and ending in
+        city 0, and its total distance.
+    """
+    if (distance_matrix is None) == (cities_coordinates is None):
+        raise ValueError(
+            "Either the distance_matrix or the cities_coordinates should be given."
+        )
+
+    if distance_matrix is not None:
+        matrix = np.asarray(distance_matrix)
+        no_cities = matrix.shape[0]
+        scale = 1.0 if np.issubdtype(matrix.dtype, np.integer) else _scale(matrix.max())
+    else:
+        assert cities_coordinates is not None
+        no_cities = cities_coordinates.shape[0]
+        scale = _scale(_max_distance(cities_coordinates, metric))
+        dist = distance_function(cities_coordinates, metric)
+
+    if no_cities <= 1:
+        raise ValueError("The instance should have at least 2 cities.")
+    search_parameters = _search_parameters(
+        first_solution_strategy, metaheuristic, solve_time_limit
+    )
+
+    # A single vehicle visiting all cities, starting and ending in city 0
+    manager = pywrapcp.RoutingIndexManager(no_cities, 1, 0)
+    routing = pywrapcp.RoutingModel(manager)
+
+    if distance_matrix is not None:
+        # The whole matrix is passed to the solver, which looks up the arc costs
+        # without calling back into Python
+        arc_costs = np.rint(matrix.astype(np.float64) * scale)
+        transit_callback_index = routing.RegisterTransitMatrix(
+            arc_costs.astype(np.int64).tolist()
+        )
+    else:
+
+        def transit_callback(from_index: int, to_index: int) -> int:
+            return round(
+                dist(manager.IndexToNode(from_index), manager.IndexToNode(to_index))
+                * scale
+            )
+
+        transit_callback_index = routing.RegisterTransitCallback(transit_callback)
+
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+
+    start = time.perf_counter()
+    if progress_callback is not None:
+        routing.AddAtSolutionCallback(
+            _progress_reporter(routing, scale, progress_callback, start)
+        )
+
+    # Solve the model
+    with timed("solve"):
+        solution = routing.SolveWithParameters(search_parameters)
+    solve_time = time.perf_counter() - start
+
+    if solution is None:
+        raise RuntimeError(f"routing failed to find a tour: {routing.status()}")
+
+    # Follow the successors from the start of the route
+    tour = []
+    index = routing.Start(0)
+    while not routing.IsEnd(index):
+        tour.append(manager.IndexToNode(index))
+        index = solution.Value(routing.NextVar(index))
+
+    # Add the starting city to the end of the tour
+    tour.append(tour[0])
+
+    validate_tour(tour, no_cities)
+    total_distance = tour_length(
+        tour, distance_matrix, cities_coordinates=cities_coordinates, metric=metric
+    )
+
+    log.info("Time: solve %s seconds", solve_time)
+    log.info("Routing solution: %s", tour)
+
+    return tour, total_distance
@@ -0,0 +1,182 @@
+"""A cache of solved instances shared by all sessions of the dashboard.
+
+Solutions are stored under a key which is a hash of the coordinates of the instance,
+the algorithm and its parameters, so the same instance is only solved once no matter
+which session generated it. The cache has two tiers:
+
+* An in-memory tier holding the most recently used solutions (LRU).
+* An optional on-disk tier in a SQLite database, which survives restarts of the
+  server. The least recently used solutions are evicted when the database grows
+  beyond its size limit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import numpy as np
+
+# The environment variable which enables the on-disk tier at the given path
+CACHE_PATH_ENVIRONMENT_VARIABLE = "TSPDASHBOARD_CACHE_PATH"
+
+DEFAULT_MAX_MEMORY_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 64 * 1024**2
+
+# The size of a row on disk besides the tour itself, used for the size limit
+_ROW_OVERHEAD_BYTES = 128
+
+
+def solution_key(instance: np.ndarray, algorithm: str, **parameters: Any) -> str:
+    """The key of the solution of an instance with an algorithm and its parameters.
+
+    Args:
+        instance (np.ndarray): The coordinates of the cities.
+        algorithm (str): The name of the algorithm, e.g. "greedy".
+        **parameters (Any): The parameters of the algorithm which change its result.
+            Their string representation is part of the key.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+    coordinates = np.ascontiguousarray(instance, dtype=np.float64)
+
+    digest = hashlib.sha256()
+    digest.update(str(coordinates.shape).encode())
+    digest.update(coordinates.tobytes())
+    digest.update(algorithm.encode())
+    digest.update(json.dumps(parameters, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class SolutionCache:
+    """A two-tier cache of tours and their objective values.
+
+    Args:
+        max_memory_entries (int, optional): The number of solutions kept in memory.
+            Defaults to DEFAULT_MAX_MEMORY_ENTRIES.
+        path (str | Path | None, optional): The SQLite database of the on-disk tier,
+            or None for no on-disk tier. Defaults to None.
+        max_disk_bytes (int, optional): The size the on-disk tier is evicted down to.
+            Defaults to DEFAULT_MAX_DISK_BYTES.
+    """
+
+    def __init__(
+        self,
+        max_memory_entries: int = DEFAULT_MAX_MEMORY_ENTRIES,
+        path: str | Path | None = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ) -> None:
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: OrderedDict[str, Tuple[List[int], float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+        if path is not None:
+            # The connection is shared by the threads of the streamlit server and
+            # protected by the lock
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                "key TEXT PRIMARY KEY, tour BLOB, objective REAL, "
+                "size INTEGER, last_used REAL)"
+            )
+            self._connection.commit()
+
+    @classmethod
+    def from_environment(cls) -> "SolutionCache":
+        """A cache with an on-disk tier at the path in the TSPDASHBOARD_CACHE_PATH
+        environment variable, or only the in-memory tier if it is not set."""
+        return cls(path=os.environ.get(CACHE_PATH_ENVIRONMENT_VARIABLE))
+
+    def get(self, key: str) -> Tuple[List[int], float] | None:
+        """The cached tour and objective value under the key, or None on a miss."""
+        with self._lock:
+            solution = self._memory.get(key)
+            if solution is not None:
+                self._memory.move_to_end(key)
+            elif self._connection is not None:
+                solution = self._get_from_disk(key)
+                if solution is not None:
+                    self._put_in_memory(key, solution)
+
+            if solution is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            tour, objective = solution
+            return list(tour), objective
+
+    def put(self, key: str, tour: List[int], objective: float) -> None:
+        """Stores a tour and its objective value under the key in both tiers."""
+        solution = ([int(city) for city in tour], float(objective))
+        with self._lock:
+            self._put_in_memory(key, solution)
+            if self._connection is not None:
+                self._put_on_disk(key, solution)
+
+    def close(self) -> None:
+        """Closes the database of the on-disk tier."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _put_in_memory(self, key: str, solution: Tuple[List[int], float]) -> None:
+        """Stores a solution in memory, evicting the least recently used one if the
+        memory tier is full."""
+        self._memory[key] = solution
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _get_from_disk(self, key: str) -> Tuple[List[int], float] | None:
+        """Reads a solution from disk and marks it as used."""
+        assert self._connection is not None
+        row = self._connection.execute(
+            "SELECT tour, objective FROM solutions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._connection.execute(
+            "UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        self._connection.commit()
+        return np.frombuffer(row[0], dtype=np.int32).tolist(), float(row[1])
+
+    def _put_on_disk(self, key: str, solution: Tuple[List[int], float]) -> None:
+        """Writes a solution to disk and evicts the least recently used solutions
+        until the on-disk tier is within its size limit."""
+        assert self._connection is not None
+        tour = np.asarray(solution[0], dtype=np.int32).tobytes()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)",
+            (key, tour, solution[1], len(tour) + _ROW_OVERHEAD_BYTES, time.time()),
+        )
+
+        (total_size,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM solutions"
+        ).fetchone()
+        rows = self._connection.execute(
+            "SELECT key, size FROM solutions ORDER BY last_used"
+        )
+        evicted = []
+        for evicted_key, size in rows:
+            if total_size <= self.max_disk_bytes:
+                break
+            evicted.append((evicted_key,))
+            total_size -= size
+
+        self._connection.executemany("DELETE FROM solutions WHERE key = ?", evicted)
+        self._connection.commit()
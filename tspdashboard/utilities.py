@@ -1,17 +1,118 @@
-"""Various utility functions for the TSP Dashboard application."""
+"""Various utility functions for the TSP Dashboard application.
+
+Besides generating instances and distance matrices, this module evaluates tours.
+Tours are closed, i.e. lists of city indices starting and ending in the same city,
+and their lengths are computed with a single gather of all edges from the distance
+matrix, or from the coordinates without a matrix. The same gathers evaluate many
+tours at once and the changes in length of many 2-opt and swap moves, so solvers
+and the dashboard compute objectives the same way.
+"""
+
+from typing import Sequence
 
 import numpy as np
+import numpy.typing as npt
+
+from tspdashboard.candidate_graph import CandidateGraph
+from tspdashboard.instrumentation import add_attributes, timed
+from tspdashboard.metrics import Metric, block_function, pair_distances
+
+# The default amount of scratch memory (in bytes) the distance matrix engine may use
+# for intermediate results. When the full N x N computation would need more than this,
+# the matrix is computed in blocks of rows instead.
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 1024**2
 
 
-def generate_instance(no_cities: int = 10) -> np.ndarray:
+def generate_instance(no_cities: int = 10, seed: int | None = None) -> np.ndarray:
     """Generates a new instance of the TSP problem with size of no_cities where all
-    cities have locations specified as (x,y) coordinates in the [0.0, 1.0) range."""
-    gen = np.random.default_rng()
+    cities have locations specified as (x,y) coordinates in the [0.0, 1.0) range.
+    The same seed always gives the same instance."""
+    gen = np.random.default_rng(seed)
     return gen.random((no_cities, 2))
 
 
-def generate_distance_matrix(cities_coordinates: np.ndarray) -> np.ndarray:
-    """Generates a distance matrix from the coordinates of the cities."""
+def condensed_index(i: int, j: int, no_cities: int) -> int:
+    """Returns the position of the distance between city i and city j in a condensed
+    (upper triangle, row-major) distance matrix of no_cities cities.
+
+    Args:
+        i (int): The index of the first city.
+        j (int): The index of the second city, different from i.
+        no_cities (int): The number of cities in the instance.
+
+    Returns:
+        int: The index into the condensed distance matrix.
+    """
+    if i == j:
+        raise ValueError("The condensed distance matrix has no diagonal entries.")
+    if i > j:
+        i, j = j, i
+    return no_cities * i - i * (i + 1) // 2 + (j - i - 1)
+
+
+def condensed_to_square(condensed_distance_matrix: np.ndarray) -> np.ndarray:
+    """Expands a condensed (upper triangle) distance matrix to the full symmetric
+    N x N matrix with zeros on the diagonal."""
+    no_entries = condensed_distance_matrix.shape[0]
+
+    # Solve no_cities * (no_cities - 1) / 2 == no_entries for no_cities
+    no_cities = round((1 + float(np.sqrt(1 + 8 * no_entries))) / 2)
+    if no_cities * (no_cities - 1) // 2 != no_entries:
+        raise ValueError("The condensed distance matrix has an invalid length.")
+
+    distance_matrix = np.zeros(
+        (no_cities, no_cities), dtype=condensed_distance_matrix.dtype
+    )
+    rows, cols = np.triu_indices(no_cities, k=1)
+    distance_matrix[rows, cols] = condensed_distance_matrix
+    distance_matrix[cols, rows] = condensed_distance_matrix
+
+    return distance_matrix
+
+
+def _rows_per_block(
+    no_cities: int, memory_budget_bytes: int, no_scratch_arrays: int = 3
+) -> int:
+    """Returns how many rows of the distance matrix can be computed at once without
+    the float64 scratch arrays exceeding the memory budget."""
+    # Each row needs room for the intermediate results of the metric, e.g. the
+    # coordinate differences along both axes and the resulting distances, all in
+    # float64.
+    bytes_per_row = no_scratch_arrays * no_cities * np.dtype(np.float64).itemsize
+    return int(max(1, min(no_cities, memory_budget_bytes // bytes_per_row)))
+
+
+@timed("generate_distance_matrix")
+def generate_distance_matrix(
+    cities_coordinates: np.ndarray,
+    dtype: npt.DTypeLike = np.float64,
+    condensed: bool = False,
+    memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES,
+    metric: Metric = "euclidean",
+) -> np.ndarray:
+    """Generates a distance matrix from the coordinates of the cities.
+
+    The distances are computed with broadcasting in blocks of rows, where the block
+    size is chosen such that the scratch memory stays within memory_budget_bytes. For
+    small instances this is a single block covering the whole matrix.
+
+    Args:
+        cities_coordinates (np.ndarray): The (no_cities, 2) array of coordinates.
+        dtype (npt.DTypeLike, optional): The dtype of the returned matrix, e.g.
+            np.float32 to halve the memory usage. Defaults to np.float64.
+        condensed (bool, optional): If True, only the upper triangle (excluding the
+            diagonal) is returned as a 1-D array of length no_cities * (no_cities -
+            1) / 2 in row-major order. Use condensed_index to look up entries.
+            Defaults to False.
+        memory_budget_bytes (int, optional): The amount of scratch memory available
+            for intermediate results. Defaults to DEFAULT_MEMORY_BUDGET_BYTES.
+        metric (Metric, optional): How the distances are computed from the
+            coordinates, see tspdashboard.metrics. Defaults to "euclidean".
+
+    Returns:
+        np.ndarray: The (no_cities, no_cities) distance matrix, or the condensed
+        upper triangle if condensed is True.
+    """
 
     # Test that there are cities
     if cities_coordinates.shape[0] <= 1:
@@ -19,15 +120,282 @@ def generate_distance_matrix(cities_coordinates: np.ndarray) -> np.ndarray:
 
     # Test that the size of the input is correct - it should be an array of
     # shape (no_cities, 2)
-    if cities_coordinates.shape[1] != 2:
+    if cities_coordinates.ndim != 2 or cities_coordinates.shape[1] != 2:
         raise ValueError("The cities_coordinates should have shape (no_cities, 2).")
 
+    if memory_budget_bytes <= 0:
+        raise ValueError("The memory_budget_bytes should be positive.")
+
+    distance_block, no_scratch_arrays = block_function(metric)
+
+    cities_coordinates = np.asarray(cities_coordinates, dtype=np.float64)
     no_cities = cities_coordinates.shape[0]
-    distance_matrix = np.zeros((no_cities, no_cities))
-    for i in range(no_cities):
-        for j in range(no_cities):
-            distance_matrix[i, j] = np.linalg.norm(
-                cities_coordinates[i] - cities_coordinates[j]
-            )
+    rows_per_block = _rows_per_block(no_cities, memory_budget_bytes, no_scratch_arrays)
+    add_attributes(no_cities=no_cities, no_blocks=-(-no_cities // rows_per_block))
+
+    if condensed:
+        distance_matrix = np.empty(no_cities * (no_cities - 1) // 2, dtype=dtype)
+    else:
+        distance_matrix = np.empty((no_cities, no_cities), dtype=dtype)
+
+    for start in range(0, no_cities, rows_per_block):
+        stop = min(start + rows_per_block, no_cities)
+        block = distance_block(cities_coordinates, start, stop)
+
+        if condensed:
+            # The upper triangle entries of rows start..stop-1 form one contiguous
+            # slice of the condensed matrix.
+            rows = np.arange(start, stop)[:, np.newaxis]
+            upper_triangle = np.arange(no_cities)[np.newaxis, :] > rows
+            offset = no_cities * start - start * (start + 1) // 2
+            values = block[upper_triangle]
+            distance_matrix[offset : offset + values.shape[0]] = values
+        else:
+            distance_matrix[start:stop] = block
 
     return distance_matrix
+
+
+def validate_tour(tour: Sequence[int] | np.ndarray, no_cities: int) -> None:
+    """Checks in O(no_cities) that a tour visits every city exactly once and
+    returns to the city it starts in.
+
+    Args:
+        tour (Sequence[int] | np.ndarray): The closed tour, e.g. [0, 2, 1, 0].
+        no_cities (int): The number of cities of the instance.
+
+    Raises:
+        ValueError: If the tour is not a closed tour through all cities.
+    """
+    cities = np.asarray(tour)
+
+    # Check that the tour is a list of indices with a city more than the instance
+    if cities.ndim != 1 or cities.shape[0] != no_cities + 1:
+        raise ValueError(
+            f"The tour should have {no_cities + 1} entries, got {cities.shape}."
+        )
+    if not np.issubdtype(cities.dtype, np.integer):
+        raise ValueError("The tour should contain the indices of the cities.")
+
+    # Check that the tour is closed and a permutation of the cities
+    if cities[0] != cities[-1]:
+        raise ValueError("The tour should end in the city it starts in.")
+    visited = cities[:-1]
+    if visited.min() < 0 or visited.max() >= no_cities:
+        raise ValueError(f"The tour should only visit cities 0..{no_cities - 1}.")
+    if (np.bincount(visited, minlength=no_cities) != 1).any():
+        raise ValueError("The tour should visit every city exactly once.")
+
+
+def _edge_distances(
+    cities_a: np.ndarray,
+    cities_b: np.ndarray,
+    distance_matrix: np.ndarray | CandidateGraph | None,
+    cities_coordinates: np.ndarray | None,
+    metric: Metric,
+) -> np.ndarray:
+    """The float64 distances from cities_a to cities_b, gathered from the distance
+    matrix or computed from the coordinates."""
+    if isinstance(distance_matrix, CandidateGraph):
+        return pair_distances(distance_matrix.coordinates, cities_a, cities_b)
+    if distance_matrix is not None:
+        return np.asarray(distance_matrix[cities_a, cities_b], dtype=np.float64)
+    if cities_coordinates is None:
+        raise ValueError("Either the distance_matrix or cities_coordinates is needed.")
+    return pair_distances(
+        np.asarray(cities_coordinates, dtype=np.float64), cities_a, cities_b, metric
+    )
+
+
+def tour_lengths(
+    tours: np.ndarray,
+    distance_matrix: np.ndarray | CandidateGraph | None = None,
+    *,
+    cities_coordinates: np.ndarray | None = None,
+    metric: Metric = "euclidean",
+) -> np.ndarray:
+    """Computes the lengths of many closed tours through the same cities at once.
+
+    Args:
+        tours (np.ndarray): The (no_tours, no_cities + 1) array of closed tours.
+        distance_matrix (np.ndarray | CandidateGraph | None, optional): The distance
+            matrix, which may be asymmetric, or a candidate graph whose coordinates
+            give the Euclidean distances. Defaults to None, which computes the
+            distances from the cities_coordinates.
+        cities_coordinates (np.ndarray | None, optional): The (no_cities, 2) array of
+            coordinates, used when there is no distance matrix. Defaults to None.
+        metric (Metric, optional): The metric of the coordinates. Defaults to
+            "euclidean".
+
+    Returns:
+        np.ndarray: The length of every tour.
+    """
+    tours = np.asarray(tours, dtype=np.int64)
+    if tours.ndim != 2:
+        raise ValueError("The tours should have shape (no_tours, no_cities + 1).")
+
+    distances = _edge_distances(
+        tours[:, :-1], tours[:, 1:], distance_matrix, cities_coordinates, metric
+    )
+    lengths: np.ndarray = distances.sum(axis=1)
+    return lengths
+
+
+def tour_length(
+    tour: Sequence[int] | np.ndarray,
+    distance_matrix: np.ndarray | CandidateGraph | None = None,
+    *,
+    cities_coordinates: np.ndarray | None = None,
+    metric: Metric = "euclidean",
+) -> float:
+    """Computes the length of a closed tour.
+
+    Args:
+        tour (Sequence[int] | np.ndarray): The closed tour, e.g. [0, 2, 1, 0].
+        distance_matrix (np.ndarray | CandidateGraph | None, optional): The distance
+            matrix, which may be asymmetric, or a candidate graph whose coordinates
+            give the Euclidean distances. Defaults to None, which computes the
+            distances from the cities_coordinates.
+        cities_coordinates (np.ndarray | None, optional): The (no_cities, 2) array of
+            coordinates, used when there is no distance matrix. Defaults to None.
+        metric (Metric, optional): The metric of the coordinates. Defaults to
+            "euclidean".
+
+    Returns:
+        float: The total distance of the edges of the tour.
+    """
+    cities = np.asarray(tour, dtype=np.int64)
+    return float(
+        tour_lengths(
+            cities[np.newaxis, :],
+            distance_matrix,
+            cities_coordinates=cities_coordinates,
+            metric=metric,
+        )[0]
+    )
+
+
+def _move_positions(
+    tour: Sequence[int] | np.ndarray,
+    first: Sequence[int] | np.ndarray,
+    second: Sequence[int] | np.ndarray,
+    lowest: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The closed tour and the positions of the moves as arrays, checking that
+    lowest <= first < second < len(tour) - 1."""
+    cities = np.asarray(tour, dtype=np.int64)
+    first = np.asarray(first, dtype=np.int64)
+    second = np.asarray(second, dtype=np.int64)
+    if first.shape != second.shape:
+        raise ValueError("The first and second positions should have the same shape.")
+    if first.size > 0 and (
+        first.min() < lowest
+        or (first >= second).any()
+        or second.max() >= cities.shape[0] - 1
+    ):
+        raise ValueError(
+            f"The positions should satisfy {lowest} <= first < second < "
+            f"{cities.shape[0] - 1}."
+        )
+    return cities, first, second
+
+
+def two_opt_deltas(  # noqa: PLR0913
+    tour: Sequence[int] | np.ndarray,
+    first: Sequence[int] | np.ndarray,
+    second: Sequence[int] | np.ndarray,
+    distance_matrix: np.ndarray | CandidateGraph | None = None,
+    *,
+    cities_coordinates: np.ndarray | None = None,
+    metric: Metric = "euclidean",
+) -> np.ndarray:
+    """Computes the changes in length of many 2-opt moves on a closed tour at once.
+
+    The move (i, j) removes the edges tour[i] -> tour[i + 1] and tour[j] ->
+    tour[j + 1], and reconnects the tour by reversing tour[i + 1..j]. Reversing a
+    path only keeps its length with symmetric distances.
+
+    Args:
+        tour (Sequence[int] | np.ndarray): The closed tour, e.g. [0, 2, 1, 3, 0].
+        first (Sequence[int] | np.ndarray): The positions i of the first edges.
+        second (Sequence[int] | np.ndarray): The positions j of the second edges,
+            where i < j < len(tour) - 1.
+        distance_matrix (np.ndarray | CandidateGraph | None, optional): The
+            symmetric distance matrix, or a candidate graph. Defaults to None, which
+            computes the distances from the cities_coordinates.
+        cities_coordinates (np.ndarray | None, optional): The (no_cities, 2) array of
+            coordinates, used when there is no distance matrix. Defaults to None.
+        metric (Metric, optional): The metric of the coordinates. Defaults to
+            "euclidean".
+
+    Returns:
+        np.ndarray: The new minus the old length of the tour for every move, so
+        improving moves are negative.
+    """
+    cities, first, second = _move_positions(tour, first, second, lowest=0)
+    a, b = cities[first], cities[first + 1]
+    c, d = cities[second], cities[second + 1]
+
+    # The removed edges a-b and c-d, and the added edges a-c and b-d, in one gather
+    distances = _edge_distances(
+        np.stack((a, b, a, c)),
+        np.stack((c, d, b, d)),
+        distance_matrix,
+        cities_coordinates,
+        metric,
+    )
+    deltas: np.ndarray = distances[0] + distances[1] - distances[2] - distances[3]
+    return deltas
+
+
+def swap_deltas(  # noqa: PLR0913
+    tour: Sequence[int] | np.ndarray,
+    first: Sequence[int] | np.ndarray,
+    second: Sequence[int] | np.ndarray,
+    distance_matrix: np.ndarray | CandidateGraph | None = None,
+    *,
+    cities_coordinates: np.ndarray | None = None,
+    metric: Metric = "euclidean",
+) -> np.ndarray:
+    """Computes the changes in length of swapping many pairs of cities of a closed
+    tour at once. The first city of the tour stays in place, since it is also the
+    last, and the distances may be asymmetric.
+
+    Args:
+        tour (Sequence[int] | np.ndarray): The closed tour, e.g. [0, 2, 1, 3, 0].
+        first (Sequence[int] | np.ndarray): The positions i of the first cities.
+        second (Sequence[int] | np.ndarray): The positions j of the second cities,
+            where 1 <= i < j < len(tour) - 1.
+        distance_matrix (np.ndarray | CandidateGraph | None, optional): The distance
+            matrix, or a candidate graph. Defaults to None, which computes the
+            distances from the cities_coordinates.
+        cities_coordinates (np.ndarray | None, optional): The (no_cities, 2) array of
+            coordinates, used when there is no distance matrix. Defaults to None.
+        metric (Metric, optional): The metric of the coordinates. Defaults to
+            "euclidean".
+
+    Returns:
+        np.ndarray: The new minus the old length of the tour for every swap, so
+        improving swaps are negative.
+    """
+    cities, first, second = _move_positions(tour, first, second, lowest=1)
+    before_a, a, after_a = cities[first - 1], cities[first], cities[first + 1]
+    before_b, b, after_b = cities[second - 1], cities[second], cities[second + 1]
+
+    # Swapping cities that are not adjacent replaces the four edges around them.
+    # Adjacent cities share the edge a -> b, which is reversed, so only three edges
+    # change: before_a -> a -> b -> after_b becomes before_a -> b -> a -> after_b.
+    distances = _edge_distances(
+        np.stack((before_a, b, before_b, a, before_a, a, before_b, b, b)),
+        np.stack((b, after_a, a, after_b, a, after_a, b, after_b, a)),
+        distance_matrix,
+        cities_coordinates,
+        metric,
+    )
+    added, removed = distances[:4].sum(axis=0), distances[4:8].sum(axis=0)
+    adjacent_added = distances[0] + distances[8] + distances[3]
+    adjacent_removed = distances[4] + distances[5] + distances[7]
+    deltas: np.ndarray = np.where(
+        second == first + 1, adjacent_added - adjacent_removed, added - removed
+    )
+    return deltas